@@ -3,6 +3,8 @@ from supabase import create_client
 import os
 import re
 
+from utils.snapshot_compacto import TRIBUNAIS
+
 # ── Configuração da página ──
 st.set_page_config(page_title="Permutatum - Solicitar Cadastro", page_icon="📝", layout="centered")
 
@@ -27,15 +29,6 @@ def init_supabase():
         return None
 
 
-# ── Lista de tribunais (mesma do arquivo principal) ──
-TRIBUNAIS = [
-    "TJAC", "TJAL", "TJAP", "TJAM", "TJBA", "TJCE", "TJDFT", "TJES",
-    "TJGO", "TJMA", "TJMT", "TJMS", "TJMG", "TJPA", "TJPB", "TJPR",
-    "TJPE", "TJPI", "TJRJ", "TJRN", "TJRS", "TJRO", "TJRR", "TJSC",
-    "TJSE", "TJSP", "TJTO"
-]
-
-
 def validar_email(email):
     padrao = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     return re.match(padrao, email) is not None
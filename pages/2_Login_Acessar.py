@@ -1,12 +1,31 @@
 import streamlit as st
 from supabase import create_client, Client
 from utils.auth_supabase import enviar_codigo_otp, verificar_codigo_otp
+from utils.indice_permutas import IndicePermutas, versao_snapshot
+from utils.catalogo_permutas import CatalogoCiclos
+from utils.delta_permutas import alteracoes_entre, arestas_alteradas, calcular_delta
+from utils.feed_permutas import FeedMagistrado
+from utils.cursor_busca import CursorBusca
+from utils.ciclos_permutas import menor_ciclo
+from utils.orcamento_busca import OrcamentoBusca
+from utils.motor_permutas import (
+    busca_livre_inteligente, calcular_estatisticas, buscar_interessados, buscar_destinos_disponiveis,
+    triangular_prioritarias, gerar_triangulacoes_expandidas, buscar_pares_aguardando, agrupar_pares_por_rota,
+    pecas_faltantes_prioritarias, gerar_pecas_faltantes_expandidas, gerar_rotacoes,
+    gerar_pecas_faltantes_quadrangulacao, gerar_quadrangulacoes, busca_aberta,
+)
+from utils.contagem_permutas import (
+    caminhos_simples, contar_ciclos, contagem_do_par, ganho_por_destino, perfis_mais_valiosos,
+)
+from utils.entrancia_permutas import REGRAS_ENTRANCIA, grupo_entrancia, indice_compativel
+from utils.snapshot_compacto import TRIBUNAIS
+from collections import OrderedDict
 from datetime import datetime
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from collections import Counter
 import re
+import threading
 import urllib.parse
 
 # Configuração da página
@@ -45,12 +64,24 @@ ENTRANCIAS = [
     "2º Grau"
 ]
 
-TRIBUNAIS = [
-    "TJAC", "TJAL", "TJAP", "TJAM", "TJBA", "TJCE", "TJDFT", "TJES",
-    "TJGO", "TJMA", "TJMT", "TJMS", "TJMG", "TJPA", "TJPB", "TJPR", 
-    "TJPE", "TJPI", "TJRJ", "TJRN", "TJRS", "TJRO", "TJRR", "TJSC",
-    "TJSE", "TJSP", "TJTO"
-]
+# Regras de compatibilidade de entrância oferecidas na busca (utils.entrancia_permutas)
+ROTULOS_REGRA_ENTRANCIA = {
+    "qualquer": "Qualquer entrância",
+    "mesma": "Somente a mesma entrância",
+    "grau": "Somente o mesmo grau (1º ou 2º)",
+}
+
+# Tempo máximo (segundos) de cada busca ou página de resultados antes de devolver o parcial
+PRAZO_BUSCA_SEGUNDOS = 8
+
+# Ciclos do feed pessoal exibidos de início na tela de entrada
+FEED_EXIBIDOS = 5
+
+# Perfis de cadastro faltante exibidos no ranking de "Pares aguardando match"
+PERFIS_EXIBIDOS = 20
+
+# Feeds pessoais mantidos em memória entre sessões (os usados há mais tempo saem primeiro)
+FEEDS_MANTIDOS = 200
 
 # Função para conectar ao Supabase
 def init_supabase():
@@ -78,35 +109,88 @@ def init_supabase():
 # Função para carregar todos os dados
 @st.cache_data(ttl=300)
 def _carregar_dados_cache():
-    """Função interna cacheada."""
+    """Função interna cacheada; a versão do snapshot é calculada uma vez, junto com os dados."""
     supabase = init_supabase()
     if not supabase:
         return None
     try:
         response = supabase.table("magistrados").select("*").eq("status", "ativo").execute()
         if response.data and len(response.data) > 0:
-            return response.data
+            return versao_snapshot(response.data), response.data
         return None
     except:
         return None
 
-def carregar_dados():
-    """Tenta cache. Se vazio, limpa cache e busca direto."""
-    dados = _carregar_dados_cache()
-    if dados and len(dados) > 0:
-        return dados
+def carregar_dados_versionados():
+    """(versão, dados) da base ativa. Tenta cache. Se vazio, limpa cache e busca direto."""
+    cache = _carregar_dados_cache()
+    if cache and len(cache[1]) > 0:
+        return cache
     # Cache falhou ou vazio - limpar e buscar direto
     st.cache_data.clear()
     supabase = init_supabase()
     if not supabase:
-        return []
+        return versao_snapshot([]), []
     try:
         response = supabase.table("magistrados").select("*").eq("status", "ativo").execute()
         if response.data and len(response.data) > 0:
-            return response.data
-        return []
+            return versao_snapshot(response.data), response.data
+        return versao_snapshot([]), []
     except:
-        return []
+        return versao_snapshot([]), []
+
+def carregar_dados():
+    """Magistrados ativos (sem a versão)."""
+    return carregar_dados_versionados()[1]
+
+# Último índice construído: a versão seguinte reaproveita o seu catálogo de rotas quando o
+# delta das alterações não cria nem elimina arestas do grafo de tribunais
+@st.cache_resource
+def _indice_anterior():
+    """Estado compartilhado entre sessões ({'indice': ...}) e a trava que o protege."""
+    return {'indice': None}, threading.Lock()
+
+# Índice e catálogo de ciclos da base (um por versão dos dados, compartilhado entre sessões)
+@st.cache_resource(max_entries=4)
+def _indice_cache(versao, _dados):
+    """Função interna cacheada; _dados não entra no hash, apenas a versão."""
+    indice = IndicePermutas(_dados, versao=versao)
+    estado, trava = _indice_anterior()
+    with trava:
+        anterior = estado['indice']
+        alteracoes = alteracoes_entre(anterior, indice) if anterior is not None else None
+        if alteracoes is not None and not arestas_alteradas(indice, alteracoes):
+            indice.catalogo = anterior.catalogo.para_indice(indice)
+        else:
+            indice.catalogo = CatalogoCiclos(indice)
+        estado['indice'] = indice
+    return indice
+
+def obter_indice(versao, dados):
+    """Retorna o índice da versão `versao` da base, construindo-o só quando os dados mudam."""
+    return _indice_cache(versao, dados)
+
+# Contagens de ciclos por par de tribunais (uma por versão dos dados)
+@st.cache_resource(max_entries=4)
+def _contagens_cache(versao, _indice):
+    """Função interna cacheada; _indice não entra no hash, apenas a versão."""
+    return contar_ciclos(_indice)
+
+def obter_contagens(indice):
+    """Matrizes de contagem de permutas, triangulações e quadrangulações da base atual."""
+    return _contagens_cache(indice.versao, indice)
+
+# Matrizes de caminhos simples (simulação de novos destinos), uma por versão dos dados
+@st.cache_resource(max_entries=4)
+def _caminhos_cache(versao, _indice):
+    """Função interna cacheada; _indice não entra no hash, apenas a versão."""
+    return caminhos_simples(_indice)
+
+# Perfis ainda sem cadastro que mais ciclos fechariam (uma vez por versão dos dados)
+@st.cache_resource(max_entries=4)
+def _perfis_cache(versao, _indice):
+    """Função interna cacheada; _indice não entra no hash, apenas a versão."""
+    return perfis_mais_valiosos(_caminhos_cache(versao, _indice), limite=PERFIS_EXIBIDOS)
 
 # Função para verificar email
 def verificar_email(email):
@@ -178,89 +262,6 @@ def excluir_magistrado(id_magistrado):
     except Exception as e:
         return False, f"Erro ao excluir: {str(e)}"
 
-# Função para busca livre inteligente (detecta permutas e triangulações)
-def busca_livre_inteligente(origem_filtro, destino_filtro, dados):
-    permutas_diretas = []
-    triangulacoes = []
-    
-    # Filtrar magistrados pelos critérios
-    magistrados_origem = []
-    magistrados_destino = []
-    
-    if origem_filtro:
-        magistrados_origem = [m for m in dados if m.get('origem') == origem_filtro]
-    
-    if destino_filtro:
-        for magistrado in dados:
-            destinos = [magistrado.get(f'destino_{i}') for i in range(1, 4) if magistrado.get(f'destino_{i}')]
-            if destino_filtro in destinos:
-                magistrados_destino.append(magistrado)
-    
-    # Se ambos filtros foram aplicados, buscar permutas diretas
-    if origem_filtro and destino_filtro:
-        for mag_origem in magistrados_origem:
-            destinos_mag = [mag_origem.get(f'destino_{i}') for i in range(1, 4) if mag_origem.get(f'destino_{i}')]
-            
-            if destino_filtro in destinos_mag:
-                # Buscar magistrados no destino que querem vir para origem
-                for mag_destino in dados:
-                    if mag_destino.get('origem') == destino_filtro:
-                        destinos_mag_destino = [mag_destino.get(f'destino_{i}') for i in range(1, 4) if mag_destino.get(f'destino_{i}')]
-                        
-                        if origem_filtro in destinos_mag_destino:
-                            # Permuta direta encontrada
-                            prioridade_1 = None
-                            prioridade_2 = None
-                            
-                            if mag_origem.get('destino_1') == destino_filtro:
-                                prioridade_1 = 1
-                            elif mag_origem.get('destino_2') == destino_filtro:
-                                prioridade_1 = 2
-                            elif mag_origem.get('destino_3') == destino_filtro:
-                                prioridade_1 = 3
-                            
-                            if mag_destino.get('destino_1') == origem_filtro:
-                                prioridade_2 = 1
-                            elif mag_destino.get('destino_2') == origem_filtro:
-                                prioridade_2 = 2
-                            elif mag_destino.get('destino_3') == origem_filtro:
-                                prioridade_2 = 3
-                            
-                            permutas_diretas.append({
-                                'magistrado_1': mag_origem,
-                                'magistrado_2': mag_destino,
-                                'prioridade_1': prioridade_1,
-                                'prioridade_2': prioridade_2,
-                                'sequencia': f"{origem_filtro} ↔ {destino_filtro}"
-                            })
-        
-        # Buscar triangulações envolvendo os tribunais filtrados
-        for mag_origem in magistrados_origem:
-            destinos_mag_origem = [mag_origem.get(f'destino_{i}') for i in range(1, 4) if mag_origem.get(f'destino_{i}')]
-            
-            for destino_intermediario in destinos_mag_origem:
-                if destino_intermediario == destino_filtro:
-                    continue  # Pular permutas diretas já detectadas
-                
-                # Buscar magistrado no tribunal intermediário
-                for mag_intermediario in dados:
-                    if mag_intermediario.get('origem') == destino_intermediario:
-                        destinos_mag_inter = [mag_intermediario.get(f'destino_{i}') for i in range(1, 4) if mag_intermediario.get(f'destino_{i}')]
-                        
-                        if destino_filtro in destinos_mag_inter:
-                            # Buscar magistrado no destino final que quer voltar à origem
-                            for mag_destino_final in dados:
-                                if mag_destino_final.get('origem') == destino_filtro:
-                                    destinos_final = [mag_destino_final.get(f'destino_{i}') for i in range(1, 4) if mag_destino_final.get(f'destino_{i}')]
-                                    
-                                    if origem_filtro in destinos_final:
-                                        triangulacoes.append({
-                                            'magistrados': [mag_origem, mag_intermediario, mag_destino_final],
-                                            'sequencia': f"{origem_filtro} → {destino_intermediario} → {destino_filtro} → {origem_filtro}",
-                                            'tribunais': [origem_filtro, destino_intermediario, destino_filtro]
-                                        })
-    
-    return permutas_diretas, triangulacoes
 
 # Função para atualizar dados
 def atualizar_dados():
@@ -268,31 +269,6 @@ def atualizar_dados():
     st.success("Base de dados atualizada!")
     st.rerun()
 
-# Função para calcular estatísticas
-def calcular_estatisticas(dados):
-    if not dados:
-        return {}, {}, 0, 0
-    
-    destinos = []
-    origens = []
-    tribunais_unicos = set()
-    
-    for magistrado in dados:
-        origem = magistrado.get('origem')
-        if origem:
-            origens.append(origem)
-            tribunais_unicos.add(origem)
-        
-        for destino_col in ['destino_1', 'destino_2', 'destino_3']:
-            destino = magistrado.get(destino_col)
-            if destino:
-                destinos.append(destino)
-                tribunais_unicos.add(destino)
-    
-    destinos_contador = Counter(destinos)
-    origens_contador = Counter(origens)
-    
-    return destinos_contador, origens_contador, len(dados), len(tribunais_unicos)
 
 # Função para gerar gráficos
 def gerar_graficos(dados):
@@ -420,166 +396,6 @@ def gerar_graficos(dados):
             fig.update_layout(showlegend=False, xaxis_title="Tribunais", yaxis_title="Magistrados")
             st.plotly_chart(fig, use_container_width=True)
 
-# Função para buscar interessados no tribunal do usuário
-def buscar_interessados(tribunal_usuario, dados):
-    interessados = []
-    
-    for magistrado in dados:
-        if magistrado.get('origem') == tribunal_usuario:
-            continue  # Não mostrar o próprio usuário
-        
-        prioridade = None
-        if magistrado.get('destino_1') == tribunal_usuario:
-            prioridade = 1
-        elif magistrado.get('destino_2') == tribunal_usuario:
-            prioridade = 2
-        elif magistrado.get('destino_3') == tribunal_usuario:
-            prioridade = 3
-        
-        if prioridade:
-            interessados.append({
-                'magistrado': magistrado,
-                'prioridade': prioridade
-            })
-    
-    return sorted(interessados, key=lambda x: x['prioridade'])
-
-# Função para buscar destinos disponíveis
-def buscar_destinos_disponiveis(destinos_usuario, dados):
-    disponveis = []
-    
-    for magistrado in dados:
-        origem = magistrado.get('origem')
-        if origem in destinos_usuario:
-            disponveis.append(magistrado)
-    
-    return disponveis
-
-# Funções para triangulação por etapas
-def triangular_prioritarias(origem, destino, dados):
-    """Etapa 1: Triangulações onde TODOS os envolvidos usam destino_1."""
-    triangulacoes = []
-
-    for mag_origem in dados:
-        if mag_origem.get('origem') != origem:
-            continue
-        if mag_origem.get('destino_1') != destino:
-            destino_1_mag = mag_origem.get('destino_1')
-            if not destino_1_mag:
-                continue
-
-            for mag_inter in dados:
-                if mag_inter.get('origem') != destino_1_mag:
-                    continue
-                if mag_inter.get('destino_1') != destino:
-                    continue
-
-                for mag_final in dados:
-                    if mag_final.get('origem') != destino:
-                        continue
-                    if mag_final.get('destino_1') != origem:
-                        continue
-
-                    seq = f"{origem} → {destino_1_mag} → {destino} → {origem}"
-                    triangulacoes.append({
-                        'tipo': 'triangular',
-                        'magistrados': [mag_origem, mag_inter, mag_final],
-                        'sequencia': seq,
-                        'nivel': 'prioritaria'
-                    })
-        else:
-            for mag_destino in dados:
-                if mag_destino.get('origem') != destino:
-                    continue
-                if mag_destino.get('destino_1') != origem:
-                    continue
-
-                seq = f"{origem} ↔ {destino}"
-                triangulacoes.append({
-                    'tipo': 'direta',
-                    'magistrados': [mag_origem, mag_destino],
-                    'sequencia': seq,
-                    'nivel': 'prioritaria'
-                })
-
-    # Remover duplicatas por combinação de nomes
-    vistos = set()
-    unicos = []
-    for t in triangulacoes:
-        nomes = tuple(sorted(m.get('nome', '') for m in t['magistrados']))
-        chave = (t['sequencia'], nomes)
-        if chave not in vistos:
-            vistos.add(chave)
-            unicos.append(t)
-
-    return unicos
-
-
-def triangular_expandidas(origem, destino, dados, limite=50, ja_encontradas=None):
-    """Etapa 2+: Triangulações usando destinos 1, 2 e 3, com limite."""
-    triangulacoes = []
-
-    sequencias_existentes = set()
-    if ja_encontradas:
-        for t in ja_encontradas:
-            nomes = tuple(sorted(m.get('nome', '') for m in t['magistrados']))
-            sequencias_existentes.add((t['sequencia'], nomes))
-
-    for mag_origem in dados:
-        if mag_origem.get('origem') != origem:
-            continue
-
-        destinos_mag_origem = [mag_origem.get(f'destino_{i}') for i in range(1, 4) if mag_origem.get(f'destino_{i}')]
-
-        for dest_mag in destinos_mag_origem:
-            if dest_mag == destino:
-                for mag_destino in dados:
-                    if mag_destino.get('origem') != destino:
-                        continue
-                    destinos_dest = [mag_destino.get(f'destino_{i}') for i in range(1, 4) if mag_destino.get(f'destino_{i}')]
-                    if origem in destinos_dest:
-                        seq = f"{origem} ↔ {destino}"
-                        nomes = tuple(sorted(m.get('nome', '') for m in [mag_origem, mag_destino]))
-                        chave = (seq, nomes)
-                        if chave not in sequencias_existentes:
-                            triangulacoes.append({
-                                'tipo': 'direta',
-                                'magistrados': [mag_origem, mag_destino],
-                                'sequencia': seq,
-                                'nivel': 'expandida'
-                            })
-                            sequencias_existentes.add(chave)
-                            if len(triangulacoes) >= limite:
-                                return triangulacoes, True
-            else:
-                for mag_inter in dados:
-                    if mag_inter.get('origem') != dest_mag:
-                        continue
-                    destinos_inter = [mag_inter.get(f'destino_{i}') for i in range(1, 4) if mag_inter.get(f'destino_{i}')]
-                    if destino not in destinos_inter:
-                        continue
-
-                    for mag_final in dados:
-                        if mag_final.get('origem') != destino:
-                            continue
-                        destinos_final = [mag_final.get(f'destino_{i}') for i in range(1, 4) if mag_final.get(f'destino_{i}')]
-                        if origem in destinos_final:
-                            seq = f"{origem} → {dest_mag} → {destino} → {origem}"
-                            nomes = tuple(sorted(m.get('nome', '') for m in [mag_origem, mag_inter, mag_final]))
-                            chave = (seq, nomes)
-                            if chave not in sequencias_existentes:
-                                triangulacoes.append({
-                                    'tipo': 'triangular',
-                                    'magistrados': [mag_origem, mag_inter, mag_final],
-                                    'sequencia': seq,
-                                    'nivel': 'expandida'
-                                })
-                                sequencias_existentes.add(chave)
-                                if len(triangulacoes) >= limite:
-                                    return triangulacoes, True
-
-    return triangulacoes, False
-
 
 def gerar_link_whatsapp(texto):
     """Gera link do WhatsApp com texto pré-formatado."""
@@ -587,429 +403,62 @@ def gerar_link_whatsapp(texto):
     return f"https://wa.me/?text={texto_encoded}"
 
 
-def buscar_pares_aguardando(dados):
-    """
-    Encontra magistrados que querem ir para um tribunal,
-    mas ninguém desse tribunal quer ir para o tribunal deles.
-    Retorna lista de magistrados 'sem par'.
-    """
-    sem_par = []
-
-    for mag in dados:
-        origem = mag.get('origem')
-        destino_1 = mag.get('destino_1')
-
-        if not origem or not destino_1:
-            continue
-
-        # Verificar se existe alguém do destino_1 que queira vir para a origem
-        tem_par = False
-        for outro in dados:
-            if outro.get('origem') != destino_1:
-                continue
-            destinos_outro = [outro.get(f'destino_{i}') for i in range(1, 4) if outro.get(f'destino_{i}')]
-            if origem in destinos_outro:
-                tem_par = True
-                break
-
-        if not tem_par:
-            sem_par.append({
-                'magistrado': mag,
-                'origem': origem,
-                'destino_desejado': destino_1,
-                'falta': f"Magistrado do {destino_1} com destino {origem}"
-            })
-
-    return sem_par
-
-
-def pecas_faltantes_prioritarias(origem_filtro, destino_filtro, dados):
-    """Etapa 1: Peças faltantes considerando APENAS destino_1 de todos."""
-    pecas = []
-    vistos = set()
-
-    # Cenário A: mag_1 (origem, destino_1=destino), mag_2 (destino, destino_1=X), falta X→origem
-    for mag_1 in dados:
-        if mag_1.get('origem') != origem_filtro:
-            continue
-        if mag_1.get('destino_1') != destino_filtro:
-            continue
-
-        for mag_2 in dados:
-            if mag_2.get('origem') != destino_filtro:
-                continue
-            dest_2 = mag_2.get('destino_1')
-            if not dest_2 or dest_2 == origem_filtro:
-                continue
-
-            tem_terceiro = False
-            for mag_3 in dados:
-                if mag_3.get('origem') != dest_2:
-                    continue
-                if mag_3.get('destino_1') == origem_filtro:
-                    tem_terceiro = True
-                    break
-
-            if not tem_terceiro:
-                chave = (mag_1.get('nome'), mag_2.get('nome'), dest_2)
-                if chave not in vistos:
-                    vistos.add(chave)
-                    pecas.append({
-                        'mag_1': mag_1,
-                        'mag_2': mag_2,
-                        'sequencia': f"{origem_filtro} → {destino_filtro} → {dest_2} → {origem_filtro}",
-                        'falta': f"Magistrado do {dest_2} com destino {origem_filtro}",
-                        'nivel': 'prioritaria'
-                    })
-
-    # Cenário B: mag_1 (origem, destino_1=intermediario), mag_inter (intermediario, destino_1=destino), falta destino→origem
-    for mag_1 in dados:
-        if mag_1.get('origem') != origem_filtro:
-            continue
-        intermediario = mag_1.get('destino_1')
-        if not intermediario or intermediario == destino_filtro:
-            continue
-
-        for mag_inter in dados:
-            if mag_inter.get('origem') != intermediario:
-                continue
-            if mag_inter.get('destino_1') != destino_filtro:
-                continue
-
-            tem_terceiro = False
-            for mag_3 in dados:
-                if mag_3.get('origem') != destino_filtro:
-                    continue
-                if mag_3.get('destino_1') == origem_filtro:
-                    tem_terceiro = True
-                    break
-
-            if not tem_terceiro:
-                chave = (mag_1.get('nome'), mag_inter.get('nome'), destino_filtro)
-                if chave not in vistos:
-                    vistos.add(chave)
-                    pecas.append({
-                        'mag_1': mag_1,
-                        'mag_2': mag_inter,
-                        'sequencia': f"{origem_filtro} → {intermediario} → {destino_filtro} → {origem_filtro}",
-                        'falta': f"Magistrado do {destino_filtro} com destino {origem_filtro}",
-                        'nivel': 'prioritaria'
-                    })
-
-    return pecas
-
-
-def pecas_faltantes_expandidas(origem_filtro, destino_filtro, dados, limite=50, ja_encontradas=None):
-    """Etapa 2: Peças faltantes usando destinos 1, 2 e 3, com limite."""
-    pecas = []
-    vistos = set()
-
-    if ja_encontradas:
-        for p in ja_encontradas:
-            chave = (p['mag_1'].get('nome'), p['mag_2'].get('nome'), p['sequencia'])
-            vistos.add(chave)
-
-    # Cenário A: mag_1 da origem quer destino (via qualquer destino), mag_2 do destino quer X, falta X→origem
-    for mag_1 in dados:
-        if mag_1.get('origem') != origem_filtro:
-            continue
-        destinos_1 = [mag_1.get(f'destino_{i}') for i in range(1, 4) if mag_1.get(f'destino_{i}')]
-        if destino_filtro not in destinos_1:
-            continue
-
-        for mag_2 in dados:
-            if mag_2.get('origem') != destino_filtro:
-                continue
-            destinos_2 = [mag_2.get(f'destino_{i}') for i in range(1, 4) if mag_2.get(f'destino_{i}')]
-
-            for dest_2 in destinos_2:
-                if dest_2 == origem_filtro:
-                    continue
-
-                tem_terceiro = False
-                for mag_3 in dados:
-                    if mag_3.get('origem') != dest_2:
-                        continue
-                    destinos_3 = [mag_3.get(f'destino_{i}') for i in range(1, 4) if mag_3.get(f'destino_{i}')]
-                    if origem_filtro in destinos_3:
-                        tem_terceiro = True
-                        break
-
-                if not tem_terceiro:
-                    seq = f"{origem_filtro} → {destino_filtro} → {dest_2} → {origem_filtro}"
-                    chave = (mag_1.get('nome'), mag_2.get('nome'), seq)
-                    if chave not in vistos:
-                        vistos.add(chave)
-                        pecas.append({
-                            'mag_1': mag_1,
-                            'mag_2': mag_2,
-                            'sequencia': seq,
-                            'falta': f"Magistrado do {dest_2} com destino {origem_filtro}",
-                            'nivel': 'expandida'
-                        })
-                        if len(pecas) >= limite:
-                            return pecas
-
-    # Cenário B: mag_1 da origem quer intermediário, mag_inter quer destino, falta destino→origem
-    for mag_1 in dados:
-        if mag_1.get('origem') != origem_filtro:
-            continue
-        destinos_1 = [mag_1.get(f'destino_{i}') for i in range(1, 4) if mag_1.get(f'destino_{i}')]
-
-        for intermediario in destinos_1:
-            if intermediario == destino_filtro:
-                continue
-
-            for mag_inter in dados:
-                if mag_inter.get('origem') != intermediario:
-                    continue
-                destinos_inter = [mag_inter.get(f'destino_{i}') for i in range(1, 4) if mag_inter.get(f'destino_{i}')]
-                if destino_filtro not in destinos_inter:
-                    continue
-
-                tem_terceiro = False
-                for mag_3 in dados:
-                    if mag_3.get('origem') != destino_filtro:
-                        continue
-                    destinos_3 = [mag_3.get(f'destino_{i}') for i in range(1, 4) if mag_3.get(f'destino_{i}')]
-                    if origem_filtro in destinos_3:
-                        tem_terceiro = True
-                        break
-
-                if not tem_terceiro:
-                    seq = f"{origem_filtro} → {intermediario} → {destino_filtro} → {origem_filtro}"
-                    chave = (mag_1.get('nome'), mag_inter.get('nome'), seq)
-                    if chave not in vistos:
-                        vistos.add(chave)
-                        pecas.append({
-                            'mag_1': mag_1,
-                            'mag_2': mag_inter,
-                            'sequencia': seq,
-                            'falta': f"Magistrado do {destino_filtro} com destino {origem_filtro}",
-                            'nivel': 'expandida'
-                        })
-                        if len(pecas) >= limite:
-                            return pecas
-
-    return pecas
-
-
-def buscar_quadrangulacao_func(origem_filtro, destino_filtro, dados, limite=30):
+# Pares aguardando e seu agrupamento por rota (uma vez por versão dos dados)
+@st.cache_resource(max_entries=4)
+def _pares_aguardando_cache(versao, _indice):
+    """Função interna cacheada; _indice não entra no hash, apenas a versão."""
+    sem_par = buscar_pares_aguardando(_indice)
+    return sem_par, agrupar_pares_por_rota(sem_par)
+
+
+# Feed pessoal: um por magistrado, compartilhado entre sessões e levado de versão em versão
+@st.cache_resource
+def _feeds_cache():
     """
-    Busca quadrangulações (ciclo de 4 magistrados) usando APENAS destino_1.
-    Ciclo: origem → A → B → destino → origem
-    Onde:
-    - mag_1 está na origem, destino_1 = A
-    - mag_2 está em A, destino_1 = B
-    - mag_3 está em B, destino_1 = destino
-    - mag_4 está no destino, destino_1 = origem
+    Feeds por id de magistrado, do menos ao mais recente, e a trava que os protege: o cache
+    é compartilhado entre sessões, que o consultam e atualizam em paralelo.
     """
-    quadrangulacoes = []
-    vistos = set()
-
-    for mag_1 in dados:
-        if mag_1.get('origem') != origem_filtro:
-            continue
-        tribunal_a = mag_1.get('destino_1')
-        if not tribunal_a or tribunal_a == destino_filtro or tribunal_a == origem_filtro:
-            continue
-
-        for mag_2 in dados:
-            if mag_2.get('origem') != tribunal_a:
-                continue
-            tribunal_b = mag_2.get('destino_1')
-            if not tribunal_b or tribunal_b == origem_filtro or tribunal_b == tribunal_a or tribunal_b == destino_filtro:
-                continue
-
-            for mag_3 in dados:
-                if mag_3.get('origem') != tribunal_b:
-                    continue
-                if mag_3.get('destino_1') != destino_filtro:
-                    continue
-
-                for mag_4 in dados:
-                    if mag_4.get('origem') != destino_filtro:
-                        continue
-                    if mag_4.get('destino_1') != origem_filtro:
-                        continue
-
-                    nomes = tuple(sorted(m.get('nome', '') for m in [mag_1, mag_2, mag_3, mag_4]))
-                    seq = f"{origem_filtro} → {tribunal_a} → {tribunal_b} → {destino_filtro} → {origem_filtro}"
-                    chave = (nomes, seq)
-
-                    if chave not in vistos:
-                        vistos.add(chave)
-                        quadrangulacoes.append({
-                            'magistrados': [mag_1, mag_2, mag_3, mag_4],
-                            'sequencia': seq,
-                            'tribunais': [origem_filtro, tribunal_a, tribunal_b, destino_filtro]
-                        })
-
-                        if len(quadrangulacoes) >= limite:
-                            return quadrangulacoes
-
-    return quadrangulacoes
-
-
-def pecas_faltantes_quadrangulacao(origem_filtro, destino_filtro, dados, limite=30):
+    return OrderedDict(), threading.Lock()
+
+def obter_feed(usuario, indice):
+    """Ciclos de 2 a 4 magistrados que incluem o usuário, atualizados para a versão do índice."""
+    feeds, trava = _feeds_cache()
+    with trava:
+        feed = feeds.get(usuario.get('id'))
+        if feed is None:
+            orcamento = OrcamentoBusca(prazo_segundos=PRAZO_BUSCA_SEGUNDOS)
+            feed = feeds[usuario.get('id')] = FeedMagistrado(indice, usuario, orcamento=orcamento)
+            while len(feeds) > FEEDS_MANTIDOS:
+                feeds.popitem(last=False)  # Descarta o feed usado há mais tempo
+        else:
+            feeds.move_to_end(usuario.get('id'))
+            feed.atualizar(indice)
+        return feed
+
+
+# Orçamento de tempo das buscas, com barra de progresso no lugar do spinner
+def orcamento_com_progresso(texto, orcamento=None):
     """
-    Encontra quadrangulações quase completas: 3 magistrados encaixam,
-    falta 1 para fechar o ciclo de 4. Apenas destino_1.
+    Cria (ou reaproveita, no "carregar mais") o orçamento da busca e liga o seu progresso
+    a um st.progress. Retorna (orcamento, barra); chame barra.empty() ao terminar.
     """
-    pecas = []
-    vistos = set()
-
-    # Cenário 1: mag_1(origem→A), mag_2(A→B), mag_3(B→destino), falta mag_4(destino→origem)
-    for mag_1 in dados:
-        if mag_1.get('origem') != origem_filtro:
-            continue
-        tribunal_a = mag_1.get('destino_1')
-        if not tribunal_a or tribunal_a == destino_filtro or tribunal_a == origem_filtro:
-            continue
-
-        for mag_2 in dados:
-            if mag_2.get('origem') != tribunal_a:
-                continue
-            tribunal_b = mag_2.get('destino_1')
-            if not tribunal_b or tribunal_b == origem_filtro or tribunal_b == tribunal_a or tribunal_b == destino_filtro:
-                continue
-
-            for mag_3 in dados:
-                if mag_3.get('origem') != tribunal_b:
-                    continue
-                if mag_3.get('destino_1') != destino_filtro:
-                    continue
-
-                # Verificar se existe mag_4(destino→origem)
-                tem_quarto = False
-                for mag_4 in dados:
-                    if mag_4.get('origem') != destino_filtro:
-                        continue
-                    if mag_4.get('destino_1') == origem_filtro:
-                        tem_quarto = True
-                        break
-
-                if not tem_quarto:
-                    seq = f"{origem_filtro} → {tribunal_a} → {tribunal_b} → {destino_filtro} → {origem_filtro}"
-                    chave = (mag_1.get('nome'), mag_2.get('nome'), mag_3.get('nome'), seq)
-                    if chave not in vistos:
-                        vistos.add(chave)
-                        pecas.append({
-                            'magistrados': [mag_1, mag_2, mag_3],
-                            'sequencia': seq,
-                            'falta': f"Magistrado do {destino_filtro} com destino {origem_filtro}",
-                            'posicao_faltante': 4
-                        })
-                        if len(pecas) >= limite:
-                            return pecas
-
-    # Cenário 2: mag_1(origem→A), mag_2(A→B), falta mag_3(B→destino), mag_4(destino→origem) existe
-    for mag_1 in dados:
-        if mag_1.get('origem') != origem_filtro:
-            continue
-        tribunal_a = mag_1.get('destino_1')
-        if not tribunal_a or tribunal_a == destino_filtro or tribunal_a == origem_filtro:
-            continue
-
-        for mag_2 in dados:
-            if mag_2.get('origem') != tribunal_a:
-                continue
-            tribunal_b = mag_2.get('destino_1')
-            if not tribunal_b or tribunal_b == origem_filtro or tribunal_b == tribunal_a or tribunal_b == destino_filtro:
-                continue
-
-            # Verificar se existe mag_3(B→destino)
-            tem_terceiro = False
-            for mag_3 in dados:
-                if mag_3.get('origem') != tribunal_b:
-                    continue
-                if mag_3.get('destino_1') == destino_filtro:
-                    tem_terceiro = True
-                    break
-
-            if not tem_terceiro:
-                # Verificar se existe mag_4(destino→origem) para confirmar que é quase completa
-                for mag_4 in dados:
-                    if mag_4.get('origem') != destino_filtro:
-                        continue
-                    if mag_4.get('destino_1') != origem_filtro:
-                        continue
-
-                    seq = f"{origem_filtro} → {tribunal_a} → {tribunal_b} → {destino_filtro} → {origem_filtro}"
-                    chave = (mag_1.get('nome'), mag_2.get('nome'), mag_4.get('nome'), seq)
-                    if chave not in vistos:
-                        vistos.add(chave)
-                        pecas.append({
-                            'magistrados': [mag_1, mag_2, mag_4],
-                            'sequencia': seq,
-                            'falta': f"Magistrado do {tribunal_b} com destino {destino_filtro}",
-                            'posicao_faltante': 3
-                        })
-                        if len(pecas) >= limite:
-                            return pecas
-
-    # Cenário 3: mag_1(origem→A), falta mag_2(A→B), mag_3(B→destino) e mag_4(destino→origem) existem
-    for mag_1 in dados:
-        if mag_1.get('origem') != origem_filtro:
-            continue
-        tribunal_a = mag_1.get('destino_1')
-        if not tribunal_a or tribunal_a == destino_filtro or tribunal_a == origem_filtro:
-            continue
-
-        # Para cada possível tribunal_b (origens no banco que não sejam origem, A ou destino)
-        tribunais_b_possiveis = set()
-        for m in dados:
-            o = m.get('origem')
-            if o and o != origem_filtro and o != tribunal_a and o != destino_filtro:
-                tribunais_b_possiveis.add(o)
-
-        for tribunal_b in tribunais_b_possiveis:
-            # Verificar se existe mag_2(A→B)
-            tem_segundo = False
-            for mag_2 in dados:
-                if mag_2.get('origem') != tribunal_a:
-                    continue
-                if mag_2.get('destino_1') == tribunal_b:
-                    tem_segundo = True
-                    break
-
-            if tem_segundo:
-                continue  # Se existe, não é peça faltante nesta posição
-
-            # Verificar se mag_3(B→destino) e mag_4(destino→origem) existem
-            tem_terceiro = False
-            mag_3_ref = None
-            for mag_3 in dados:
-                if mag_3.get('origem') != tribunal_b:
-                    continue
-                if mag_3.get('destino_1') == destino_filtro:
-                    tem_terceiro = True
-                    mag_3_ref = mag_3
-                    break
-
-            if not tem_terceiro:
-                continue
-
-            for mag_4 in dados:
-                if mag_4.get('origem') != destino_filtro:
-                    continue
-                if mag_4.get('destino_1') != origem_filtro:
-                    continue
-
-                seq = f"{origem_filtro} → {tribunal_a} → {tribunal_b} → {destino_filtro} → {origem_filtro}"
-                chave = (mag_1.get('nome'), mag_3_ref.get('nome'), mag_4.get('nome'), seq)
-                if chave not in vistos:
-                    vistos.add(chave)
-                    pecas.append({
-                        'magistrados': [mag_1, mag_3_ref, mag_4],
-                        'sequencia': seq,
-                        'falta': f"Magistrado do {tribunal_a} com destino {tribunal_b}",
-                        'posicao_faltante': 2
-                    })
-                    if len(pecas) >= limite:
-                        return pecas
-
-    return pecas
+    if orcamento is None:
+        orcamento = OrcamentoBusca(prazo_segundos=PRAZO_BUSCA_SEGUNDOS)
+    barra = st.progress(0.0, text=texto)
+
+    def _atualizar(fracao, explorados, total):
+        barra.progress(fracao, text=f"{texto} ({explorados:,} de ~{total:,} candidatos)".replace(",", "."))
+
+    orcamento.ao_progresso = _atualizar
+    return orcamento, barra
+
+
+def aviso_busca_incompleta(pode_continuar=True):
+    """Aviso padrão de resultados parciais (prazo da busca esgotado)."""
+    texto = f"⏱️ **Busca incompleta:** o limite de {PRAZO_BUSCA_SEGUNDOS}s foi atingido e os resultados acima são parciais."
+    if pode_continuar:
+        texto += " Use o botão **Carregar mais** para continuar de onde parou."
+    st.warning(texto)
 
 
 # Função para buscar novos cadastros
@@ -1088,6 +537,152 @@ def exibir_magistrado(magistrado, prioridade=None):
             cores = {1: "🟢", 2: "🟡", 3: "🔵"}
             st.write(f"{cores.get(prioridade, '⚪')} Prioridade {prioridade}")
 
+# Funções para exibir os resultados das buscas (um expander por resultado)
+def exibir_triangulacao(rotulo, tri):
+    emoji = "🔄" if tri['tipo'] == 'direta' else "🔺"
+    with st.expander(f"{emoji} {rotulo}: {tri['sequencia']}"):
+        if tri['tipo'] == 'direta':
+            st.success("🔄 **Permuta Direta Possível**")
+        else:
+            st.info("🔺 **Triangulação de 3 Magistrados**")
+            st.write("Operação coordenada entre três magistrados:")
+
+        st.write(f"**Sequência:** {tri['sequencia']}")
+        if 'pontuacao' in tri:
+            st.write(f"**Pontuação de compatibilidade:** {tri['pontuacao']} de {3 * len(tri['magistrados'])}")
+        st.write("**Magistrados envolvidos:**")
+        for mag in tri['magistrados']:
+            exibir_magistrado(mag)
+
+
+def _compartilhar_peca(peca, encaixados, tamanho_ciclo):
+    """Botão de compartilhar a peça faltante no WhatsApp."""
+    msg_whats = (
+        f"🧩 *Permutatum — {'Triangulação' if tamanho_ciclo == 3 else 'Quadrangulação'} quase completa*\n\n"
+        f"Sequência: *{peca['sequencia']}*\n"
+        f"⚠️ *{peca['falta']}*\n\n"
+        f"Já estão encaixados {encaixados} magistrados. "
+        f"Falta apenas 1 para fechar o ciclo{'' if tamanho_ciclo == 3 else ' de 4'}!\n\n"
+        f"Cadastre-se: 👉 https://permutatum.streamlit.app/"
+    )
+    link_wpp = gerar_link_whatsapp(msg_whats)
+    st.markdown(
+        f"""
+        <a href="{link_wpp}" target="_blank" style="
+            display: inline-block;
+            background-color: #25D366;
+            color: white;
+            padding: 8px 16px;
+            border-radius: 8px;
+            text-decoration: none;
+            font-size: 14px;
+            font-weight: 500;
+        ">📲 Compartilhar no WhatsApp</a>
+        """,
+        unsafe_allow_html=True,
+    )
+
+
+def _exibir_falta(peca):
+    st.markdown(
+        f"""
+        <div style="background-color: #fff3cd; border-radius: 8px; padding: 12px; border-left: 4px solid #ffc107; margin: 10px 0;">
+            <strong>⚠️ Falta:</strong> {peca['falta']}
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
+
+
+def exibir_peca_triangulacao(rotulo, peca):
+    with st.expander(f"🧩 {rotulo}: {peca['sequencia']}"):
+        st.write(f"**Sequência:** {peca['sequencia']}")
+        _exibir_falta(peca)
+        st.write("**Magistrados já encaixados:**")
+        exibir_magistrado(peca['mag_1'])
+        st.write("⬇️")
+        exibir_magistrado(peca['mag_2'])
+
+        # Botão compartilhar WhatsApp
+        _compartilhar_peca(peca, 2, 3)
+
+
+def exibir_peca_quadrangulacao(i, peca):
+    with st.expander(f"🧩 Quase completa {i}: {peca['sequencia']}"):
+        st.write(f"**Sequência:** {peca['sequencia']}")
+        _exibir_falta(peca)
+        st.write("**Magistrados já encaixados:**")
+        for j, mag in enumerate(peca['magistrados']):
+            exibir_magistrado(mag)
+            if j < len(peca['magistrados']) - 1:
+                st.write("⬇️")
+
+        # Botão compartilhar WhatsApp
+        _compartilhar_peca(peca, 3, 4)
+
+
+def exibir_rotacao(i, rotacao, tamanho):
+    if tamanho == 4:
+        titulo, emoji, nome = f"Quadrangulação {i}", "🔷", "Quadrangulação de 4 Magistrados"
+    else:
+        titulo, emoji, nome = f"Rotação {i}", "🔶", f"Rotação de {tamanho} Magistrados"
+    with st.expander(f"{emoji} {titulo}: {rotacao['sequencia']}"):
+        st.info(f"{emoji} **{nome}**")
+        if tamanho == 4:
+            st.write("Operação coordenada entre quatro magistrados:")
+        st.write(f"**Sequência:** {rotacao['sequencia']}")
+        if 'pontuacao' in rotacao:
+            st.write(f"**Pontuação de compatibilidade:** {rotacao['pontuacao']} de {3 * tamanho}")
+        st.write("**Magistrados envolvidos:**")
+        for j, mag in enumerate(rotacao['magistrados']):
+            exibir_magistrado(mag)
+            if j < len(rotacao['magistrados']) - 1:
+                st.write("⬇️")
+        st.success(f"💡 **Coordenação necessária:** Todos os {tamanho} magistrados precisam concordar simultaneamente")
+
+
+def exibir_paginado(chave, resultados, exibir, tamanho, rotulo_mais, texto_busca):
+    """
+    Exibe os resultados já carregados e transmite a página pendente (nova busca ou
+    "carregar mais") direto na tela: cada resultado aparece assim que o cursor o encontra,
+    sem esperar a página inteira nem um st.rerun. Usa st.session_state[f"{chave}_cursor"],
+    f"{chave}_tem_mais" e f"{chave}_pendente" (tamanho da página a buscar nesta execução).
+    """
+    for i, item in enumerate(resultados, 1):
+        exibir(i, item)
+    novos = st.container()
+    avisos = st.container()
+    slot_mais = st.empty()
+
+    cursor = st.session_state.get(f"{chave}_cursor")
+    pendente = st.session_state.pop(f"{chave}_pendente", 0)
+
+    def _botao_mais():
+        with slot_mais.container():
+            st.markdown("---")
+            return st.button(rotulo_mais, use_container_width=True, key=f"btn_{chave}_mais_{cursor.entregues}")
+
+    if cursor is not None and not pendente and st.session_state.get(f"{chave}_tem_mais", False):
+        if _botao_mais():
+            pendente = tamanho
+
+    if cursor is not None and pendente:
+        slot_mais.empty()
+        with novos:
+            _, barra = orcamento_com_progresso(texto_busca, cursor.orcamento)
+            for item in cursor.iterar(pendente):
+                resultados.append(item)
+                exibir(len(resultados), item)
+            barra.empty()
+        st.session_state[f"{chave}_tem_mais"] = cursor.tem_mais
+        if cursor.tem_mais:
+            _botao_mais()
+
+    if cursor is not None and cursor.incompleta:
+        with avisos:
+            aviso_busca_incompleta()
+
+
 # Interface principal
 st.title("🔍 Busca de Permutas")
 st.write("Esta aplicação é gratuita e colaborativa e, tendo em vista que o link para cadastro e acesso foi fornecido individualmente a cada magistrado(a), os dados aqui presentes limitam-se ao fim de facilitar encontros de permutantes. Esta aplicação é privada e a partir do cadastro dos dados, o(a) magistrado(a) assume a responsabilidade.")
@@ -1153,6 +748,8 @@ if "quad_resultados" not in st.session_state:
     st.session_state["quad_resultados"] = None
 if "pecas_quad" not in st.session_state:
     st.session_state["pecas_quad"] = None
+if "rot_resultados" not in st.session_state:
+    st.session_state["rot_resultados"] = None
 
 if "solicitacao_aprovada" not in st.session_state:
     st.session_state["solicitacao_aprovada"] = None
@@ -1248,35 +845,38 @@ if not st.session_state.usuario_autenticado:
                                     "status": "cadastrado"
                                 }).eq("id", solicitacao.get('id')).execute()
 
-                                # Gerar notificações de match
+                                # Gerar notificações de match (só as permutas diretas criadas por este cadastro),
+                                # com o delta calculado sobre o índice já em cache, antes de descartá-lo
                                 try:
-                                    todos = supabase.table("magistrados").select("*").eq("status", "ativo").execute()
-                                    if todos.data:
-                                        for mag in todos.data:
-                                            if mag.get('email', '').lower() == email_cadastro.lower():
-                                                continue
-                                            mag_origem = mag.get('origem', '')
-                                            mag_destino_1 = mag.get('destino_1', '')
-                                            novo_origem = dados_magistrado.get('origem', '')
-                                            novo_destino_1 = dados_magistrado.get('destino_1', '')
-
-                                            if mag_origem == novo_destino_1 and mag_destino_1 == novo_origem:
-                                                supabase.table("notificacoes").insert({
-                                                    "email_destino": mag.get('email', ''),
-                                                    "tipo": "permuta_direta",
-                                                    "mensagem": f"Novo match! {dados_magistrado['nome']} ({novo_origem}) quer ir para {novo_destino_1} — permuta direta possível!",
-                                                    "detalhes": f"Confira na aba 'Busca de Permuta' selecionando {mag_origem} → {novo_origem}."
-                                                }).execute()
-
-                                                supabase.table("notificacoes").insert({
-                                                    "email_destino": email_cadastro,
-                                                    "tipo": "permuta_direta",
-                                                    "mensagem": f"Boa notícia! {mag.get('nome', '')} ({mag_origem}) quer ir para {mag_destino_1} — permuta direta possível!",
-                                                    "detalhes": f"Confira na aba 'Busca de Permuta' selecionando {novo_origem} → {novo_destino_1}."
-                                                }).execute()
+                                    novo_registro = {**dados_magistrado, **response.data[0]}
+                                    novo_origem = novo_registro.get('origem', '')
+                                    novo_destino_1 = novo_registro.get('destino_1', '')
+                                    delta = calcular_delta(obter_indice(*carregar_dados_versionados()), None, novo_registro, tamanhos=(2,), prioridades=(1,))
+
+                                    for ciclo in delta['criados']:
+                                        mag = ciclo['magistrados'][1]
+                                        mag_origem = mag.get('origem', '')
+                                        mag_destino_1 = mag.get('destino_1', '')
+
+                                        supabase.table("notificacoes").insert({
+                                            "email_destino": mag.get('email', ''),
+                                            "tipo": "permuta_direta",
+                                            "mensagem": f"Novo match! {dados_magistrado['nome']} ({novo_origem}) quer ir para {novo_destino_1} — permuta direta possível!",
+                                            "detalhes": f"Confira na aba 'Busca de Permuta' selecionando {mag_origem} → {novo_origem}."
+                                        }).execute()
+
+                                        supabase.table("notificacoes").insert({
+                                            "email_destino": email_cadastro,
+                                            "tipo": "permuta_direta",
+                                            "mensagem": f"Boa notícia! {mag.get('nome', '')} ({mag_origem}) quer ir para {mag_destino_1} — permuta direta possível!",
+                                            "detalhes": f"Confira na aba 'Busca de Permuta' selecionando {novo_origem} → {novo_destino_1}."
+                                        }).execute()
                                 except:
                                     pass
 
+                                # Base recarregada uma única vez; a mesma versão serve à próxima execução
+                                st.cache_data.clear()
+
                                 st.success("🎉 Cadastro finalizado com sucesso!")
                                 st.balloons()
                                 st.info("Agora faça login com seu email para acessar o sistema.")
@@ -1284,7 +884,6 @@ if not st.session_state.usuario_autenticado:
                                 # Limpar session state
                                 st.session_state["solicitacao_aprovada"] = None
                                 st.session_state["email_novo_cadastro"] = None
-                                st.cache_data.clear()
 
                                 import time
                                 time.sleep(3)
@@ -1332,7 +931,8 @@ if not st.session_state.usuario_autenticado:
 else:
     # Usuário autenticado - mostrar sistema completo
     usuario = st.session_state.usuario_autenticado
-    dados = carregar_dados()
+    versao_dados, dados = carregar_dados_versionados()
+    indice = obter_indice(versao_dados, dados)
 
     # ── Verificar notificações ──
     notificacoes = buscar_notificacoes(usuario.get('email', ''))
@@ -1370,6 +970,23 @@ else:
 
         st.markdown("---")
 
+    # ── Feed pessoal: rotações que já fecham com o usuário ──
+    feed = obter_feed(usuario, indice)
+    if feed.total:
+        rotulo_feed = "rotação possível" if feed.total == 1 else "rotações possíveis"
+        st.subheader(f"🎯 Suas {feed.total} {rotulo_feed}")
+        st.caption("Permutas diretas, triangulações e quadrangulações que incluem você, das mais compatíveis às menos.")
+        if feed.incompleta:
+            st.caption("⏳ Lista parcial: o tempo de cálculo acabou antes de ordenar todas as rotações.")
+        exibidos = len(feed.ciclos) if st.session_state.get("feed_completo") else FEED_EXIBIDOS
+        for i, ciclo in enumerate(feed.ciclos[:exibidos], 1):
+            exibir_rotacao(i, ciclo, len(ciclo['magistrados']))
+        if len(feed.ciclos) > exibidos:
+            if st.button(f"Ver mais ({len(feed.ciclos) - exibidos} de {len(feed.ciclos)})", key="btn_feed_completo"):
+                st.session_state.feed_completo = True
+                st.rerun()
+        st.markdown("---")
+
     # Gráficos e estatísticas
     gerar_graficos(dados)
     
@@ -1415,13 +1032,20 @@ else:
                             <strong>🔷 Buscar Quadrangulação</strong><br>
                             Permutas indiretas entre 4 magistrados em ciclo.
                             Ex: TJGO → TJBA → TJSP → TJRJ → TJGO.
-                            Apenas destinos prioritários.
+                            Destinos prioritários, ou os destinos 1, 2 e 3 se marcado.
                         </td>
                         <td style="padding: 8px 12px; vertical-align: top; width: 50%;" colspan="2">
                             <strong>🧩 Peças Faltantes (quadrangulação)</strong><br>
                             Quadrangulações quase completas: 3 magistrados encaixados, falta 1 para fechar o ciclo de 4.
                         </td>
                     </tr>
+                    <tr>
+                        <td style="padding: 8px 12px; vertical-align: top;" colspan="3">
+                            <strong>🔶 Rotações de 5 ou 6 magistrados</strong><br>
+                            Ciclos maiores, quando não há permuta, triangulação ou quadrangulação.
+                            Ex: TJGO → TJBA → TJSP → TJRJ → TJPR → TJGO.
+                        </td>
+                    </tr>
                 </table>
             </div>
             """,
@@ -1446,6 +1070,50 @@ else:
                 key="sel_destino_busca"
             )
 
+        col_e1, col_e2 = st.columns(2)
+
+        with col_e1:
+            regra_entrancia = st.selectbox(
+                "Compatibilidade de entrância:",
+                options=list(ROTULOS_REGRA_ENTRANCIA),
+                format_func=ROTULOS_REGRA_ENTRANCIA.get,
+                help="Restringe as buscas a magistrados de entrâncias compatíveis",
+                key="sel_regra_entrancia"
+            )
+
+        with col_e2:
+            entrancia_referencia = st.selectbox(
+                "Entrância de referência:",
+                options=ENTRANCIAS,
+                index=ENTRANCIAS.index(usuario.get('entrancia')) if usuario.get('entrancia') in ENTRANCIAS else 0,
+                disabled=regra_entrancia == "qualquer",
+                key="sel_entrancia_referencia"
+            )
+
+        # As buscas percorrem só a partição da base compatível com a entrância escolhida
+        regra = REGRAS_ENTRANCIA[regra_entrancia]
+        indice_busca = indice_compativel(indice, regra, grupo_entrancia(entrancia_referencia, regra))
+
+        # Contagem instantânea do que existe para o par selecionado
+        if origem_filtro and destino_filtro and origem_filtro != destino_filtro:
+            contagem_par = contagem_do_par(obter_contagens(indice_busca), origem_filtro, destino_filtro)
+            st.caption(
+                f"📊 Nesta base: **{contagem_par['diretas']}** permutas diretas, "
+                f"**{contagem_par['triangulacoes']}** triangulações e "
+                f"**{contagem_par['quadrangulacoes']}** quadrangulações possíveis "
+                f"(destinos 1, 2 e 3)."
+            )
+            menor = menor_ciclo(indice_busca, origem_filtro, destino_filtro)
+            menor_prioritario = menor_ciclo(indice_busca, origem_filtro, destino_filtro, (1,))
+            if menor is None:
+                st.caption(f"🧭 Nenhuma rotação, de qualquer tamanho, fecha {origem_filtro} → {destino_filtro} nesta base.")
+            else:
+                st.caption(
+                    f"🧭 A menor rotação possível para {origem_filtro} → {destino_filtro} tem **{menor}** magistrados"
+                    + (f" ({menor_prioritario} só com destinos 1)." if menor_prioritario and menor_prioritario != menor else ".")
+                    + ("" if menor_prioritario else " Só com destinos 1, nenhuma fecha.")
+                )
+
         # Três botões lado a lado
         col_b1, col_b2, col_b3 = st.columns(3)
 
@@ -1458,7 +1126,7 @@ else:
         with col_b3:
             buscar_pecas = st.button("🧩 Peças faltantes", use_container_width=True, key="btn_buscar_pecas")
 
-        col_b4, col_b5 = st.columns(2)
+        col_b4, col_b5, col_b9 = st.columns([2, 2, 1])
 
         with col_b4:
             btn_buscar_quad = st.button("🔷 Buscar Quadrangulação", use_container_width=True, type="primary", key="btn_buscar_quad")
@@ -1466,6 +1134,43 @@ else:
         with col_b5:
             btn_buscar_pecas_quad = st.button("🧩 Peças faltantes (quadrangulação)", use_container_width=True, key="btn_buscar_pecas_quad")
 
+        with col_b9:
+            quad_expandida = st.checkbox(
+                "Incluir destinos 2 e 3",
+                value=False,
+                key="chk_quad_expandida"
+            )
+
+        col_b6, col_b7, col_b8 = st.columns(3)
+
+        with col_b6:
+            tamanho_rotacao = st.selectbox(
+                "Rotação com mais magistrados:",
+                options=[5, 6],
+                format_func=lambda x: f"{x} magistrados",
+                key="sel_tamanho_rotacao"
+            )
+
+        with col_b7:
+            rotacao_expandida = st.checkbox(
+                "Incluir destinos 2 e 3",
+                value=False,
+                key="chk_rotacao_expandida"
+            )
+
+        with col_b8:
+            btn_buscar_rotacao = st.button("🔶 Buscar rotação", use_container_width=True, type="primary", key="btn_buscar_rotacao")
+
+        btn_busca_aberta = st.button(
+            "🧭 Busca aberta (só origem: para onde posso ir · só destino: quem pode vir)",
+            use_container_width=True, key="btn_busca_aberta"
+        )
+
+        def busca_impossivel(tamanho_max, prioridades=(1, 2, 3)):
+            """Indica, pelas distâncias entre tribunais, que nenhum ciclo de até `tamanho_max` existe."""
+            menor = menor_ciclo(indice_busca, origem_filtro, destino_filtro, prioridades)
+            return menor is None or menor > tamanho_max
+
         # Validação comum
         def validar_selecao():
             if not origem_filtro or not destino_filtro:
@@ -1478,6 +1183,116 @@ else:
 
         st.markdown("---")
 
+        # Uma busca por par substitui o resultado da busca aberta (exibido no fim da aba)
+        if buscar_permuta or buscar_triangulacao or buscar_pecas or btn_buscar_quad or btn_buscar_pecas_quad or btn_buscar_rotacao:
+            st.session_state["aberta_resultados"] = None
+
+        # ═══════════════════════════════════
+        # BUSCA ABERTA (um só tribunal)
+        # ═══════════════════════════════════
+        if btn_busca_aberta:
+            if bool(origem_filtro) == bool(destino_filtro):
+                st.warning("Para a busca aberta, selecione apenas a origem ou apenas o destino.")
+            else:
+                st.session_state["tri_etapa_busca"] = 0
+                st.session_state["tri_prio_busca"] = []
+                st.session_state["tri_exp_busca"] = []
+                st.session_state["pecas_etapa"] = 0
+                st.session_state["pecas_prio"] = []
+                st.session_state["pecas_exp"] = []
+                st.session_state["quad_resultados"] = None
+                st.session_state["pecas_quad"] = None
+                st.session_state["rot_resultados"] = None
+                sentido = "saida" if origem_filtro else "chegada"
+                tribunal_aberto = origem_filtro or destino_filtro
+                orcamento, barra = orcamento_com_progresso(f"Buscando ciclos de até 4 magistrados ({tribunal_aberto})...")
+                st.session_state["aberta_resultados"] = busca_aberta(
+                    tribunal_aberto, indice_busca, sentido, tamanho_max=4, limite_por_grupo=5, orcamento=orcamento
+                )
+                barra.empty()
+                st.session_state["aberta_incompleta"] = orcamento.incompleta
+                st.session_state["aberta_tribunal"] = tribunal_aberto
+                st.session_state["aberta_sentido"] = sentido
+
+        # Buscas de ciclos maiores: só preparam o cursor na sessão; os resultados são transmitidos
+        # na seção de exibição. Ficam antes das seções porque limpam as de triangulação e peças.
+
+        # ═══════════════════════════════════
+        # BUSCAR QUADRANGULAÇÃO
+        # ═══════════════════════════════════
+        if btn_buscar_quad:
+            if validar_selecao():
+                st.session_state["tri_etapa_busca"] = 0
+                st.session_state["tri_prio_busca"] = []
+                st.session_state["tri_exp_busca"] = []
+                st.session_state["pecas_etapa"] = 0
+                st.session_state["pecas_prio"] = []
+                st.session_state["pecas_exp"] = []
+                st.session_state["rot_resultados"] = None
+                orcamento = OrcamentoBusca(prazo_segundos=PRAZO_BUSCA_SEGUNDOS)
+                if busca_impossivel(4, (1, 2, 3) if quad_expandida else (1,)):
+                    st.session_state["quad_cursor"] = None  # Nada a buscar: a menor rotação é maior que 4
+                else:
+                    st.session_state["quad_cursor"] = CursorBusca(
+                        gerar_quadrangulacoes(origem_filtro, destino_filtro, indice_busca, quad_expandida, orcamento), orcamento
+                    )
+                st.session_state["quad_resultados"] = []
+                st.session_state["quad_expandida"] = quad_expandida
+                st.session_state["quad_pendente"] = 30
+                st.session_state["quad_origem"] = origem_filtro
+                st.session_state["quad_destino"] = destino_filtro
+
+        # ═══════════════════════════════════
+        # PEÇAS FALTANTES QUADRANGULAÇÃO
+        # ═══════════════════════════════════
+        if btn_buscar_pecas_quad:
+            if validar_selecao():
+                st.session_state["tri_etapa_busca"] = 0
+                st.session_state["tri_prio_busca"] = []
+                st.session_state["tri_exp_busca"] = []
+                st.session_state["pecas_etapa"] = 0
+                st.session_state["pecas_prio"] = []
+                st.session_state["pecas_exp"] = []
+                st.session_state["rot_resultados"] = None
+                orcamento = OrcamentoBusca(prazo_segundos=PRAZO_BUSCA_SEGUNDOS)
+                st.session_state["pecas_quad_cursor"] = CursorBusca(
+                    gerar_pecas_faltantes_quadrangulacao(
+                        origem_filtro, destino_filtro, indice_busca, orcamento=orcamento, expandida=quad_expandida
+                    ), orcamento
+                )
+                st.session_state["pecas_quad"] = []
+                st.session_state["pecas_quad_expandida"] = quad_expandida
+                st.session_state["pecas_quad_pendente"] = 30
+                st.session_state["pecas_quad_origem"] = origem_filtro
+                st.session_state["pecas_quad_destino"] = destino_filtro
+
+        # ═══════════════════════════════════
+        # BUSCAR ROTAÇÃO DE 5 OU 6
+        # ═══════════════════════════════════
+        if btn_buscar_rotacao:
+            if validar_selecao():
+                st.session_state["tri_etapa_busca"] = 0
+                st.session_state["tri_prio_busca"] = []
+                st.session_state["tri_exp_busca"] = []
+                st.session_state["pecas_etapa"] = 0
+                st.session_state["pecas_prio"] = []
+                st.session_state["pecas_exp"] = []
+                st.session_state["quad_resultados"] = None
+                st.session_state["pecas_quad"] = None
+                orcamento = OrcamentoBusca(prazo_segundos=PRAZO_BUSCA_SEGUNDOS)
+                if busca_impossivel(tamanho_rotacao, (1, 2, 3) if rotacao_expandida else (1,)):
+                    st.session_state["rot_cursor"] = None
+                else:
+                    st.session_state["rot_cursor"] = CursorBusca(gerar_rotacoes(
+                        origem_filtro, destino_filtro, indice_busca, tamanho_rotacao,
+                        expandida=rotacao_expandida, orcamento=orcamento
+                    ), orcamento)
+                st.session_state["rot_resultados"] = []
+                st.session_state["rot_pendente"] = 30
+                st.session_state["rot_origem"] = origem_filtro
+                st.session_state["rot_destino"] = destino_filtro
+                st.session_state["rot_tamanho"] = tamanho_rotacao
+
         # ═══════════════════════════════════
         # BUSCAR PERMUTA (permutas diretas)
         # ═══════════════════════════════════
@@ -1489,10 +1304,17 @@ else:
                 st.session_state["tri_exp_busca"] = []
                 st.session_state["quad_resultados"] = None
                 st.session_state["pecas_quad"] = None
+                st.session_state["rot_resultados"] = None
 
-                permutas_diretas, _ = busca_livre_inteligente(origem_filtro, destino_filtro, dados)
+                orcamento, barra = orcamento_com_progresso("Buscando permutas diretas...")
+                permutas_diretas, _ = busca_livre_inteligente(
+                    origem_filtro, destino_filtro, indice_busca, orcamento=orcamento, incluir_triangulacoes=False
+                )
+                barra.empty()
 
                 st.subheader("🔄 Permutas Diretas Encontradas")
+                if orcamento.incompleta:
+                    aviso_busca_incompleta(pode_continuar=False)
                 if permutas_diretas:
                     st.success(f"Encontradas **{len(permutas_diretas)}** permutas diretas possíveis!")
 
@@ -1531,16 +1353,22 @@ else:
             if validar_selecao():
                 st.session_state["quad_resultados"] = None
                 st.session_state["pecas_quad"] = None
-                with st.spinner("Buscando triangulações prioritárias (destino 1)..."):
-                    resultado = triangular_prioritarias(origem_filtro, destino_filtro, dados)
-                    st.session_state["tri_prio_busca"] = resultado
-                    st.session_state["tri_exp_busca"] = []
-                    st.session_state["tri_tem_mais_busca"] = False
-                    st.session_state["tri_lote_busca"] = 1
-                    st.session_state["tri_etapa_busca"] = 1
-                    st.session_state["tri_origem_busca"] = origem_filtro
-                    st.session_state["tri_destino_busca"] = destino_filtro
-                    st.rerun()
+                st.session_state["rot_resultados"] = None
+                if busca_impossivel(3, (1,)):
+                    resultado, incompleta = [], False
+                else:
+                    orcamento, barra = orcamento_com_progresso("Buscando triangulações prioritárias (destino 1)...")
+                    resultado = triangular_prioritarias(origem_filtro, destino_filtro, indice_busca, orcamento=orcamento)
+                    barra.empty()
+                    incompleta = orcamento.incompleta
+                st.session_state["tri_prio_busca"] = resultado
+                st.session_state["tri_prio_incompleta"] = incompleta
+                st.session_state["tri_exp_busca"] = []
+                st.session_state["tri_tem_mais"] = False
+                st.session_state["tri_cursor"] = None
+                st.session_state["tri_etapa_busca"] = 1
+                st.session_state["tri_origem_busca"] = origem_filtro
+                st.session_state["tri_destino_busca"] = destino_filtro
 
         # ── Exibir resultados de triangulação (persistentes via session_state) ──
         if st.session_state.get("tri_etapa_busca", 0) >= 1:
@@ -1556,76 +1384,46 @@ else:
                 st.success(f"🎯 **{len(prioritarias)}** triangulações prioritárias (apenas destino 1)")
 
                 for i, tri in enumerate(prioritarias, 1):
-                    emoji = "🔄" if tri['tipo'] == 'direta' else "🔺"
-                    with st.expander(f"{emoji} Prioritária {i}: {tri['sequencia']}"):
-                        if tri['tipo'] == 'direta':
-                            st.success("🔄 **Permuta Direta Possível**")
-                        else:
-                            st.info("🔺 **Triangulação de 3 Magistrados**")
-                            st.write("Operação coordenada entre três magistrados:")
-
-                        st.write(f"**Sequência:** {tri['sequencia']}")
-                        st.write("**Magistrados envolvidos:**")
-                        for mag in tri['magistrados']:
-                            exibir_magistrado(mag)
+                    exibir_triangulacao(f"Prioritária {i}", tri)
             else:
                 st.warning("Nenhuma triangulação prioritária encontrada (destino 1).")
+            if st.session_state.get("tri_prio_incompleta", False):
+                aviso_busca_incompleta(pode_continuar=False)
 
             st.markdown("---")
 
             # Etapa 2: Expandidas
             if st.session_state.get("tri_etapa_busca", 0) == 1:
-                st.write("Expandir a busca para incluir destinos 1, 2 e 3?")
-                if st.button("🔍 Buscar mais triangulações", use_container_width=True, key="btn_tri_exp_busca"):
-                    with st.spinner("Expandindo busca (limitado a 50)..."):
-                        resultado, tem_mais = triangular_expandidas(
-                            origem_tri, destino_tri, dados,
-                            limite=50,
-                            ja_encontradas=prioritarias
-                        )
-                        st.session_state["tri_exp_busca"] = resultado
-                        st.session_state["tri_tem_mais_busca"] = tem_mais
-                        st.session_state["tri_etapa_busca"] = 2
-                        st.rerun()
+                slot_expandir = st.empty()
+                with slot_expandir.container():
+                    st.write("Expandir a busca para incluir destinos 1, 2 e 3?")
+                    expandir = st.button("🔍 Buscar mais triangulações", use_container_width=True, key="btn_tri_exp_busca")
+                if expandir:
+                    slot_expandir.empty()
+                    orcamento = OrcamentoBusca(prazo_segundos=PRAZO_BUSCA_SEGUNDOS)
+                    # O cursor fica na sessão: "carregar mais" continua de onde parou
+                    st.session_state["tri_cursor"] = CursorBusca(gerar_triangulacoes_expandidas(
+                        origem_tri, destino_tri, indice_busca,
+                        ja_encontradas=prioritarias, orcamento=orcamento
+                    ), orcamento)
+                    st.session_state["tri_exp_busca"] = []
+                    st.session_state["tri_pendente"] = 50
+                    st.session_state["tri_etapa_busca"] = 2
 
             if st.session_state.get("tri_etapa_busca", 0) >= 2:
-                expandidas = st.session_state.get("tri_exp_busca", [])
+                expandidas = st.session_state.setdefault("tri_exp_busca", [])
+                resumo_exp = st.empty()
 
-                if expandidas:
-                    st.success(f"🔍 **{len(expandidas)}** triangulações adicionais (destinos 1, 2 e 3)")
-
-                    for i, tri in enumerate(expandidas, 1):
-                        emoji = "🔄" if tri['tipo'] == 'direta' else "🔺"
-                        with st.expander(f"{emoji} Adicional {i}: {tri['sequencia']}"):
-                            if tri['tipo'] == 'direta':
-                                st.success("🔄 **Permuta Direta Possível**")
-                            else:
-                                st.info("🔺 **Triangulação de 3 Magistrados**")
-                                st.write("Operação coordenada entre três magistrados:")
+                # Etapa 3: resultados transmitidos conforme encontrados, com "carregar mais"
+                exibir_paginado(
+                    "tri", expandidas, lambda i, tri: exibir_triangulacao(f"Adicional {i}", tri),
+                    50, "📥 Carregar mais 50 triangulações", "Expandindo busca (limitado a 50)...",
+                )
 
-                            st.write(f"**Sequência:** {tri['sequencia']}")
-                            st.write("**Magistrados envolvidos:**")
-                            for mag in tri['magistrados']:
-                                exibir_magistrado(mag)
+                if expandidas:
+                    resumo_exp.success(f"🔍 **{len(expandidas)}** triangulações adicionais (destinos 1, 2 e 3)")
                 else:
-                    st.info("Nenhuma triangulação adicional encontrada.")
-
-                # Etapa 3: Carregar mais
-                if st.session_state.get("tri_tem_mais_busca", False):
-                    st.markdown("---")
-                    lote = st.session_state.get("tri_lote_busca", 1)
-                    if st.button("📥 Carregar mais 50 triangulações", use_container_width=True, key=f"btn_tri_mais_busca_{lote}"):
-                        with st.spinner("Carregando mais..."):
-                            todas_anteriores = prioritarias + expandidas
-                            novas, tem_mais = triangular_expandidas(
-                                origem_tri, destino_tri, dados,
-                                limite=50 * (lote + 1),
-                                ja_encontradas=todas_anteriores
-                            )
-                            st.session_state["tri_exp_busca"].extend(novas)
-                            st.session_state["tri_tem_mais_busca"] = tem_mais
-                            st.session_state["tri_lote_busca"] = lote + 1
-                            st.rerun()
+                    resumo_exp.info("Nenhuma triangulação adicional encontrada.")
 
             # Resumo total
             total = len(st.session_state.get("tri_prio_busca", [])) + len(st.session_state.get("tri_exp_busca", []))
@@ -1638,8 +1436,9 @@ else:
                 st.session_state["tri_etapa_busca"] = 0
                 st.session_state["tri_prio_busca"] = []
                 st.session_state["tri_exp_busca"] = []
-                st.session_state["tri_tem_mais_busca"] = False
-                st.session_state["tri_lote_busca"] = 1
+                st.session_state["tri_tem_mais"] = False
+                st.session_state["tri_cursor"] = None
+                st.session_state["tri_prio_incompleta"] = False
                 st.rerun()
 
         # ═══════════════════════════════════
@@ -1649,14 +1448,18 @@ else:
             if validar_selecao():
                 st.session_state["quad_resultados"] = None
                 st.session_state["pecas_quad"] = None
-                with st.spinner("Buscando peças faltantes prioritárias (destino 1)..."):
-                    resultado = pecas_faltantes_prioritarias(origem_filtro, destino_filtro, dados)
-                    st.session_state["pecas_prio"] = resultado
-                    st.session_state["pecas_exp"] = []
-                    st.session_state["pecas_etapa"] = 1
-                    st.session_state["pecas_origem"] = origem_filtro
-                    st.session_state["pecas_destino"] = destino_filtro
-                    st.rerun()
+                st.session_state["rot_resultados"] = None
+                orcamento, barra = orcamento_com_progresso("Buscando peças faltantes prioritárias (destino 1)...")
+                resultado = pecas_faltantes_prioritarias(origem_filtro, destino_filtro, indice_busca, orcamento=orcamento)
+                barra.empty()
+                st.session_state["pecas_prio"] = resultado
+                st.session_state["pecas_prio_incompleta"] = orcamento.incompleta
+                st.session_state["pecas_exp"] = []
+                st.session_state["pecas_cursor"] = None
+                st.session_state["pecas_tem_mais"] = False
+                st.session_state["pecas_etapa"] = 1
+                st.session_state["pecas_origem"] = origem_filtro
+                st.session_state["pecas_destino"] = destino_filtro
 
         # ── Exibir resultados de peças faltantes ──
         if st.session_state.get("pecas_etapa", 0) >= 1:
@@ -1672,115 +1475,45 @@ else:
                 st.success(f"🎯 **{len(prio)}** triangulações quase completas (apenas destino 1)")
 
                 for i, peca in enumerate(prio, 1):
-                    with st.expander(f"🧩 Prioritária {i}: {peca['sequencia']}"):
-                        st.write(f"**Sequência:** {peca['sequencia']}")
-                        st.markdown(
-                            f"""
-                            <div style="background-color: #fff3cd; border-radius: 8px; padding: 12px; border-left: 4px solid #ffc107; margin: 10px 0;">
-                                <strong>⚠️ Falta:</strong> {peca['falta']}
-                            </div>
-                            """,
-                            unsafe_allow_html=True,
-                        )
-                        st.write("**Magistrados já encaixados:**")
-                        exibir_magistrado(peca['mag_1'])
-                        st.write("⬇️")
-                        exibir_magistrado(peca['mag_2'])
-
-                        # Botão compartilhar WhatsApp
-                        msg_whats = (
-                            f"🧩 *Permutatum — Triangulação quase completa*\n\n"
-                            f"Sequência: *{peca['sequencia']}*\n"
-                            f"⚠️ *{peca['falta']}*\n\n"
-                            f"Já estão encaixados 2 magistrados. "
-                            f"Falta apenas 1 para fechar o ciclo!\n\n"
-                            f"Cadastre-se: 👉 https://permutatum.streamlit.app/"
-                        )
-                        link_wpp = gerar_link_whatsapp(msg_whats)
-                        st.markdown(
-                            f"""
-                            <a href="{link_wpp}" target="_blank" style="
-                                display: inline-block;
-                                background-color: #25D366;
-                                color: white;
-                                padding: 8px 16px;
-                                border-radius: 8px;
-                                text-decoration: none;
-                                font-size: 14px;
-                                font-weight: 500;
-                            ">📲 Compartilhar no WhatsApp</a>
-                            """,
-                            unsafe_allow_html=True,
-                        )
+                    exibir_peca_triangulacao(f"Prioritária {i}", peca)
             else:
                 st.warning("Nenhuma peça faltante prioritária encontrada (destino 1).")
+            if st.session_state.get("pecas_prio_incompleta", False):
+                aviso_busca_incompleta(pode_continuar=False)
 
             st.markdown("---")
 
             # Botão para expandir busca
             if st.session_state.get("pecas_etapa", 0) == 1:
-                st.write("Expandir busca para incluir destinos 1, 2 e 3?")
-                if st.button("🔍 Buscar mais peças faltantes", use_container_width=True, key="btn_pecas_exp"):
-                    with st.spinner("Expandindo busca (limitado a 50)..."):
-                        resultado = pecas_faltantes_expandidas(
-                            origem_p, destino_p, dados,
-                            limite=50,
-                            ja_encontradas=prio
-                        )
-                        st.session_state["pecas_exp"] = resultado
-                        st.session_state["pecas_etapa"] = 2
-                        st.rerun()
+                slot_expandir = st.empty()
+                with slot_expandir.container():
+                    st.write("Expandir busca para incluir destinos 1, 2 e 3?")
+                    expandir = st.button("🔍 Buscar mais peças faltantes", use_container_width=True, key="btn_pecas_exp")
+                if expandir:
+                    slot_expandir.empty()
+                    orcamento = OrcamentoBusca(prazo_segundos=PRAZO_BUSCA_SEGUNDOS)
+                    st.session_state["pecas_cursor"] = CursorBusca(gerar_pecas_faltantes_expandidas(
+                        origem_p, destino_p, indice_busca,
+                        ja_encontradas=prio, orcamento=orcamento
+                    ), orcamento)
+                    st.session_state["pecas_exp"] = []
+                    st.session_state["pecas_pendente"] = 50
+                    st.session_state["pecas_etapa"] = 2
 
-            # Etapa 2: Expandidas
+            # Etapa 2: Expandidas, transmitidas conforme encontradas
             if st.session_state.get("pecas_etapa", 0) >= 2:
-                exp = st.session_state.get("pecas_exp", [])
+                exp = st.session_state.setdefault("pecas_exp", [])
+                resumo_exp = st.empty()
+
+                exibir_paginado(
+                    "pecas", exp, lambda i, peca: exibir_peca_triangulacao(f"Adicional {i}", peca),
+                    50, "📥 Carregar mais 50 peças faltantes", "Expandindo busca (limitado a 50)...",
+                )
 
                 if exp:
-                    st.success(f"🔍 **{len(exp)}** peças faltantes adicionais (destinos 1, 2 e 3)")
-
-                    for i, peca in enumerate(exp, 1):
-                        with st.expander(f"🧩 Adicional {i}: {peca['sequencia']}"):
-                            st.write(f"**Sequência:** {peca['sequencia']}")
-                            st.markdown(
-                                f"""
-                                <div style="background-color: #fff3cd; border-radius: 8px; padding: 12px; border-left: 4px solid #ffc107; margin: 10px 0;">
-                                    <strong>⚠️ Falta:</strong> {peca['falta']}
-                                </div>
-                                """,
-                                unsafe_allow_html=True,
-                            )
-                            st.write("**Magistrados já encaixados:**")
-                            exibir_magistrado(peca['mag_1'])
-                            st.write("⬇️")
-                            exibir_magistrado(peca['mag_2'])
-
-                            # Botão compartilhar WhatsApp
-                            msg_whats = (
-                                f"🧩 *Permutatum — Triangulação quase completa*\n\n"
-                                f"Sequência: *{peca['sequencia']}*\n"
-                                f"⚠️ *{peca['falta']}*\n\n"
-                                f"Já estão encaixados 2 magistrados. "
-                                f"Falta apenas 1 para fechar o ciclo!\n\n"
-                                f"Cadastre-se: 👉 https://permutatum.streamlit.app/"
-                            )
-                            link_wpp = gerar_link_whatsapp(msg_whats)
-                            st.markdown(
-                                f"""
-                                <a href="{link_wpp}" target="_blank" style="
-                                    display: inline-block;
-                                    background-color: #25D366;
-                                    color: white;
-                                    padding: 8px 16px;
-                                    border-radius: 8px;
-                                    text-decoration: none;
-                                    font-size: 14px;
-                                    font-weight: 500;
-                                ">📲 Compartilhar no WhatsApp</a>
-                                """,
-                                unsafe_allow_html=True,
-                            )
+                    resumo_exp.success(f"🔍 **{len(exp)}** peças faltantes adicionais (destinos 1, 2 e 3)")
                 else:
-                    st.info("Nenhuma peça faltante adicional encontrada.")
+                    resumo_exp.info("Nenhuma peça faltante adicional encontrada.")
 
             # Resumo total
             total_pecas = len(st.session_state.get("pecas_prio", [])) + len(st.session_state.get("pecas_exp", []))
@@ -1791,131 +1524,122 @@ else:
             # Botão nova busca
             if st.button("🔄 Nova busca de peças faltantes", key="btn_pecas_reset"):
                 st.session_state["pecas_etapa"] = 0
+                st.session_state["pecas_prio_incompleta"] = False
                 st.session_state["pecas_prio"] = []
                 st.session_state["pecas_exp"] = []
+                st.session_state["pecas_cursor"] = None
                 st.rerun()
 
-        # ═══════════════════════════════════
-        # BUSCAR QUADRANGULAÇÃO
-        # ═══════════════════════════════════
-        if btn_buscar_quad:
-            if validar_selecao():
-                st.session_state["tri_etapa_busca"] = 0
-                st.session_state["tri_prio_busca"] = []
-                st.session_state["tri_exp_busca"] = []
-                st.session_state["pecas_etapa"] = 0
-                st.session_state["pecas_prio"] = []
-                st.session_state["pecas_exp"] = []
-                with st.spinner("Buscando quadrangulações (destino 1 apenas)..."):
-                    resultado = buscar_quadrangulacao_func(origem_filtro, destino_filtro, dados, limite=30)
-                    st.session_state["quad_resultados"] = resultado
-                    st.session_state["quad_origem"] = origem_filtro
-                    st.session_state["quad_destino"] = destino_filtro
-                    st.rerun()
-
+        # ── Exibir quadrangulações ──
         if st.session_state.get("quad_resultados") is not None:
             quad = st.session_state["quad_resultados"]
             origem_q = st.session_state.get("quad_origem", "")
             destino_q = st.session_state.get("quad_destino", "")
+            nivel_q = "destinos 1, 2 e 3" if st.session_state.get("quad_expandida") else "destino 1 apenas"
 
             st.subheader(f"🔷 Quadrangulações: {origem_q} ↔ {destino_q}")
+            resumo_quad = st.empty()
+
+            exibir_paginado(
+                "quad", quad, lambda i, q: exibir_rotacao(i, q, 4),
+                30, "📥 Carregar mais 30 quadrangulações", f"Buscando quadrangulações ({nivel_q})...",
+            )
 
             if quad:
-                st.success(f"**{len(quad)}** quadrangulações encontradas (destino 1 apenas, máx. 30)")
-
-                for i, q in enumerate(quad, 1):
-                    with st.expander(f"🔷 Quadrangulação {i}: {q['sequencia']}"):
-                        st.info("🔷 **Quadrangulação de 4 Magistrados**")
-                        st.write("Operação coordenada entre quatro magistrados:")
-                        st.write(f"**Sequência:** {q['sequencia']}")
-                        st.write("**Magistrados envolvidos:**")
-                        for j, mag in enumerate(q['magistrados']):
-                            exibir_magistrado(mag)
-                            if j < len(q['magistrados']) - 1:
-                                st.write("⬇️")
-                        st.success("💡 **Coordenação necessária:** Todos os 4 magistrados precisam concordar simultaneamente")
+                resumo_quad.success(f"**{len(quad)}** quadrangulações encontradas ({nivel_q})")
             else:
-                st.info(f"Nenhuma quadrangulação encontrada entre {origem_q} e {destino_q} com destinos prioritários.")
+                resumo_quad.info(f"Nenhuma quadrangulação encontrada entre {origem_q} e {destino_q} ({nivel_q}).")
 
             if st.button("🔄 Nova busca de quadrangulação", key="btn_quad_reset"):
                 st.session_state["quad_resultados"] = None
+                st.session_state["quad_cursor"] = None
                 st.rerun()
 
-        # ═══════════════════════════════════
-        # PEÇAS FALTANTES QUADRANGULAÇÃO
-        # ═══════════════════════════════════
-        if btn_buscar_pecas_quad:
-            if validar_selecao():
-                st.session_state["tri_etapa_busca"] = 0
-                st.session_state["tri_prio_busca"] = []
-                st.session_state["tri_exp_busca"] = []
-                st.session_state["pecas_etapa"] = 0
-                st.session_state["pecas_prio"] = []
-                st.session_state["pecas_exp"] = []
-                with st.spinner("Buscando peças faltantes para quadrangulação (destino 1)..."):
-                    resultado = pecas_faltantes_quadrangulacao(origem_filtro, destino_filtro, dados, limite=30)
-                    st.session_state["pecas_quad"] = resultado
-                    st.session_state["pecas_quad_origem"] = origem_filtro
-                    st.session_state["pecas_quad_destino"] = destino_filtro
-                    st.rerun()
-
+        # ── Exibir peças faltantes (quadrangulação) ──
         if st.session_state.get("pecas_quad") is not None:
             pecas_q = st.session_state["pecas_quad"]
             origem_pq = st.session_state.get("pecas_quad_origem", "")
             destino_pq = st.session_state.get("pecas_quad_destino", "")
+            nivel_pq = "destinos 1, 2 e 3" if st.session_state.get("pecas_quad_expandida") else "destino 1"
 
             st.subheader(f"🧩 Peças Faltantes (Quadrangulação): {origem_pq} ↔ {destino_pq}")
+            resumo_pq = st.empty()
+
+            exibir_paginado(
+                "pecas_quad", pecas_q, exibir_peca_quadrangulacao,
+                30, "📥 Carregar mais 30 quadrangulações quase completas",
+                f"Buscando peças faltantes para quadrangulação ({nivel_pq})...",
+            )
 
             if pecas_q:
-                st.warning(f"**{len(pecas_q)}** quadrangulações quase completas — falta 1 magistrado para fechar o ciclo de 4!")
-
-                for i, peca in enumerate(pecas_q, 1):
-                    with st.expander(f"🧩 Quase completa {i}: {peca['sequencia']}"):
-                        st.write(f"**Sequência:** {peca['sequencia']}")
-                        st.markdown(
-                            f"""
-                            <div style="background-color: #fff3cd; border-radius: 8px; padding: 12px; border-left: 4px solid #ffc107; margin: 10px 0;">
-                                <strong>⚠️ Falta:</strong> {peca['falta']}
-                            </div>
-                            """,
-                            unsafe_allow_html=True,
-                        )
-                        st.write("**Magistrados já encaixados:**")
-                        for j, mag in enumerate(peca['magistrados']):
-                            exibir_magistrado(mag)
-                            if j < len(peca['magistrados']) - 1:
-                                st.write("⬇️")
-
-                        # Botão compartilhar WhatsApp
-                        msg_whats = (
-                            f"🧩 *Permutatum — Quadrangulação quase completa*\n\n"
-                            f"Sequência: *{peca['sequencia']}*\n"
-                            f"⚠️ *{peca['falta']}*\n\n"
-                            f"Já estão encaixados 3 magistrados. "
-                            f"Falta apenas 1 para fechar o ciclo de 4!\n\n"
-                            f"Cadastre-se: 👉 https://permutatum.streamlit.app/"
-                        )
-                        link_wpp = gerar_link_whatsapp(msg_whats)
-                        st.markdown(
-                            f"""
-                            <a href="{link_wpp}" target="_blank" style="
-                                display: inline-block;
-                                background-color: #25D366;
-                                color: white;
-                                padding: 8px 16px;
-                                border-radius: 8px;
-                                text-decoration: none;
-                                font-size: 14px;
-                                font-weight: 500;
-                            ">📲 Compartilhar no WhatsApp</a>
-                            """,
-                            unsafe_allow_html=True,
-                        )
+                resumo_pq.warning(f"**{len(pecas_q)}** quadrangulações quase completas — falta 1 magistrado para fechar o ciclo de 4!")
             else:
-                st.info(f"Nenhuma quadrangulação incompleta encontrada entre {origem_pq} e {destino_pq}.")
+                resumo_pq.info(f"Nenhuma quadrangulação incompleta encontrada entre {origem_pq} e {destino_pq}.")
 
             if st.button("🔄 Nova busca de peças (quadrangulação)", key="btn_pecas_quad_reset"):
                 st.session_state["pecas_quad"] = None
+                st.session_state["pecas_quad_cursor"] = None
+                st.rerun()
+
+        # ── Exibir rotações de 5 ou 6 ──
+        if st.session_state.get("rot_resultados") is not None:
+            rot = st.session_state["rot_resultados"]
+            origem_r = st.session_state.get("rot_origem", "")
+            destino_r = st.session_state.get("rot_destino", "")
+            tamanho_r = st.session_state.get("rot_tamanho", 5)
+
+            st.subheader(f"🔶 Rotações de {tamanho_r}: {origem_r} ↔ {destino_r}")
+            resumo_rot = st.empty()
+
+            exibir_paginado(
+                "rot", rot, lambda i, r: exibir_rotacao(i, r, tamanho_r),
+                30, "📥 Carregar mais 30 rotações", f"Buscando rotações de {tamanho_r} magistrados...",
+            )
+
+            if rot:
+                resumo_rot.success(f"**{len(rot)}** rotações de {tamanho_r} magistrados encontradas")
+            else:
+                resumo_rot.info(f"Nenhuma rotação de {tamanho_r} magistrados encontrada entre {origem_r} e {destino_r}.")
+
+            if st.button("🔄 Nova busca de rotação", key="btn_rot_reset"):
+                st.session_state["rot_resultados"] = None
+                st.session_state["rot_cursor"] = None
+                st.rerun()
+
+        # ── Exibir busca aberta, agrupada pelo outro tribunal ──
+        if st.session_state.get("aberta_resultados") is not None:
+            grupos = st.session_state["aberta_resultados"]
+            tribunal_a = st.session_state.get("aberta_tribunal", "")
+            saida = st.session_state.get("aberta_sentido") == "saida"
+
+            if saida:
+                st.subheader(f"🧭 Para onde é possível ir a partir do {tribunal_a}")
+            else:
+                st.subheader(f"🧭 De onde alguém pode vir para o {tribunal_a}")
+
+            if grupos:
+                st.success(
+                    f"**{len(grupos)}** tribunais com ciclos de até 4 magistrados "
+                    f"({sum(g['total'] for g in grupos)} ciclos no total, destinos 1, 2 e 3)"
+                )
+                for grupo in grupos:
+                    rotulo = f"{tribunal_a} → {grupo['tribunal']}" if saida else f"{grupo['tribunal']} → {tribunal_a}"
+                    with st.expander(f"{rotulo}: {grupo['total']} ciclos"):
+                        st.caption(f"Os {len(grupo['ciclos'])} mais compatíveis:")
+                        for ciclo in grupo['ciclos']:
+                            st.write(
+                                f"**{ciclo['sequencia']}** — pontuação {ciclo['pontuacao']} de {3 * len(ciclo['magistrados'])}"
+                            )
+                            for mag in ciclo['magistrados']:
+                                exibir_magistrado(mag)
+                            st.markdown("---")
+            else:
+                st.info(f"Nenhum ciclo de até 4 magistrados encontrado para o {tribunal_a}.")
+            if st.session_state.get("aberta_incompleta", False):
+                aviso_busca_incompleta(pode_continuar=False)
+
+            if st.button("🔄 Nova busca aberta", key="btn_aberta_reset"):
+                st.session_state["aberta_resultados"] = None
                 st.rerun()
 
     with tab2:
@@ -1944,13 +1668,68 @@ else:
             unsafe_allow_html=True,
         )
 
-        sem_par = buscar_pares_aguardando(dados)
+        # ── Ranking: cadastros que ainda não existem e mais permutas destravariam ──
+        perfis = _perfis_cache(indice.versao, indice)
+        if perfis:
+            with st.expander("🏆 Cadastros que mais destravariam permutas"):
+                st.caption(
+                    "Perfis sem nenhum magistrado cadastrado hoje, ordenados por quantos ciclos de 2 a 4 "
+                    "magistrados um único cadastro com esse perfil completaria."
+                )
+                st.dataframe(
+                    pd.DataFrame([
+                        {
+                            "Perfil": f"{perfil['origem']} → {perfil['destino']}",
+                            "Permutas diretas": perfil['diretas'],
+                            "Triangulações": perfil['triangulacoes'],
+                            "Quadrangulações": perfil['quadrangulacoes'],
+                            "Total": perfil['total'],
+                        }
+                        for perfil in perfis
+                    ]),
+                    use_container_width=True,
+                    hide_index=True,
+                )
+
+                perfil_escolhido = st.selectbox(
+                    "Divulgar o perfil:",
+                    options=range(len(perfis)),
+                    format_func=lambda i: f"{perfis[i]['origem']} → {perfis[i]['destino']} ({perfis[i]['total']} ciclos)",
+                    key="sel_perfil_valioso"
+                )
+                perfil = perfis[perfil_escolhido]
+                msg_whats = (
+                    f"🏆 *Permutatum — Cadastro procurado*\n\n"
+                    f"Um magistrado do *{perfil['origem']}* que deseje ir para o *{perfil['destino']}* "
+                    f"completaria hoje *{perfil['total']}* possibilidades de permuta "
+                    f"({perfil['diretas']} diretas, {perfil['triangulacoes']} triangulações e "
+                    f"{perfil['quadrangulacoes']} quadrangulações).\n\n"
+                    f"Conhece alguém do {perfil['origem']}? Compartilhe o Permutatum!\n\n"
+                    f"👉 https://permutatum.streamlit.app/"
+                )
+                st.markdown(
+                    f"""
+                    <a href="{gerar_link_whatsapp(msg_whats)}" target="_blank" style="
+                        display: inline-block;
+                        background-color: #25D366;
+                        color: white;
+                        padding: 8px 16px;
+                        border-radius: 8px;
+                        text-decoration: none;
+                        font-size: 14px;
+                        font-weight: 500;
+                    ">📲 Compartilhar no WhatsApp</a>
+                    """,
+                    unsafe_allow_html=True,
+                )
+
+        sem_par, rotas_pares = _pares_aguardando_cache(indice.versao, indice)
 
         if sem_par:
             # Filtros
             col_f1, col_f2 = st.columns(2)
-            origens_unicas = sorted(set(str(s['origem']).strip() for s in sem_par if s.get('origem')))
-            destinos_unicos = sorted(set(str(s['destino_desejado']).strip() for s in sem_par if s.get('destino_desejado')))
+            origens_unicas = sorted(set(str(o).strip() for (o, _), _ in rotas_pares if o))
+            destinos_unicos = sorted(set(str(d).strip() for (_, d), _ in rotas_pares if d))
             with col_f1:
                 filtro_origem_par = st.selectbox(
                     "Filtrar por tribunal de origem:",
@@ -1964,29 +1743,20 @@ else:
                     key="filtro_destino_par"
                 )
 
-            # Aplicar filtros
-            filtrados = sem_par
-            if filtro_origem_par != "Todos":
-                filtrados = [s for s in filtrados if str(s['origem']).strip() == filtro_origem_par]
-            if filtro_destino_par != "Todos":
-                filtrados = [s for s in filtrados if str(s['destino_desejado']).strip() == filtro_destino_par]
+            # Aplicar filtros sobre as rotas já agrupadas (mais magistrados primeiro)
+            rotas_filtradas = [
+                (f"{origem_rota} → {destino_rota}", itens)
+                for (origem_rota, destino_rota), itens in rotas_pares
+                if (filtro_origem_par == "Todos" or str(origem_rota).strip() == filtro_origem_par)
+                and (filtro_destino_par == "Todos" or str(destino_rota).strip() == filtro_destino_par)
+            ]
+            total_filtrados = sum(len(itens) for _, itens in rotas_filtradas)
 
-            st.success(f"**{len(filtrados)}** magistrados aguardando par (de {len(sem_par)} no total)")
+            st.success(f"**{total_filtrados}** magistrados aguardando par (de {len(sem_par)} no total)")
 
             st.markdown("---")
 
-            # Agrupar por rota (origem → destino)
-            rotas = {}
-            for item in filtrados:
-                rota = f"{item['origem']} → {item['destino_desejado']}"
-                if rota not in rotas:
-                    rotas[rota] = []
-                rotas[rota].append(item)
-
-            # Ordenar por quantidade (mais magistrados primeiro)
-            rotas_ordenadas = sorted(rotas.items(), key=lambda x: len(x[1]), reverse=True)
-
-            for idx_rota, (rota, magistrados_rota) in enumerate(rotas_ordenadas):
+            for idx_rota, (rota, magistrados_rota) in enumerate(rotas_filtradas):
                 with st.expander(f"🔸 {rota} — {len(magistrados_rota)} magistrado(s) aguardando"):
                     st.warning(f"**Falta:** {magistrados_rota[0]['falta']}")
                     for item in magistrados_rota:
@@ -2144,7 +1914,7 @@ else:
     with tab4:
         st.subheader(f"Magistrados interessados em vir para o {usuario.get('origem')}")
 
-        interessados = buscar_interessados(usuario.get('origem'), dados)
+        interessados = buscar_interessados(usuario.get('origem'), indice)
 
         if interessados:
             for item in interessados:
@@ -2160,7 +1930,7 @@ else:
         destinos_usuario = [usuario.get(f'destino_{i}') for i in range(1, 4) if usuario.get(f'destino_{i}')]
 
         if destinos_usuario:
-            disponveis = buscar_destinos_disponiveis(destinos_usuario, dados)
+            disponveis = buscar_destinos_disponiveis(destinos_usuario, indice)
 
             if disponveis:
                 for tribunal in destinos_usuario:
@@ -2277,6 +2047,36 @@ else:
             if opcao == "✏️ Editar meus dados":
                 st.info("Edite seus dados abaixo e clique em Salvar Alterações")
 
+                # ── Simulação: quanto cada destino adicional renderia ──
+                with st.expander("📈 Qual destino adicional renderia mais permutas?"):
+                    destinos_atuais = [usuario.get(c) for c in ('destino_1', 'destino_2', 'destino_3') if usuario.get(c)]
+                    ganhos = ganho_por_destino(
+                        _caminhos_cache(indice.versao, indice), usuario.get('origem'), destinos_atuais
+                    )
+                    if not ganhos:
+                        st.info("Tribunal de origem não reconhecido.")
+                    elif not any(linha['total'] for linha in ganhos if not linha['atual']):
+                        st.info("Nenhum outro destino fecharia ciclos com os cadastros atuais.")
+                    else:
+                        st.caption(
+                            f"Ciclos que passariam a incluir você, saindo de {usuario.get('origem')}, "
+                            "se o tribunal fosse um dos seus destinos (com os cadastros atuais)."
+                        )
+                        st.dataframe(
+                            pd.DataFrame([
+                                {
+                                    "Destino": linha['destino'] + (" (já escolhido)" if linha['atual'] else ""),
+                                    "Permutas diretas": linha['diretas'],
+                                    "Triangulações": linha['triangulacoes'],
+                                    "Quadrangulações": linha['quadrangulacoes'],
+                                    "Total": linha['total'],
+                                }
+                                for linha in ganhos
+                            ]),
+                            use_container_width=True,
+                            hide_index=True,
+                        )
+
                 with st.form("editar_dados"):
                     col1, col2 = st.columns(2)
 
@@ -2356,55 +2156,58 @@ else:
 
                             if sucesso:
                                 st.success("✅ " + mensagem)
+                                # Delta sobre o índice já em cache (com a versão antiga do usuário), antes de descartá-lo
+                                indice_em_cache = obter_indice(*carregar_dados_versionados())
                                 st.cache_data.clear()
-                                # ── Gerar notificações de match após edição ──
+                                # ── Gerar notificações de match após edição (só as permutas diretas criadas) ──
                                 try:
                                     supabase_notif = init_supabase()
                                     if supabase_notif:
-                                        todos = supabase_notif.table("magistrados").select("*").eq("status", "ativo").execute()
-                                        if todos.data:
+                                        registro_novo = {**usuario_atual, **dados_atualizados}
+                                        delta = calcular_delta(
+                                            indice_em_cache, usuario_atual, registro_novo,
+                                            tamanhos=(2,), prioridades=(1,)
+                                        )
+                                        if delta['criados']:
                                             novo_origem = dados_atualizados.get('origem', '')
                                             novo_destino_1 = dados_atualizados.get('destino_1', '')
                                             novo_email = dados_atualizados.get('email', '')
                                             novo_nome = dados_atualizados.get('nome', '')
 
-                                            for mag in todos.data:
-                                                if mag.get('email', '').lower() == novo_email.lower():
-                                                    continue
-
+                                            for ciclo in delta['criados']:
+                                                mag = ciclo['magistrados'][1]
                                                 mag_origem = mag.get('origem', '')
                                                 mag_destino_1 = mag.get('destino_1', '')
 
-                                                if mag_origem == novo_destino_1 and mag_destino_1 == novo_origem:
-                                                    # Verificar se já existe notificação igual não lida para evitar duplicatas
-                                                    existente = supabase_notif.table("notificacoes").select("id").eq(
-                                                        "email_destino", mag.get('email', '')
-                                                    ).eq("lida", False).ilike(
-                                                        "mensagem", f"%{novo_nome}%"
-                                                    ).execute()
-
-                                                    if not existente.data:
-                                                        supabase_notif.table("notificacoes").insert({
-                                                            "email_destino": mag.get('email', ''),
-                                                            "tipo": "permuta_direta",
-                                                            "mensagem": f"Novo match! {novo_nome} ({novo_origem}) atualizou dados — destino {novo_destino_1}, permuta direta possível!",
-                                                            "detalhes": f"Confira na aba 'Busca de Permuta' selecionando {mag_origem} → {novo_origem}."
-                                                        }).execute()
-
-                                                    # Notificar também quem editou
-                                                    existente2 = supabase_notif.table("notificacoes").select("id").eq(
-                                                        "email_destino", novo_email
-                                                    ).eq("lida", False).ilike(
-                                                        "mensagem", f"%{mag.get('nome', '')}%"
-                                                    ).execute()
-
-                                                    if not existente2.data:
-                                                        supabase_notif.table("notificacoes").insert({
-                                                            "email_destino": novo_email,
-                                                            "tipo": "permuta_direta",
-                                                            "mensagem": f"Boa notícia! {mag.get('nome', '')} ({mag_origem}) quer ir para {mag_destino_1} — permuta direta possível!",
-                                                            "detalhes": f"Confira na aba 'Busca de Permuta' selecionando {novo_origem} → {novo_destino_1}."
-                                                        }).execute()
+                                                # Verificar se já existe notificação igual não lida para evitar duplicatas
+                                                existente = supabase_notif.table("notificacoes").select("id").eq(
+                                                    "email_destino", mag.get('email', '')
+                                                ).eq("lida", False).ilike(
+                                                    "mensagem", f"%{novo_nome}%"
+                                                ).execute()
+
+                                                if not existente.data:
+                                                    supabase_notif.table("notificacoes").insert({
+                                                        "email_destino": mag.get('email', ''),
+                                                        "tipo": "permuta_direta",
+                                                        "mensagem": f"Novo match! {novo_nome} ({novo_origem}) atualizou dados — destino {novo_destino_1}, permuta direta possível!",
+                                                        "detalhes": f"Confira na aba 'Busca de Permuta' selecionando {mag_origem} → {novo_origem}."
+                                                    }).execute()
+
+                                                # Notificar também quem editou
+                                                existente2 = supabase_notif.table("notificacoes").select("id").eq(
+                                                    "email_destino", novo_email
+                                                ).eq("lida", False).ilike(
+                                                    "mensagem", f"%{mag.get('nome', '')}%"
+                                                ).execute()
+
+                                                if not existente2.data:
+                                                    supabase_notif.table("notificacoes").insert({
+                                                        "email_destino": novo_email,
+                                                        "tipo": "permuta_direta",
+                                                        "mensagem": f"Boa notícia! {mag.get('nome', '')} ({mag_origem}) quer ir para {mag_destino_1} — permuta direta possível!",
+                                                        "detalhes": f"Confira na aba 'Busca de Permuta' selecionando {novo_origem} → {novo_destino_1}."
+                                                    }).execute()
                                 except:
                                     pass  # Não bloquear a edição por erro de notificação
                                 usuario_atualizado = verificar_email(email_novo.strip().lower())
@@ -8,6 +8,16 @@ st.set_page_config(page_title="Permutatum - Admin", page_icon="🔒", layout="wi
 # ── Função init_supabase (mesma lógica dos outros arquivos) ──
 from supabase import create_client
 import os
+import pandas as pd
+import json
+
+from utils.indice_permutas import IndicePermutas, versao_snapshot
+from utils.contagem_permutas import contar_ciclos, tabela_liquidez
+from utils.rotacao_global import relatorio_rotacoes_globais
+from utils.orcamento_busca import OrcamentoBusca
+
+# Tempo máximo (segundos) da melhoria local da rotação global; a solução gulosa sai sempre inteira
+PRAZO_ROTACAO_SEGUNDOS = 30
 
 
 def init_supabase():
@@ -29,6 +39,51 @@ def init_supabase():
         return None
 
 
+# ── Função para carregar magistrados ativos (relatórios do motor de permutas) ──
+def carregar_magistrados_ativos():
+    supabase = init_supabase()
+    if not supabase:
+        return []
+    try:
+        response = supabase.table("magistrados").select("*").eq("status", "ativo").execute()
+        return response.data if response.data else []
+    except:
+        return []
+
+
+# ── Base ativa, índice e relatórios do motor, um por versão dos dados (compartilhados entre sessões) ──
+@st.cache_data(ttl=300)
+def _magistrados_ativos_cache():
+    """Função interna cacheada; a versão do snapshot é calculada uma vez, junto com os dados."""
+    magistrados = carregar_magistrados_ativos()
+    return versao_snapshot(magistrados), magistrados
+
+
+@st.cache_resource(max_entries=2)
+def _indice_cache(versao, _magistrados):
+    """Função interna cacheada; _magistrados não entra no hash, apenas a versão."""
+    return IndicePermutas(_magistrados, versao=versao)
+
+
+@st.cache_resource(max_entries=4)
+def _liquidez_cache(versao, prioridades, _indice):
+    """Função interna cacheada; _indice não entra no hash, apenas a versão e as prioridades."""
+    return tabela_liquidez(contar_ciclos(_indice, prioridades))
+
+
+@st.cache_resource(max_entries=2)
+def _rotacao_global_cache(versao, _indice):
+    """Função interna cacheada; _indice não entra no hash, apenas a versão."""
+    orcamento = OrcamentoBusca(prazo_segundos=PRAZO_ROTACAO_SEGUNDOS)
+    return relatorio_rotacoes_globais(_indice, orcamento=orcamento)
+
+
+def obter_base_ativa():
+    """Magistrados ativos e o índice da versão atual, reconstruído só quando os dados mudam."""
+    versao, magistrados = _magistrados_ativos_cache()
+    return magistrados, _indice_cache(versao, magistrados)
+
+
 # ── Função para hashear senha ──
 def hash_senha(senha):
     return hashlib.sha256(senha.encode()).hexdigest()
@@ -131,17 +186,21 @@ else:
 
     # ── Abas ──
     if is_super:
-        tab1, tab2, tab3, tab4 = st.tabs([
+        tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
             "📋 Solicitações Pendentes",
             "📜 Histórico",
             "🔄 Trocar Email de Magistrado",
+            "📈 Liquidez das Rotas",
+            "🧮 Rotação Global",
             "👥 Gerenciar Admins"
         ])
     else:
-        tab1, tab2, tab3 = st.tabs([
+        tab1, tab2, tab3, tab4, tab5 = st.tabs([
             "📋 Solicitações Pendentes",
             "📜 Histórico",
-            "🔄 Trocar Email de Magistrado"
+            "🔄 Trocar Email de Magistrado",
+            "📈 Liquidez das Rotas",
+            "🧮 Rotação Global"
         ])
 
     # ══════════════════════════════════
@@ -313,6 +372,7 @@ else:
                                     supabase.table("magistrados").update({
                                         "email": novo_email.strip().lower()
                                     }).eq("id", mag.get('id')).execute()
+                                    _magistrados_ativos_cache.clear()
 
                                     # Enviar confirmação para o novo email
                                     html_troca = f"""
@@ -345,10 +405,134 @@ else:
                     st.warning("Nenhum magistrado encontrado com esse nome.")
 
     # ══════════════════════════════════
-    # ABA 4: GERENCIAR ADMINS (só super)
+    # ABA 4: LIQUIDEZ DAS ROTAS
+    # ══════════════════════════════════
+    with tab4:
+        st.subheader("📈 Liquidez das Rotas")
+        st.info(
+            "Quantidade de permutas diretas, triangulações e quadrangulações possíveis "
+            "para cada um dos 702 pares de tribunais, calculada de uma só vez sobre a base ativa."
+        )
+
+        escopo_liquidez = st.radio(
+            "Destinos considerados:",
+            ["Destinos 1, 2 e 3", "Apenas destino 1"],
+            horizontal=True,
+            key="liquidez_escopo"
+        )
+
+        magistrados_ativos, indice = obter_base_ativa()
+
+        if magistrados_ativos:
+            prioridades_liquidez = (1,) if escopo_liquidez == "Apenas destino 1" else (1, 2, 3)
+            linhas = _liquidez_cache(indice.versao, prioridades_liquidez, indice)
+
+            df_liquidez = pd.DataFrame(linhas).rename(columns={
+                "origem": "Origem",
+                "destino": "Destino",
+                "diretas": "Diretas",
+                "triangulacoes": "Triangulações",
+                "quadrangulacoes": "Quadrangulações",
+                "total": "Total",
+            })
+
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Magistrados ativos", len(magistrados_ativos))
+            with col2:
+                st.metric("Pares com alguma combinação", int((df_liquidez["Total"] > 0).sum()))
+
+            apenas_liquidos = st.checkbox("Mostrar apenas pares com alguma combinação", value=True, key="liquidez_apenas")
+            if apenas_liquidos:
+                df_liquidez = df_liquidez[df_liquidez["Total"] > 0]
+
+            st.dataframe(df_liquidez, use_container_width=True, hide_index=True)
+        else:
+            st.info("Nenhum magistrado ativo encontrado.")
+
+    # ══════════════════════════════════
+    # ABA 5: ROTAÇÃO GLOBAL
+    # ══════════════════════════════════
+    with tab5:
+        st.subheader("🧮 Rotação Global")
+        st.info(
+            "Conjunto de permutas diretas, triangulações e quadrangulações sem magistrados repetidos "
+            "que atende o maior número de magistrados da base, priorizando o destino 1. "
+            "O resultado é aproximado: heurística gulosa com trocas locais (um ciclo por dois), "
+            "sem garantia de ótimo."
+        )
+
+        if st.button("🧮 Calcular rotação global", key="btn_rotacao_global", type="primary"):
+            magistrados_ativos, indice = obter_base_ativa()
+            if magistrados_ativos:
+                with st.spinner("Calculando ciclos disjuntos em toda a base..."):
+                    st.session_state["rotacao_global"] = _rotacao_global_cache(indice.versao, indice)
+            else:
+                st.session_state["rotacao_global"] = None
+                st.info("Nenhum magistrado ativo encontrado.")
+
+        relatorio = st.session_state.get("rotacao_global")
+        if relatorio:
+            estado = "incompleta" if relatorio.get('melhoria_incompleta') else "aproximado" if relatorio.get('aproximado') else None
+            limite = relatorio.get('limite_superior', {})
+            folga = relatorio.get('folga', {})
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric(
+                    f"Magistrados atendidos ({estado})" if estado else "Magistrados atendidos",
+                    f"{relatorio['magistrados_atendidos']} / {relatorio['total_magistrados']}"
+                )
+            with col2:
+                st.metric(
+                    "Limite superior",
+                    limite.get('magistrados', "—"),
+                    help="Nenhuma solução atende mais magistrados do que isso; a diferença é a folga máxima da heurística."
+                )
+            with col3:
+                st.metric("Ciclos", len(relatorio['ciclos']))
+            with col4:
+                st.metric(
+                    f"Pontuação ({estado})" if estado else "Pontuação",
+                    relatorio['pontuacao'],
+                    help=f"Limite superior: {limite.get('pontuacao', '—')}"
+                )
+
+            if relatorio.get('aproximado'):
+                st.caption(
+                    f"⚠️ Solução aproximada · até {folga.get('magistrados', '?')} magistrados e "
+                    f"{folga.get('pontuacao', '?')} pontos abaixo do ótimo · "
+                    f"{relatorio.get('trocas', 0)} trocas locais"
+                    + (" · melhoria interrompida pelo prazo" if relatorio.get('melhoria_incompleta') else "")
+                )
+
+            st.caption(" · ".join(
+                f"{'Diretas' if k == '2' else 'Triangulações' if k == '3' else 'Quadrangulações'}: {v}"
+                for k, v in relatorio['por_tamanho'].items()
+            ))
+
+            df_rotacao = pd.DataFrame([
+                {
+                    "Sequência": ciclo['sequencia'],
+                    "Magistrados": " · ".join(f"{m['nome']} ({m['origem']}, dest. {m['prioridade']})" for m in ciclo['magistrados']),
+                    "Pontuação": ciclo['pontuacao'],
+                }
+                for ciclo in relatorio['ciclos']
+            ])
+            st.dataframe(df_rotacao, use_container_width=True, hide_index=True)
+
+            st.download_button(
+                "⬇️ Baixar relatório (JSON)",
+                data=json.dumps(relatorio, ensure_ascii=False, indent=2),
+                file_name=f"rotacao_global_{relatorio['versao'][:8]}.json",
+                mime="application/json",
+                key="btn_baixar_rotacao_global"
+            )
+
+    # ══════════════════════════════════
+    # ABA 6: GERENCIAR ADMINS (só super)
     # ══════════════════════════════════
     if is_super:
-        with tab4:
+        with tab6:
             st.subheader("👥 Gerenciar Administradores")
 
             supabase = init_supabase()
@@ -0,0 +1,68 @@
+"""Bases sintéticas pequenas e determinísticas para os testes do motor de permutas."""
+
+import random
+
+import pytest
+
+from utils.cli_permutas import preparar_indice
+from utils.snapshot_compacto import TRIBUNAIS
+
+# Poucos tribunais para que os ciclos de 2 a 4 sejam numerosos e a força bruta seja barata
+TRIBUNAIS_TESTE = TRIBUNAIS[:5]
+
+
+def gerar_base(quantidade: int, semente: int, tribunais=TRIBUNAIS_TESTE) -> list[dict]:
+    """Magistrados com origem e até três destinos distintos, sorteados com `semente`."""
+    sorteio = random.Random(semente)
+    base = []
+    for i in range(quantidade):
+        origem = sorteio.choice(tribunais)
+        destinos = sorteio.sample([t for t in tribunais if t != origem], sorteio.randint(1, 3))
+        registro = {
+            'id': i,
+            'nome': f'Magistrado {i}',
+            'email': f'magistrado{i}@exemplo.jus.br',
+            'origem': origem,
+            'entrancia': 'Inicial',
+        }
+        for n, destino in enumerate(destinos, start=1):
+            registro[f'destino_{n}'] = destino
+        base.append(registro)
+    return base
+
+
+def ciclos_forca_bruta(base: list[dict], origem: str, destino: str, tamanho: int) -> set[tuple]:
+    """Todos os ciclos origem → ... → destino → origem de `tamanho` magistrados, como tuplas de ids."""
+    def deseja(magistrado, tribunal):
+        return tribunal in (magistrado.get(f'destino_{n}') for n in (1, 2, 3))
+
+    ciclos = set()
+
+    def estender(tribunais, ids):
+        atual = tribunais[-1]
+        if len(tribunais) == tamanho:
+            if atual != destino:
+                return
+            for magistrado in base:
+                if magistrado['origem'] == atual and deseja(magistrado, origem):
+                    ciclos.add(tuple(ids + [magistrado['id']]))
+            return
+        for magistrado in base:
+            if magistrado['origem'] != atual:
+                continue
+            for seguinte in TRIBUNAIS_TESTE:
+                if seguinte not in tribunais and deseja(magistrado, seguinte):
+                    estender(tribunais + [seguinte], ids + [magistrado['id']])
+
+    estender([origem], [])
+    return ciclos
+
+
+@pytest.fixture(scope='session')
+def base():
+    return gerar_base(40, semente=7)
+
+
+@pytest.fixture(scope='session')
+def indice(base):
+    return preparar_indice(base)
@@ -0,0 +1,36 @@
+"""As matrizes de contagem batem com a enumeração dos ciclos e com a força bruta."""
+
+from itertools import permutations
+
+from utils.ciclos_permutas import enumerar_ciclos
+from utils.contagem_permutas import contar_ciclos
+from utils.snapshot_compacto import TRIBUNAIS
+
+from tests.conftest import TRIBUNAIS_TESTE, ciclos_forca_bruta
+
+NOMES = {2: 'diretas', 3: 'triangulacoes', 4: 'quadrangulacoes'}
+
+
+def _ids(ciclos):
+    return {tuple(m['id'] for m in ciclo['magistrados']) for ciclo in ciclos}
+
+
+def test_enumeracao_igual_a_forca_bruta(base, indice):
+    for origem, destino in permutations(TRIBUNAIS_TESTE, 2):
+        for tamanho in NOMES:
+            esperado = ciclos_forca_bruta(base, origem, destino, tamanho)
+            assert _ids(enumerar_ciclos(indice, origem, destino, tamanho)) == esperado
+
+
+def test_contagem_igual_a_enumeracao(indice):
+    contagens = contar_ciclos(indice)
+    for origem, destino in permutations(TRIBUNAIS_TESTE, 2):
+        o, d = TRIBUNAIS.index(origem), TRIBUNAIS.index(destino)
+        for tamanho, nome in NOMES.items():
+            enumerados = sum(1 for _ in enumerar_ciclos(indice, origem, destino, tamanho))
+            assert int(contagens[nome][o, d]) == enumerados
+
+
+def test_contagem_zera_a_diagonal(indice):
+    for matriz in contar_ciclos(indice).values():
+        assert not matriz.diagonal().any()
@@ -0,0 +1,48 @@
+"""Paginação com orçamento: páginas parciais ao fim do prazo e retomada do mesmo ponto."""
+
+from utils.cursor_busca import CursorBusca
+from utils.orcamento_busca import PAUSA_BUSCA, OrcamentoBusca
+
+
+def _gerador(quantidade, orcamento):
+    for i in range(quantidade):
+        if orcamento.passo():
+            yield PAUSA_BUSCA
+        yield i
+
+
+def test_pausa_e_retoma_sem_perder_resultados():
+    orcamento = OrcamentoBusca(max_passos=3)
+    cursor = CursorBusca(_gerador(10, orcamento), orcamento)
+
+    paginas = []
+    for tamanho in (3, 3, 2, 5):
+        pagina = cursor.pagina(tamanho)
+        paginas.append((pagina, cursor.tem_mais, cursor.incompleta))
+
+    assert paginas == [
+        ([0, 1], True, True),
+        ([2, 3, 4], True, False),
+        ([5, 6], True, False),
+        ([7, 8, 9], False, False),
+    ]
+    assert cursor.entregues == 10
+
+
+def test_tem_mais_nao_avanca_a_busca():
+    orcamento = OrcamentoBusca(max_passos=100)
+    cursor = CursorBusca(_gerador(4, orcamento), orcamento)
+    assert cursor.pagina(2) == [0, 1]
+    passos = orcamento.explorados
+    for _ in range(3):
+        assert cursor.tem_mais
+    assert orcamento.explorados == passos
+    assert cursor.pagina(5) == [2, 3]
+    assert not cursor.tem_mais
+
+
+def test_sem_orcamento_entrega_tudo():
+    cursor = CursorBusca(iter(range(5)))
+    assert cursor.pagina(3) == [0, 1, 2]
+    assert cursor.pagina(3) == [3, 4]
+    assert not cursor.tem_mais and not cursor.incompleta
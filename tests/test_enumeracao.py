@@ -0,0 +1,22 @@
+"""Enumerações ordenadas: mesmos ciclos da enumeração completa, do mais compatível ao menos."""
+
+from itertools import permutations
+
+from utils.ciclos_permutas import enumerar_ciclos, enumerar_ciclos_por_pontuacao, pontuacao_ciclo
+
+from tests.conftest import TRIBUNAIS_TESTE
+
+
+def _chave(ciclo):
+    return tuple(m['id'] for m in ciclo['magistrados'])
+
+
+def test_por_pontuacao_gera_os_mesmos_ciclos_em_ordem(indice):
+    for origem, destino in permutations(TRIBUNAIS_TESTE, 2):
+        for tamanho in (2, 3, 4):
+            ordenados = list(enumerar_ciclos_por_pontuacao(indice, origem, destino, (tamanho,)))
+            todos = list(enumerar_ciclos(indice, origem, destino, tamanho))
+            assert sorted(map(_chave, ordenados)) == sorted(map(_chave, todos))
+            pontuacoes = [ciclo['pontuacao'] for ciclo in ordenados]
+            assert pontuacoes == sorted(pontuacoes, reverse=True)
+            assert all(c['pontuacao'] == pontuacao_ciclo(c['prioridades']) for c in ordenados)
@@ -0,0 +1,35 @@
+"""O feed do magistrado traz os `limite` melhores ciclos e o total exato."""
+
+import pytest
+
+from utils.ciclos_permutas import pontuacao_ciclo
+from utils.delta_permutas import ciclos_do_registro
+from utils.feed_permutas import FeedMagistrado
+
+
+def _todos(indice, magistrado):
+    return [
+        (pontuacao_ciclo(ciclo['prioridades']), tuple(m['id'] for m in ciclo['magistrados']))
+        for ciclo in ciclos_do_registro(indice, magistrado)
+    ]
+
+
+@pytest.mark.parametrize('limite', [1, 5, 20])
+def test_feed_traz_os_melhores_ciclos(indice, limite):
+    for magistrado in indice.dados:
+        todos = _todos(indice, magistrado)
+        feed = FeedMagistrado(indice, magistrado, limite=limite)
+
+        assert feed.total == len(todos)
+        assert not feed.incompleta
+        pontuacoes = [ciclo['pontuacao'] for ciclo in feed.ciclos]
+        assert pontuacoes == sorted((p for p, _ in todos), reverse=True)[:limite]
+        assert all(ciclo['magistrados'][0] is feed.magistrado for ciclo in feed.ciclos)
+        assert {tuple(m['id'] for m in c['magistrados']) for c in feed.ciclos} <= {ids for _, ids in todos}
+
+
+def test_feed_sem_limite_cobre_todos_os_ciclos(indice):
+    for magistrado in indice.dados:
+        todos = _todos(indice, magistrado)
+        feed = FeedMagistrado(indice, magistrado, limite=len(todos) + 1)
+        assert sorted(tuple(m['id'] for m in c['magistrados']) for c in feed.ciclos) == sorted(ids for _, ids in todos)
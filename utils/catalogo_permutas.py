@@ -0,0 +1,137 @@
+"""
+Catálogo global de ciclos de permuta (2, 3 e 4 magistrados) de uma versão da base.
+Sistema Permutatum - Permutas entre magistrados.
+As rotas de tribunais são calculadas uma única vez por snapshot; as buscas por par
+ou por magistrado passam a ser consultas a dicionários, expandindo só os magistrados.
+"""
+
+from itertools import product
+
+from utils.ciclos_permutas import expandir_ciclo, formatar_sequencia, TODAS_PRIORIDADES
+
+
+TAMANHOS_CATALOGO = (2, 3, 4)
+
+
+def _rotacionar(ciclo: tuple, inicio: str) -> tuple:
+    """Rotaciona a tupla de tribunais para começar em `inicio`."""
+    i = ciclo.index(inicio)
+    return ciclo[i:] + ciclo[:i]
+
+
+class CatalogoCiclos:
+    """
+    Todas as rotas de tribunais que fecham um ciclo de 2 a 4 magistrados, indexadas:
+    - por_par: (origem, destino, tamanho) → [ciclo], com origem → ... → destino → origem
+    - por_aresta: (tribunal, destino desejado) → [ciclo], para consultas por magistrado
+    Cada ciclo é guardado uma única vez, como tupla iniciada pelo menor tribunal.
+    """
+
+    def __init__(self, indice, tamanhos=TAMANHOS_CATALOGO):
+        self.indice = indice
+        self.versao = indice.versao
+        self.tamanhos = tuple(tamanhos)
+        self.por_par: dict[tuple[str, str, int], list[tuple]] = {}
+        self.por_aresta: dict[tuple[str, str], list[tuple]] = {}
+
+        grafo = indice.grafo(TODAS_PRIORIDADES)
+        tamanho_max = max(self.tamanhos)
+
+        # Cada ciclo simples é encontrado uma vez, a partir do seu menor tribunal
+        for inicio in sorted(grafo):
+            caminho = [inicio]
+
+            def _expandir(atual):
+                for proximo in grafo.get(atual, []):
+                    if proximo == inicio:
+                        if len(caminho) in self.tamanhos:
+                            self._registrar(tuple(caminho))
+                    elif proximo > inicio and proximo not in caminho and len(caminho) < tamanho_max:
+                        caminho.append(proximo)
+                        _expandir(proximo)
+                        caminho.pop()
+
+            _expandir(inicio)
+
+    def _registrar(self, ciclo: tuple):
+        for i, tribunal in enumerate(ciclo):
+            anterior = ciclo[i - 1]
+            self.por_par.setdefault((tribunal, anterior, len(ciclo)), []).append(ciclo)
+            self.por_aresta.setdefault((tribunal, ciclo[(i + 1) % len(ciclo)]), []).append(ciclo)
+
+    def para_indice(self, indice) -> "CatalogoCiclos":
+        """
+        Reaproveita as rotas deste catálogo para outra versão da base com o mesmo grafo de
+        tribunais (delta_permutas.arestas_alteradas vazio), como após a edição de um único
+        magistrado que não cria nem elimina arestas. Só o índice usado na expansão dos
+        magistrados é trocado.
+        """
+        copia = object.__new__(CatalogoCiclos)
+        copia.__dict__.update(self.__dict__)
+        copia.indice = indice
+        copia.versao = indice.versao
+        return copia
+
+    @property
+    def total_rotas(self) -> int:
+        return sum(len(ciclos) for ciclos in self.por_par.values())
+
+    def _rota_permitida(self, rota: tuple, prioridades) -> bool:
+        grafo = self.indice.grafo(prioridades)
+        return all(rota[(i + 1) % len(rota)] in grafo.get(t, []) for i, t in enumerate(rota))
+
+    def rotas(self, origem: str, destino: str, tamanho: int, prioridades=TODAS_PRIORIDADES):
+        """Rotas [origem, ..., destino] catalogadas cujas arestas respeitam as prioridades."""
+        for ciclo in self.por_par.get((origem, destino, tamanho), []):
+            rota = _rotacionar(ciclo, origem)
+            if self._rota_permitida(rota, prioridades):
+                yield list(rota)
+
+    def classes_do_magistrado(self, id_magistrado, prioridades=TODAS_PRIORIDADES):
+        """
+        Ciclos catalogados que incluem o magistrado, sobre classes de magistrados
+        intercambiáveis (mesmo formato de enumerar_ciclos_classes), com ele sozinho na primeira
+        posição. Percorre todos os ciclos de classes do magistrado, cujo número cresce quase
+        como o de ciclos de pessoas; para os melhores, use enumerar_ciclos_do_magistrado.
+        """
+        magistrado = self.indice.por_id.get(id_magistrado)
+        if not magistrado:
+            return
+        permitidas = set(prioridades)
+        origem = magistrado.get('origem')
+
+        for destino, prioridade in self.indice.destinos(magistrado):
+            if prioridade not in permitidas:
+                continue
+            for ciclo in self.por_aresta.get((origem, destino), []):
+                rota = _rotacionar(ciclo, origem)
+                if not self._rota_permitida(rota, prioridades):
+                    continue
+
+                candidatos = [[([magistrado], prioridade)]]
+                for i in range(1, len(rota)):
+                    seguinte = rota[(i + 1) % len(rota)]
+                    candidatos.append([
+                        (c, p) for c, p in self.indice.rota_classes(rota[i], seguinte) if p in permitidas
+                    ])
+
+                sequencia = formatar_sequencia(rota)
+                for combinacao in product(*candidatos):
+                    combinacoes = 1
+                    for membros, _ in combinacao:
+                        combinacoes *= len(membros)
+                    yield {
+                        'classes': [c for c, _ in combinacao],
+                        'prioridades': [p for _, p in combinacao],
+                        'sequencia': sequencia,
+                        'tribunais': list(rota),
+                        'combinacoes': combinacoes,
+                    }
+
+    def ciclos_do_magistrado(self, id_magistrado, prioridades=TODAS_PRIORIDADES):
+        """
+        Ciclos catalogados que incluem o magistrado, sempre com ele na primeira posição.
+        Mesmo formato de enumerar_ciclos ('magistrados', 'prioridades', 'sequencia', 'tribunais').
+        """
+        for ciclo_classes in self.classes_do_magistrado(id_magistrado, prioridades):
+            yield from expandir_ciclo(ciclo_classes)
@@ -0,0 +1,387 @@
+"""
+Enumeração genérica de ciclos de permuta entre magistrados (2 a 6 participantes).
+Sistema Permutatum - Permutas entre magistrados.
+A busca percorre o grafo de tribunais (27 nós) e só depois expande os magistrados de cada rota.
+"""
+
+from heapq import heappush, heappop
+from itertools import count, product
+
+from utils.orcamento_busca import PAUSA_BUSCA
+
+
+TAMANHO_MIN = 2
+TAMANHO_MAX = 6
+TODAS_PRIORIDADES = (1, 2, 3)
+INALCANCAVEL = float("inf")
+
+
+def formatar_sequencia(tribunais: list[str]) -> str:
+    """Texto exibido para o ciclo: 'A ↔ B' ou 'A → B → C → A'."""
+    if len(tribunais) == 2:
+        return f"{tribunais[0]} ↔ {tribunais[1]}"
+    return " → ".join(list(tribunais) + [tribunais[0]])
+
+
+def chave_ciclo(elementos) -> tuple:
+    """
+    Chave canônica de um ciclo: ids dos magistrados na ordem do ciclo, rotacionados para
+    começar no menor id. Uma peça faltante entra como a tupla (tribunal, destino desejado).
+    Homônimos não colidem e a mesma rotação, lida a partir de outro magistrado, coincide.
+    """
+    chave = tuple(
+        e if isinstance(e, tuple) else (e.get('id') if e.get('id') is not None else id(e))
+        for e in elementos
+    )
+    posicoes = [i for i, e in enumerate(chave) if not isinstance(e, tuple)]
+    if not posicoes:
+        return chave
+    inicio = min(posicoes, key=lambda i: chave[i])
+    return chave[inicio:] + chave[:inicio]
+
+
+def _distancias_ate(grafo: dict[str, list[str]], destino: str) -> dict[str, int]:
+    """Menor número de movimentos de cada tribunal até o destino (BFS reversa)."""
+    reverso = {}
+    for origem, destinos in grafo.items():
+        for d in destinos:
+            reverso.setdefault(d, []).append(origem)
+
+    distancias = {destino: 0}
+    fronteira = [destino]
+    while fronteira:
+        proxima = []
+        for tribunal in fronteira:
+            for anterior in reverso.get(tribunal, []):
+                if anterior not in distancias:
+                    distancias[anterior] = distancias[tribunal] + 1
+                    proxima.append(anterior)
+        fronteira = proxima
+    return distancias
+
+
+def menor_ciclo(indice, origem: str, destino: str, prioridades=TODAS_PRIORIDADES) -> int | None:
+    """
+    Menor número de magistrados de um ciclo origem → ... → destino → origem na base, ou None
+    se nenhum fecha: o menor caminho da origem ao destino mais o retorno destino → origem.
+    Consulta às distâncias do índice, sem enumerar rotas nem magistrados.
+    """
+    if not origem or not destino or origem == destino:
+        return None
+    if origem not in indice.grafo(prioridades).get(destino, []):
+        return None  # Ninguém do destino quer a origem
+    distancia = indice.distancias(prioridades).get(origem, {}).get(destino)
+    return None if distancia is None else distancia + 1
+
+
+def enumerar_rotas(indice, origem: str, destino: str, tamanho: int, prioridades=TODAS_PRIORIDADES):
+    """
+    Gera as rotas de tribunais [origem, t1, ..., destino] de um ciclo com `tamanho`
+    magistrados: cada tribunal envia alguém ao seguinte e o destino envia alguém à origem.
+    Todos os tribunais da rota são distintos. Usa o catálogo da versão quando disponível.
+    """
+    if tamanho < TAMANHO_MIN or tamanho > TAMANHO_MAX:
+        raise ValueError(f"Tamanho de ciclo deve estar entre {TAMANHO_MIN} e {TAMANHO_MAX}")
+    menor = menor_ciclo(indice, origem, destino, prioridades)
+    if menor is None or menor > tamanho:
+        return  # Nenhuma rota deste tamanho pode existir
+
+    catalogo = getattr(indice, 'catalogo', None)
+    if catalogo is not None and tamanho in catalogo.tamanhos:
+        yield from catalogo.rotas(origem, destino, tamanho, prioridades)
+        return
+
+    grafo = indice.grafo(prioridades)
+    if origem not in grafo.get(destino, []):
+        return  # Ninguém do destino quer a origem: não há como fechar o ciclo
+
+    distancias = _distancias_ate(grafo, destino)
+    caminho = [origem]
+
+    def _expandir(atual, restantes):
+        if restantes == 1:
+            if destino in grafo.get(atual, []):
+                yield caminho + [destino]
+            return
+        for proximo in grafo.get(atual, []):
+            if proximo == destino or proximo in caminho:
+                continue
+            if distancias.get(proximo, INALCANCAVEL) > restantes - 1:
+                continue  # Não alcança o destino nos movimentos restantes
+            caminho.append(proximo)
+            yield from _expandir(proximo, restantes - 1)
+            caminho.pop()
+
+    if distancias.get(origem, INALCANCAVEL) <= tamanho - 1:
+        yield from _expandir(origem, tamanho - 1)
+
+
+def enumerar_ciclos_classes(indice, origem: str, destino: str, tamanho: int, prioridades=TODAS_PRIORIDADES):
+    """
+    Gera os ciclos de `tamanho` posições sobre classes de magistrados intercambiáveis
+    (mesma origem e mesmos destinos), sem expandir as pessoas. Cada ciclo de classes tem
+    'classes' (lista de magistrados por posição), 'prioridades', 'sequencia', 'tribunais' e
+    'combinacoes' (quantos ciclos de magistrados ele representa); expandir_ciclo o abre.
+    Poupa só a expansão das pessoas: o número de ciclos de classes ainda é o produto das
+    classes distintas de cada aresta, e em bases reais poucas pessoas dividem a mesma
+    assinatura. Para os melhores ciclos sem percorrer todos, use enumerar_ciclos_por_pontuacao.
+    """
+    permitidas = set(prioridades)
+    for tribunais in enumerar_rotas(indice, origem, destino, tamanho, prioridades):
+        candidatos = []
+        for i, tribunal in enumerate(tribunais):
+            seguinte = tribunais[(i + 1) % len(tribunais)]
+            candidatos.append([(c, p) for c, p in indice.rota_classes(tribunal, seguinte) if p in permitidas])
+
+        sequencia = formatar_sequencia(tribunais)
+        for combinacao in product(*candidatos):
+            combinacoes = 1
+            for membros, _ in combinacao:
+                combinacoes *= len(membros)
+            yield {
+                'classes': [c for c, _ in combinacao],
+                'prioridades': [p for _, p in combinacao],
+                'sequencia': sequencia,
+                'tribunais': list(tribunais),
+                'combinacoes': combinacoes,
+            }
+
+
+def expandir_ciclo(ciclo_classes: dict):
+    """Abre um ciclo de classes (enumerar_ciclos_classes) nos ciclos de magistrados que ele representa."""
+    for magistrados in product(*ciclo_classes['classes']):
+        yield {
+            'magistrados': list(magistrados),
+            'prioridades': list(ciclo_classes['prioridades']),
+            'sequencia': ciclo_classes['sequencia'],
+            'tribunais': list(ciclo_classes['tribunais']),
+        }
+
+
+def enumerar_ciclos(indice, origem: str, destino: str, tamanho: int, prioridades=TODAS_PRIORIDADES):
+    """
+    Gera os ciclos de `tamanho` magistrados origem → ... → destino → origem.
+    Cada ciclo tem 'magistrados', 'prioridades', 'sequencia' e 'tribunais';
+    o magistrado i está em tribunais[i] e deseja tribunais[i + 1].
+    A busca corre sobre as classes e só expande as pessoas à medida que são consumidas.
+    """
+    for ciclo_classes in enumerar_ciclos_classes(indice, origem, destino, tamanho, prioridades):
+        yield from expandir_ciclo(ciclo_classes)
+
+
+def pontuacao_ciclo(prioridades) -> int:
+    """Pontuação de compatibilidade do ciclo: destino 1 vale 3 pontos, destino 2 vale 2, destino 3 vale 1."""
+    return sum(4 - p for p in prioridades)
+
+
+def enumerar_ciclos_por_pontuacao(indice, origem: str, destino: str, tamanhos=(2, 3), prioridades=TODAS_PRIORIDADES,
+                                  orcamento=None):
+    """
+    Gera os ciclos dos `tamanhos` pedidos em ordem decrescente de pontuação (pontuacao_ciclo),
+    sem enumerar e ordenar todos. A ordem é a da perda em relação ao ciclo ideal (todos no
+    destino 1): num único tamanho equivale à pontuação total decrescente; entre tamanhos,
+    empates de perda saem do menor ciclo para o maior. Mesmo formato de enumerar_ciclos,
+    com 'pontuacao'.
+
+    Busca best-first sobre caminhos parciais origem → ..., estendidos um tribunal por vez:
+    cada extensão escolhe o próximo tribunal e a prioridade da aresta; a chave é a perda já
+    escolhida mais a menor perda possível no retorno destino → origem (limite inferior), de
+    modo que um ciclo completo só sai da fila quando nenhum outro pode superá-lo. Os filhos
+    de um caminho entram na fila um de cada vez, em ordem de perda (o seguinte só quando o
+    anterior sai), e a memória cresce com o trabalho feito, não com o número de rotas.
+    Com `orcamento`, cada caminho retirado da fila conta um passo; ao esgotar, emite
+    PAUSA_BUSCA e continua do mesmo ponto na próxima página.
+    """
+    permitidas = set(prioridades)
+    tamanhos = sorted(t for t in set(tamanhos) if TAMANHO_MIN <= t <= TAMANHO_MAX)
+    menor = menor_ciclo(indice, origem, destino, prioridades)
+    if menor is None or not tamanhos or menor > tamanhos[-1]:
+        return
+
+    distancias = indice.distancias(prioridades)
+    grafo = indice.grafo(prioridades)
+
+    def _prioridades(de, para):
+        """Prioridades permitidas presentes na aresta, da melhor para a pior."""
+        return sorted({p for _, p in indice.rota_classes(de, para) if p in permitidas})
+
+    retorno = _prioridades(destino, origem)
+    perda_retorno = retorno[0] - 1  # Menor perda possível da última aresta (destino → origem)
+
+    def _filhos(caminho, tamanho):
+        """Extensões (perda, tribunais acrescentados, prioridades escolhidas) em ordem de perda."""
+        filhos = []
+        atual = caminho[-1]
+        if len(caminho) == tamanho - 1:
+            # Último passo: entra o destino e o ciclo fecha com o retorno à origem
+            for p in _prioridades(atual, destino):
+                for q in retorno:
+                    filhos.append((p + q - 2, (destino,), (p, q)))
+        else:
+            movimentos = tamanho - 1 - len(caminho)  # Do próximo tribunal até o destino
+            for seguinte in grafo.get(atual, []):
+                if seguinte == destino or seguinte in caminho:
+                    continue
+                if distancias.get(seguinte, {}).get(destino, INALCANCAVEL) > movimentos:
+                    continue
+                for p in _prioridades(atual, seguinte):
+                    filhos.append((p - 1, (seguinte,), (p,)))
+        filhos.sort(key=lambda f: f[0])
+        return filhos
+
+    fila = []
+    desempate = count()
+
+    def _empilhar(tamanho, perda_pai, caminho, escolhas, filhos, i):
+        perda = perda_pai + filhos[i][0]
+        completo = len(caminho) + len(filhos[i][1]) == tamanho
+        heappush(fila, (
+            perda + (0 if completo else perda_retorno), tamanho, next(desempate),
+            perda_pai, caminho, escolhas, filhos, i,
+        ))
+
+    for tamanho in tamanhos:
+        if tamanho >= menor:
+            _empilhar(tamanho, 0, (), (), [(0, (origem,), ())], 0)
+
+    while fila:
+        if orcamento is not None and orcamento.passo():
+            yield PAUSA_BUSCA
+        _, tamanho, _, perda_pai, caminho, escolhas, filhos, i = heappop(fila)
+        if i + 1 < len(filhos):
+            _empilhar(tamanho, perda_pai, caminho, escolhas, filhos, i + 1)  # Irmão seguinte
+
+        perda_filho, acrescimo, escolhidas = filhos[i]
+        caminho = caminho + acrescimo
+        escolhas = escolhas + escolhidas
+
+        if len(escolhas) < tamanho:
+            proximos = _filhos(caminho, tamanho)
+            if proximos:
+                _empilhar(tamanho, perda_pai + perda_filho, caminho, escolhas, proximos, 0)
+            continue
+
+        # Ciclo completo: só agora os magistrados de cada posição são lidos das classes
+        membros = []
+        for j, tribunal in enumerate(caminho):
+            seguinte = caminho[(j + 1) % len(caminho)]
+            membros.append([
+                m for classe, p in indice.rota_classes(tribunal, seguinte) if p == escolhas[j] for m in classe
+            ])
+        sequencia = formatar_sequencia(caminho)
+        pontuacao = pontuacao_ciclo(escolhas)
+        for magistrados in product(*membros):
+            yield {
+                'magistrados': list(magistrados),
+                'prioridades': list(escolhas),
+                'sequencia': sequencia,
+                'tribunais': list(caminho),
+                'pontuacao': pontuacao,
+            }
+
+
+def enumerar_ciclos_do_magistrado(indice, magistrado: dict, tamanhos=(2, 3, 4), prioridades=TODAS_PRIORIDADES,
+                                  orcamento=None):
+    """
+    Gera os ciclos de classes (formato de enumerar_ciclos_classes, com 'pontuacao') que incluem
+    `magistrado`, sozinho na primeira posição, do maior pontuacao_ciclo ao menor; no empate,
+    o menor ciclo primeiro. Consumir só os k primeiros custa o trabalho desses k, não o de
+    todos os ciclos do magistrado.
+
+    Busca best-first sobre caminhos origem → destino do magistrado → ... de volta à origem,
+    estendidos um tribunal por vez como em enumerar_ciclos_por_pontuacao. Para cada tamanho
+    a chave é a maior pontuação ainda possível (3 pontos por aresta não escolhida, com o
+    retorno à origem limitado pela melhor aresta que chega nela), de modo que um ciclo só
+    sai da fila quando nenhum caminho pendente pode superá-lo. Com `orcamento`, cada caminho
+    retirado da fila conta um passo e, ao esgotar, emite PAUSA_BUSCA.
+    """
+    origem = magistrado.get('origem')
+    permitidas = set(prioridades)
+    tamanhos = sorted(t for t in set(tamanhos) if TAMANHO_MIN <= t <= TAMANHO_MAX)
+    grafo = indice.grafo(prioridades)
+    distancias = indice.distancias(prioridades)
+
+    def _prioridades(de, para):
+        return sorted({p for _, p in indice.rota_classes(de, para) if p in permitidas})
+
+    # Menor perda possível da aresta que fecha o ciclo (qualquer tribunal → origem)
+    chegadas = [p for tribunal in grafo if origem in grafo[tribunal] for p in _prioridades(tribunal, origem)[:1]]
+    iniciais = sorted(
+        (p - 1, (destino,), (p,))
+        for destino, p in indice.destinos(magistrado)
+        if p in permitidas and destino != origem and origem in distancias.get(destino, {})
+    )
+    if not origem or not chegadas or not iniciais or not tamanhos:
+        return
+    perda_retorno = min(chegadas) - 1
+
+    def _filhos(caminho, tamanho):
+        filhos = []
+        atual = caminho[-1]
+        if len(caminho) == tamanho:
+            for q in _prioridades(atual, origem):
+                filhos.append((q - 1, (), (q,)))  # Retorno à origem: fecha o ciclo
+        else:
+            movimentos = tamanho - len(caminho)  # Do próximo tribunal de volta à origem
+            for seguinte in grafo.get(atual, []):
+                if seguinte == origem or seguinte in caminho:
+                    continue
+                if distancias.get(seguinte, {}).get(origem, INALCANCAVEL) > movimentos:
+                    continue
+                for p in _prioridades(atual, seguinte):
+                    filhos.append((p - 1, (seguinte,), (p,)))
+        filhos.sort(key=lambda f: f[0])
+        return filhos
+
+    fila = []
+    desempate = count()
+
+    def _empilhar(tamanho, perda_pai, caminho, escolhas, filhos, i):
+        perda = perda_pai + filhos[i][0]
+        completo = len(escolhas) + len(filhos[i][2]) == tamanho
+        heappush(fila, (
+            perda + (0 if completo else perda_retorno) - 3 * tamanho, tamanho, next(desempate),
+            perda_pai, caminho, escolhas, filhos, i,
+        ))
+
+    for tamanho in tamanhos:
+        _empilhar(tamanho, 0, (origem,), (), iniciais, 0)
+
+    while fila:
+        if orcamento is not None and orcamento.passo():
+            yield PAUSA_BUSCA
+        _, tamanho, _, perda_pai, caminho, escolhas, filhos, i = heappop(fila)
+        if i + 1 < len(filhos):
+            _empilhar(tamanho, perda_pai, caminho, escolhas, filhos, i + 1)  # Irmão seguinte
+
+        perda_filho, acrescimo, escolhidas = filhos[i]
+        caminho = caminho + acrescimo
+        escolhas = escolhas + escolhidas
+
+        if len(escolhas) < tamanho:
+            proximos = _filhos(caminho, tamanho)
+            if proximos:
+                _empilhar(tamanho, perda_pai + perda_filho, caminho, escolhas, proximos, 0)
+            continue
+
+        # Ciclo completo: as demais posições são lidas das classes (sem outra versão do magistrado)
+        classes = [[magistrado]]
+        for j in range(1, tamanho):
+            seguinte = caminho[(j + 1) % tamanho]
+            classes.append([
+                m for classe, p in indice.rota_classes(caminho[j], seguinte) if p == escolhas[j] for m in classe
+                if m.get('id') is None or m.get('id') != magistrado.get('id')
+            ])
+        combinacoes = 1
+        for membros in classes:
+            combinacoes *= len(membros)
+        if not combinacoes:
+            continue
+        yield {
+            'classes': classes,
+            'prioridades': list(escolhas),
+            'sequencia': formatar_sequencia(caminho),
+            'tribunais': list(caminho),
+            'combinacoes': combinacoes,
+            'pontuacao': pontuacao_ciclo(escolhas),
+        }
@@ -0,0 +1,270 @@
+"""
+Linha de comando do motor de permutas (sem Streamlit).
+Sistema Permutatum - Permutas entre magistrados.
+
+Exemplos:
+    python -m utils.cli_permutas base.json buscar TJGO TJBA --tipo triangulacao --expandida
+    python -m utils.cli_permutas base.json buscar TJGO TJBA --tipo melhores --tamanho 4 --limite 20
+    python -m utils.cli_permutas base.json buscar TJGO TJBA --tipo quadrangulacao --regra-entrancia mesma --entrancia Final
+    python -m utils.cli_permutas base.csv pares-aguardando
+    python -m utils.cli_permutas base.json aberta TJPR --sentido chegada --tamanho-max 4
+    python -m utils.cli_permutas base.json feed 123 --limite 20 --regra-entrancia mesma
+    python -m utils.cli_permutas base.json menor-ciclo TJGO TJBA --regra-entrancia mesma --entrancia Inicial
+    python -m utils.cli_permutas base.json perfis-valiosos --limite 20
+    python -m utils.cli_permutas base.parquet varredura relatorio.jsonl.gz --processos 8
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+
+from utils.catalogo_permutas import CatalogoCiclos
+from utils.ciclos_permutas import menor_ciclo
+from utils.contagem_permutas import caminhos_simples, perfis_mais_valiosos
+from utils.entrancia_permutas import REGRAS_ENTRANCIA, grupo_entrancia, indice_compativel
+from utils.feed_permutas import FeedMagistrado
+from utils.indice_permutas import IndicePermutas
+from utils.orcamento_busca import OrcamentoBusca
+from utils import motor_permutas as motor
+
+
+CAMPOS_RESUMO = ("id", "nome", "origem", "destino_1", "destino_2", "destino_3", "entrancia")
+
+# Prazo padrão (segundos) das consultas; --prazo 0 desliga
+PRAZO_PADRAO_SEGUNDOS = 30
+
+
+def carregar_snapshot(caminho: str) -> list[dict]:
+    """Lê a base de magistrados de um arquivo JSON, CSV ou Parquet (lista de registros)."""
+    if caminho.lower().endswith(".json"):
+        with open(caminho, encoding="utf-8") as arquivo:
+            dados = json.load(arquivo)
+        return dados.get("data", []) if isinstance(dados, dict) else dados
+
+    import pandas as pd
+
+    if caminho.lower().endswith(".csv"):
+        tabela = pd.read_csv(caminho, dtype=str, keep_default_na=False)
+    elif caminho.lower().endswith(".parquet"):
+        tabela = pd.read_parquet(caminho)  # Requer pyarrow ou fastparquet
+    else:
+        raise ValueError(f"Formato não suportado: {caminho} (use .json, .csv ou .parquet)")
+
+    registros = tabela.to_dict(orient="records")
+    for registro in registros:
+        for campo, valor in registro.items():
+            if valor == "" or (isinstance(valor, float) and math.isnan(valor)):
+                registro[campo] = None
+    return registros
+
+
+def preparar_indice(dados: list[dict]) -> IndicePermutas:
+    """Índice e catálogo de ciclos da base, como nas páginas."""
+    indice = IndicePermutas(dados)
+    indice.catalogo = CatalogoCiclos(indice)
+    return indice
+
+
+def _serializar(valor, indice):
+    """Converte o resultado do motor em JSON, resumindo os registros de magistrados."""
+    if isinstance(valor, dict):
+        if id(valor) in indice.compacto.posicao:
+            return {campo: valor.get(campo) for campo in CAMPOS_RESUMO}
+        return {str(chave): _serializar(v, indice) for chave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_serializar(v, indice) for v in valor]
+    return valor
+
+
+def _buscar(args, indice, orcamento=None):
+    o, d = args.origem, args.destino
+    if args.tipo == "livre":
+        diretas, triangulacoes = motor.busca_livre_inteligente(o, d, indice, orcamento=orcamento)
+        return {"permutas_diretas": diretas, "triangulacoes": triangulacoes}
+    if args.tipo == "triangulacao":
+        if args.expandida:
+            return motor.triangular_expandidas(o, d, indice, limite=args.limite, orcamento=orcamento)[0]
+        return motor.triangular_prioritarias(o, d, indice, orcamento=orcamento)
+    if args.tipo == "pecas":
+        if args.expandida:
+            return motor.pecas_faltantes_expandidas(o, d, indice, limite=args.limite, orcamento=orcamento)
+        return motor.pecas_faltantes_prioritarias(o, d, indice, orcamento=orcamento)
+    if args.tipo == "quadrangulacao":
+        return motor.buscar_quadrangulacao_func(o, d, indice, limite=args.limite, orcamento=orcamento, expandida=args.expandida)
+    if args.tipo == "melhores":
+        return motor.melhores_ciclos(o, d, indice, args.tamanho, limite=args.limite, orcamento=orcamento)
+    if args.tipo == "pecas-quad":
+        return motor.pecas_faltantes_quadrangulacao(
+            o, d, indice, limite=args.limite, orcamento=orcamento, expandida=args.expandida
+        )
+    return motor.buscar_rotacao_func(
+        o, d, indice, args.tamanho, expandida=args.expandida, limite=args.limite, orcamento=orcamento
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Motor de permutas do Permutatum.")
+    parser.add_argument("base", help="Base de magistrados ativos (.json, .csv ou .parquet)")
+    parser.add_argument("--tempo", action="store_true", help="Mostra o tempo de cada etapa no stderr")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    # Orçamento comum das consultas que percorrem ciclos
+    com_orcamento = argparse.ArgumentParser(add_help=False)
+    com_orcamento.add_argument(
+        "--prazo", type=float, default=PRAZO_PADRAO_SEGUNDOS,
+        help=f"Segundos máximos de busca, resultado parcial ao esgotar (padrão {PRAZO_PADRAO_SEGUNDOS}; 0 = sem prazo)",
+    )
+    com_orcamento.add_argument("--max-passos", type=int, default=None, help="Candidatos máximos explorados (resultado parcial)")
+
+    # Filtro de entrância comum das consultas (aplicado via indice_compativel)
+    com_entrancia = argparse.ArgumentParser(add_help=False)
+    com_entrancia.add_argument(
+        "--regra-entrancia", default="qualquer", choices=list(REGRAS_ENTRANCIA),
+        help="Consulta só entre entrâncias compatíveis com --entrancia",
+    )
+    com_entrancia.add_argument("--entrancia", default=None, help="Entrância de referência da regra")
+
+    buscar = comandos.add_parser("buscar", help="Busca por par de tribunais", parents=[com_orcamento, com_entrancia])
+    buscar.add_argument("origem")
+    buscar.add_argument("destino")
+    buscar.add_argument(
+        "--tipo", default="livre",
+        choices=["livre", "triangulacao", "pecas", "quadrangulacao", "pecas-quad", "rotacao", "melhores"],
+    )
+    buscar.add_argument("--expandida", action="store_true", help="Considera os destinos 1, 2 e 3")
+    buscar.add_argument("--tamanho", type=int, default=5, help="Magistrados no ciclo (--tipo rotacao ou melhores)")
+    buscar.add_argument("--limite", type=int, default=50)
+
+    aberta = comandos.add_parser(
+        "aberta", help="Ciclos de até 4 magistrados com um só tribunal, agrupados pelo outro",
+        parents=[com_orcamento, com_entrancia],
+    )
+    aberta.add_argument("tribunal")
+    aberta.add_argument("--sentido", default="chegada", choices=["chegada", "saida"])
+    aberta.add_argument("--tamanho-max", type=int, default=4)
+    aberta.add_argument("--limite-por-grupo", type=int, default=10)
+
+    feed = comandos.add_parser(
+        "feed", help="Ciclos de 2 a 4 magistrados que incluem um magistrado, por pontuação",
+        parents=[com_orcamento, com_entrancia],
+    )
+    feed.add_argument("id", help="Id do magistrado (sem --entrancia, a regra usa a entrância dele)")
+    feed.add_argument("--limite", type=int, default=50)
+
+    menor = comandos.add_parser(
+        "menor-ciclo", help="Menor rotação possível para um par de tribunais", parents=[com_entrancia]
+    )
+    menor.add_argument("origem")
+    menor.add_argument("destino")
+
+    perfis = comandos.add_parser(
+        "perfis-valiosos", help="Cadastros inexistentes que mais ciclos de 2 a 4 fechariam", parents=[com_entrancia]
+    )
+    perfis.add_argument("--limite", type=int, default=20)
+
+    comandos.add_parser("pares-aguardando", help="Magistrados cujo par ainda não existe", parents=[com_entrancia])
+    comandos.add_parser("estatisticas", help="Contagens de origens e destinos")
+
+    varredura = comandos.add_parser("varredura", help="Relatório de todos os 702 pares (.jsonl.gz)")
+    varredura.add_argument("saida")
+    varredura.add_argument("--limite-por-par", type=int, default=1000, help="Ciclos por par e tamanho (0 = sem limite)")
+    varredura.add_argument("--processos", type=int, default=None)
+
+    comandos.add_parser(
+        "rotacao-global", help="Ciclos disjuntos que atendem o maior número de magistrados (aproximado)",
+        parents=[com_orcamento, com_entrancia],
+    )
+
+    args = parser.parse_args(argv)
+
+    def _etapa(nome, inicio):
+        if args.tempo:
+            print(f"{nome}: {time.perf_counter() - inicio:.3f}s", file=sys.stderr)
+
+    inicio = time.perf_counter()
+    dados = carregar_snapshot(args.base)
+    _etapa("carga", inicio)
+
+    if args.comando == "varredura":
+        from utils.relatorio_lote import gerar_relatorio_lote
+
+        inicio = time.perf_counter()
+        resumo = gerar_relatorio_lote(dados, args.saida, limite_por_par=args.limite_por_par or None, processos=args.processos)
+        _etapa("varredura", inicio)
+        print(f"{resumo['pares']} pares gravados em {args.saida} ({resumo['truncados']} truncados)", file=sys.stderr)
+        return
+
+    if args.comando == "estatisticas":
+        destinos, origens, total, tribunais = motor.calcular_estatisticas(dados)
+        resultado = {"destinos": dict(destinos), "origens": dict(origens), "magistrados": total, "tribunais": tribunais}
+        print(json.dumps(resultado, ensure_ascii=False, indent=2))
+        return
+
+    inicio = time.perf_counter()
+    indice = preparar_indice(dados)
+    _etapa("índice", inicio)
+
+    orcamento = None
+    if hasattr(args, "prazo"):
+        orcamento = OrcamentoBusca(prazo_segundos=args.prazo or None, max_passos=args.max_passos)
+
+    magistrado = None
+    if args.comando == "feed":
+        magistrado = next((m for m in dados if str(m.get("id")) == args.id), None)
+        if magistrado is None:
+            parser.error(f"magistrado {args.id} não encontrado")
+        if not args.entrancia:
+            args.entrancia = magistrado.get("entrancia")
+
+    regra = REGRAS_ENTRANCIA[args.regra_entrancia]
+    if regra is not None and not args.entrancia:
+        parser.error("--regra-entrancia exige --entrancia")
+    inicio = time.perf_counter()
+    indice_consulta = indice_compativel(indice, regra, grupo_entrancia(args.entrancia, regra))
+    _etapa("entrância", inicio)
+
+    inicio = time.perf_counter()
+    if args.comando == "buscar":
+        resultado = _buscar(args, indice_consulta, orcamento)
+    elif args.comando == "aberta":
+        resultado = motor.busca_aberta(
+            args.tribunal, indice_consulta, args.sentido, tamanho_max=args.tamanho_max,
+            limite_por_grupo=args.limite_por_grupo, orcamento=orcamento,
+        )
+    elif args.comando == "feed":
+        feed = FeedMagistrado(indice_consulta, magistrado, limite=args.limite, orcamento=orcamento)
+        resultado = {"total": feed.total, "ciclos": feed.ciclos}
+    elif args.comando == "menor-ciclo":
+        resultado = {
+            "menor": menor_ciclo(indice_consulta, args.origem, args.destino),
+            "menor_destino_1": menor_ciclo(indice_consulta, args.origem, args.destino, (1,)),
+        }
+    elif args.comando == "perfis-valiosos":
+        resultado = perfis_mais_valiosos(caminhos_simples(indice_consulta), limite=args.limite)
+    elif args.comando == "pares-aguardando":
+        resultado = motor.buscar_pares_aguardando(indice_consulta)
+    else:
+        from utils.rotacao_global import relatorio_rotacoes_globais
+
+        resultado = relatorio_rotacoes_globais(indice_consulta, orcamento=orcamento)
+        print(
+            f"rotação global {'incompleta' if resultado['melhoria_incompleta'] else 'aproximada'}: "
+            f"{resultado['magistrados_atendidos']} de {resultado['total_magistrados']} magistrados "
+            f"(limite superior {resultado['limite_superior']['magistrados']}, "
+            f"folga {resultado['folga']['magistrados']})",
+            file=sys.stderr,
+        )
+    _etapa(args.comando, inicio)
+    if orcamento is not None and orcamento.incompleta:
+        print(
+            f"busca incompleta: {orcamento.explorados} de ~{orcamento.total_estimado} candidatos explorados",
+            file=sys.stderr,
+        )
+
+    print(json.dumps(_serializar(resultado, indice), ensure_ascii=False, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
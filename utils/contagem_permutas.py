@@ -0,0 +1,147 @@
+"""
+Contagem de ciclos de permuta por álgebra matricial (NumPy).
+Sistema Permutatum - Permutas entre magistrados.
+Conta, para todos os pares (origem, destino) de uma vez, as permutas diretas,
+triangulações e quadrangulações possíveis, sem enumerar os magistrados.
+"""
+
+import numpy as np
+
+from utils.snapshot_compacto import TRIBUNAIS
+
+
+# Pontuação usada na compatibilidade: prioridade 1 = 3 pontos, 2 = 2, 3 = 1
+PESOS_PRIORIDADE = {1: 3, 2: 2, 3: 1}
+
+
+def matriz_adjacencia(indice, prioridades=(1, 2, 3), pesos=None, tribunais=TRIBUNAIS) -> np.ndarray:
+    """
+    Matriz 27×27 onde W[i, j] é o número de magistrados de tribunais[i] que desejam
+    tribunais[j] com uma das prioridades permitidas. Com `pesos` ({prioridade: peso}),
+    cada magistrado contribui com o peso da sua prioridade em vez de 1.
+    """
+    posicao = {t: i for i, t in enumerate(tribunais)}
+    permitidas = set(prioridades)
+    matriz = np.zeros((len(tribunais), len(tribunais)), dtype=np.int64 if pesos is None else np.float64)
+    for (origem, destino), candidatos in indice.por_rota.items():
+        if origem not in posicao or destino not in posicao or origem == destino:
+            continue
+        valor = 0
+        for _, prioridade in candidatos:
+            if prioridade in permitidas:
+                valor += 1 if pesos is None else pesos.get(prioridade, 0)
+        matriz[posicao[origem], posicao[destino]] = valor
+    return matriz
+
+
+def caminhos_simples(indice, prioridades=(1, 2, 3), tribunais=TRIBUNAIS) -> dict[str, np.ndarray]:
+    """
+    Retorna matrizes P onde P[a, b] é o número de combinações de magistrados formando um
+    caminho simples a → ... → b (tribunais distintos), pelo tamanho do ciclo que o caminho
+    fecha junto com uma aresta b → a:
+    - 'diretas': a → b
+    - 'triangulacoes': a → x → b
+    - 'quadrangulacoes': a → x → y → b
+    """
+    w = matriz_adjacencia(indice, prioridades, tribunais=tribunais)
+    w2 = w @ w
+    w3 = w2 @ w
+    diag_w2 = np.diag(w2)
+
+    # Caminhos simples de 3 passos a → x → y → b: os passeios de W³ menos os que
+    # repetem tribunal (x = b ou y = a), somando de volta a interseção (x = b e y = a).
+    caminhos_3 = w3 - w * diag_w2[np.newaxis, :] - diag_w2[:, np.newaxis] * w + w * w.T * w
+
+    return {'diretas': w, 'triangulacoes': w2, 'quadrangulacoes': caminhos_3}
+
+
+def contar_ciclos(indice, prioridades=(1, 2, 3), tribunais=TRIBUNAIS) -> dict[str, np.ndarray]:
+    """
+    Retorna matrizes C onde C[o, d] é o número exato de combinações de magistrados
+    origem → ... → destino → origem (todos os tribunais distintos):
+    - 'diretas': o ↔ d
+    - 'triangulacoes': o → x → d → o
+    - 'quadrangulacoes': o → a → b → d → o
+    """
+    caminhos = caminhos_simples(indice, prioridades, tribunais)
+    retorno = caminhos['diretas'].T  # retorno[o, d] = magistrados do destino que desejam a origem
+
+    contagens = {nome: matriz * retorno for nome, matriz in caminhos.items()}
+    for matriz in contagens.values():
+        np.fill_diagonal(matriz, 0)  # Origem e destino devem ser diferentes
+    return contagens
+
+
+def ganho_por_destino(caminhos: dict[str, np.ndarray], origem: str, destinos_atuais=(), tribunais=TRIBUNAIS) -> list[dict]:
+    """
+    Simulação "e se": para cada tribunal d, quantos ciclos um magistrado de `origem` passaria
+    a fechar ao desejar d. Cada ciclo novo é a aresta origem → d mais um caminho simples
+    d → ... → origem, lido direto das matrizes de caminhos_simples (sem refazer buscas).
+    Retorna linhas {'destino', 'diretas', 'triangulacoes', 'quadrangulacoes', 'total', 'atual'},
+    da que mais rende à que menos; 'atual' marca os destinos que o magistrado já tem.
+    """
+    if origem not in tribunais:
+        return []
+    o = tribunais.index(origem)
+    linhas = []
+    for d, destino in enumerate(tribunais):
+        if d == o:
+            continue
+        linha = {'destino': destino}
+        linha.update({nome: int(matriz[d, o]) for nome, matriz in caminhos.items()})
+        linha['total'] = linha['diretas'] + linha['triangulacoes'] + linha['quadrangulacoes']
+        linha['atual'] = destino in destinos_atuais
+        linhas.append(linha)
+    return sorted(linhas, key=lambda x: (x['total'], x['diretas'], x['triangulacoes']), reverse=True)
+
+
+def perfis_mais_valiosos(caminhos: dict[str, np.ndarray], limite: int | None = None, tribunais=TRIBUNAIS) -> list[dict]:
+    """
+    Perfis "magistrado de X que deseja Y" que ainda não existem na base, ordenados por quantos
+    ciclos de 2 a 4 magistrados um único cadastro com esse perfil fecharia. Mesma leitura de
+    ganho_por_destino, feita para os 702 pares de uma vez sobre as matrizes de caminhos_simples.
+    Retorna linhas {'origem', 'destino', 'diretas', 'triangulacoes', 'quadrangulacoes', 'total'}.
+    """
+    existentes = caminhos['diretas'] > 0
+    # ganhos[x, y] = caminhos y → ... → x que a nova aresta x → y fecharia
+    ganhos = {nome: matriz.T for nome, matriz in caminhos.items()}
+    total = ganhos['diretas'] + ganhos['triangulacoes'] + ganhos['quadrangulacoes']
+    faltantes = ~existentes & ~np.eye(len(tribunais), dtype=bool) & (total > 0)
+
+    linhas = []
+    for i, j in zip(*np.nonzero(faltantes)):
+        linha = {'origem': tribunais[i], 'destino': tribunais[j]}
+        linha.update({nome: int(matriz[i, j]) for nome, matriz in ganhos.items()})
+        linha['total'] = int(total[i, j])
+        linhas.append(linha)
+    linhas.sort(key=lambda x: (x['total'], x['diretas'], x['triangulacoes']), reverse=True)
+    return linhas if limite is None else linhas[:limite]
+
+
+def contagem_do_par(contagens: dict[str, np.ndarray], origem: str, destino: str, tribunais=TRIBUNAIS) -> dict[str, int]:
+    """Extrai as contagens de um par (origem, destino) das matrizes de contar_ciclos."""
+    if origem not in tribunais or destino not in tribunais:
+        return {nome: 0 for nome in contagens}
+    i, j = tribunais.index(origem), tribunais.index(destino)
+    return {nome: int(matriz[i, j]) for nome, matriz in contagens.items()}
+
+
+def tabela_liquidez(contagens: dict[str, np.ndarray], tribunais=TRIBUNAIS) -> list[dict]:
+    """Linhas (origem, destino, contagens) dos 702 pares ordenados, do mais líquido ao menos."""
+    linhas = []
+    for i, origem in enumerate(tribunais):
+        for j, destino in enumerate(tribunais):
+            if i == j:
+                continue
+            diretas = int(contagens['diretas'][i, j])
+            triangulacoes = int(contagens['triangulacoes'][i, j])
+            quadrangulacoes = int(contagens['quadrangulacoes'][i, j])
+            linhas.append({
+                'origem': origem,
+                'destino': destino,
+                'diretas': diretas,
+                'triangulacoes': triangulacoes,
+                'quadrangulacoes': quadrangulacoes,
+                'total': diretas + triangulacoes + quadrangulacoes,
+            })
+    return sorted(linhas, key=lambda x: (x['total'], x['diretas']), reverse=True)
@@ -0,0 +1,73 @@
+"""
+Cursor de paginação sobre as buscas do motor de permutas.
+Sistema Permutatum - Permutas entre magistrados.
+Mantém o gerador da busca vivo entre páginas: cada "carregar mais" consome só os novos resultados.
+"""
+
+from utils.orcamento_busca import PAUSA_BUSCA
+
+
+class CursorBusca:
+    """
+    Envolve um gerador de resultados e entrega páginas sob demanda.
+    Com um OrcamentoBusca (o mesmo passado ao gerador), cada página tem o seu prazo:
+    quando ele acaba a página sai parcial e a seguinte continua do mesmo ponto.
+    A página lê um resultado a mais, dentro do próprio prazo, para responder tem_mais sem
+    voltar ao gerador; se o prazo acaba nessa leitura, a página entregue continua completa.
+    """
+
+    def __init__(self, gerador, orcamento=None):
+        self._gerador = gerador
+        self._pendente = []  # Um resultado lido antecipadamente para saber se há mais
+        self.orcamento = orcamento
+        self.entregues = 0
+        self.esgotado = False
+        self.pausado = False  # O orçamento acabou antes do fim da busca
+        self._curta = False  # A última página saiu com menos resultados que o pedido
+
+    def _antecipar(self):
+        if not self._pendente and not self.esgotado and not self.pausado:
+            try:
+                item = next(self._gerador)
+            except StopIteration:
+                self.esgotado = True
+                return
+            if item is PAUSA_BUSCA:
+                self.pausado = True
+            else:
+                self._pendente.append(item)
+
+    def iterar(self, tamanho: int):
+        """
+        Entrega até `tamanho` novos resultados um a um, à medida que a busca os encontra
+        (para exibi-los sem esperar a página inteira). Continua de onde a página anterior parou.
+        """
+        if self.orcamento is not None:
+            self.orcamento.renovar()
+        self.pausado = False
+        entregues = 0
+        for _ in range(tamanho):
+            self._antecipar()
+            if not self._pendente:
+                break
+            self.entregues += 1
+            entregues += 1
+            yield self._pendente.pop()
+        self._curta = entregues < tamanho
+        self._antecipar()  # Resultado seguinte, guardado para tem_mais e para a próxima página
+        if self.orcamento is not None:
+            self.orcamento.concluir()
+
+    def pagina(self, tamanho: int) -> list:
+        """Retorna até `tamanho` novos resultados, continuando de onde a página anterior parou."""
+        return list(self.iterar(tamanho))
+
+    @property
+    def tem_mais(self) -> bool:
+        """Indica se ainda há resultados a entregar (ou busca interrompida a continuar); não avança a busca."""
+        return bool(self._pendente) or not self.esgotado
+
+    @property
+    def incompleta(self) -> bool:
+        """A última página saiu incompleta: o orçamento acabou antes de ela se encher."""
+        return self.pausado and self._curta
@@ -0,0 +1,165 @@
+"""
+Delta incremental de ciclos de permuta para a alteração de um único magistrado.
+Sistema Permutatum - Permutas entre magistrados.
+Em vez de varrer a base inteira a cada cadastro, edição ou exclusão, calcula apenas os
+ciclos (2 a 4 magistrados) que passam pelo registro alterado, antes e depois da mudança,
+e as arestas do grafo de tribunais que a mudança cria ou elimina (o catálogo de rotas só
+precisa ser refeito quando alguma muda).
+"""
+
+from itertools import product
+
+from utils.ciclos_permutas import formatar_sequencia, TODAS_PRIORIDADES
+from utils.snapshot_compacto import destinos_com_prioridade
+
+
+TAMANHOS_DELTA = (2, 3, 4)
+
+
+def _identificacoes(*registros) -> tuple[set, set]:
+    """Ids e emails (minúsculos) que identificam o magistrado alterado em qualquer versão."""
+    ids, emails = set(), set()
+    for registro in registros:
+        if not registro:
+            continue
+        if registro.get('id') is not None:
+            ids.add(registro.get('id'))
+        if registro.get('email'):
+            emails.add(registro.get('email').lower())
+    return ids, emails
+
+
+def alteracoes_entre(anterior, atual) -> list[tuple[dict | None, dict | None]] | None:
+    """
+    Pares (registro anterior, registro novo) dos magistrados que mudaram entre dois índices
+    (cadastro: anterior=None; exclusão: novo=None). None se algum registro não tem id e a
+    comparação não é possível.
+    """
+    if len(anterior.por_id) != len(anterior.dados) or len(atual.por_id) != len(atual.dados):
+        return None
+    return [
+        (anterior.por_id.get(chave), atual.por_id.get(chave))
+        for chave in set(anterior.por_id) | set(atual.por_id)
+        if anterior.por_id.get(chave) != atual.por_id.get(chave)
+    ]
+
+
+def arestas_alteradas(indice, alteracoes, prioridades=TODAS_PRIORIDADES) -> set[tuple[str, str]]:
+    """
+    Arestas (origem, destino) do grafo de tribunais que existem numa só das versões da base,
+    dadas as `alteracoes` [(anterior, novo)]. O índice pode conter qualquer das versões dos
+    registros alterados: eles são descontados e contados à parte, versão a versão.
+    """
+    ids, emails = _identificacoes(*(registro for par in alteracoes for registro in par))
+    permitidas = set(prioridades)
+
+    def _arestas(registro):
+        if not registro or not registro.get('origem'):
+            return []
+        return [(registro.get('origem'), d) for d, p in destinos_com_prioridade(registro) if p in permitidas]
+
+    antes, depois = {}, {}
+    for anterior, novo in alteracoes:
+        for aresta in _arestas(anterior):
+            antes[aresta] = antes.get(aresta, 0) + 1
+        for aresta in _arestas(novo):
+            depois[aresta] = depois.get(aresta, 0) + 1
+
+    alteradas = set()
+    for aresta in set(antes) | set(depois):
+        if any(
+            p in permitidas
+            and not (m.get('id') is not None and m.get('id') in ids)
+            and (m.get('email') or '').lower() not in emails
+            for m, p in indice.rota(*aresta)
+        ):
+            continue  # Outro magistrado mantém a aresta nas duas versões
+        if (aresta in antes) != (aresta in depois):
+            alteradas.add(aresta)
+    return alteradas
+
+
+def _chave_magistrado(magistrado: dict):
+    if magistrado.get('id') is not None:
+        return ('id', magistrado.get('id'))
+    return ('email', (magistrado.get('email') or '').lower())
+
+
+def ciclos_do_registro(indice, registro: dict, tamanhos=TAMANHOS_DELTA, prioridades=TODAS_PRIORIDADES,
+                       excluir: tuple[set, set] | None = None):
+    """
+    Gera os ciclos que o `registro` fecha com os demais magistrados do índice, com ele
+    na primeira posição (mesmo formato de enumerar_ciclos). Versões do próprio magistrado
+    que estejam no índice são ignoradas. O custo depende só da vizinhança do registro.
+    """
+    if not registro or not registro.get('origem'):
+        return
+    ids, emails = excluir if excluir is not None else _identificacoes(registro)
+    permitidas = set(prioridades)
+    grafo = indice.grafo(prioridades)
+    origem = registro.get('origem')
+    tamanho_max = max(tamanhos)
+
+    def _outro(magistrado):
+        if magistrado.get('id') is not None and magistrado.get('id') in ids:
+            return False
+        return (magistrado.get('email') or '').lower() not in emails
+
+    def _rotas(caminho):
+        # caminho = [origem, destino, ...]; fecha quando o último tribunal quer a origem
+        atual = caminho[-1]
+        if len(caminho) in tamanhos and origem in grafo.get(atual, []):
+            yield list(caminho)
+        if len(caminho) < tamanho_max:
+            for proximo in grafo.get(atual, []):
+                if proximo not in caminho:
+                    yield from _rotas(caminho + [proximo])
+
+    for destino, prioridade in destinos_com_prioridade(registro):
+        if prioridade not in permitidas or destino == origem:
+            continue
+        for tribunais in _rotas([origem, destino]):
+            candidatos = [[(registro, prioridade)]]
+            for i in range(1, len(tribunais)):
+                seguinte = tribunais[(i + 1) % len(tribunais)]
+                candidatos.append([
+                    (m, p) for m, p in indice.rota(tribunais[i], seguinte)
+                    if p in permitidas and _outro(m)
+                ])
+
+            sequencia = formatar_sequencia(tribunais)
+            for combinacao in product(*candidatos):
+                yield {
+                    'magistrados': [m for m, _ in combinacao],
+                    'prioridades': [p for _, p in combinacao],
+                    'sequencia': sequencia,
+                    'tribunais': list(tribunais),
+                }
+
+
+def calcular_delta(indice, anterior: dict | None, novo: dict | None,
+                   tamanhos=TAMANHOS_DELTA, prioridades=TODAS_PRIORIDADES) -> dict[str, list[dict]]:
+    """
+    Ciclos criados e desfeitos pela alteração de um magistrado.
+    - Cadastro: anterior=None; exclusão: novo=None; edição: os dois registros.
+    O índice pode conter a versão antiga, a nova ou nenhuma delas do magistrado (basta o
+    índice já em cache da base, sem recarregá-la).
+    Retorna {'criados': [ciclo], 'desfeitos': [ciclo], 'arestas': arestas_alteradas}, com o
+    magistrado na primeira posição dos ciclos.
+    """
+    excluir = _identificacoes(anterior, novo)
+
+    def _por_chave(registro):
+        ciclos = {}
+        for ciclo in ciclos_do_registro(indice, registro, tamanhos, prioridades, excluir):
+            chave = (tuple(ciclo['tribunais']), tuple(_chave_magistrado(m) for m in ciclo['magistrados'][1:]))
+            ciclos.setdefault(chave, ciclo)
+        return ciclos
+
+    antes = _por_chave(anterior)
+    depois = _por_chave(novo)
+    return {
+        'criados': [ciclo for chave, ciclo in depois.items() if chave not in antes],
+        'desfeitos': [ciclo for chave, ciclo in antes.items() if chave not in depois],
+        'arestas': arestas_alteradas(indice, [(anterior, novo)], prioridades),
+    }
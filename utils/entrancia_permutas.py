@@ -0,0 +1,86 @@
+"""
+Regras de compatibilidade de entrância para o motor de permutas.
+Sistema Permutatum - Permutas entre magistrados.
+Uma regra agrupa as entrâncias compatíveis entre si; a base é particionada por grupo e cada
+busca percorre só o índice do grupo escolhido, sem montar ciclos que nunca se realizariam.
+"""
+
+import hashlib
+
+from utils.catalogo_permutas import CatalogoCiclos
+from utils.indice_permutas import IndicePermutas
+
+
+# Entrâncias do cadastro (mesma ordem das listas das páginas)
+ENTRANCIAS = [
+    "Juiz(a) Substituto(a)",
+    "Inicial",
+    "Intermediária",
+    "Final",
+    "Única",
+    "2º Grau",
+]
+
+# Regras prontas: entrância → grupo de compatibilidade (None = sem restrição)
+REGRAS_ENTRANCIA = {
+    "qualquer": None,
+    "mesma": {entrancia: entrancia for entrancia in ENTRANCIAS},
+    "grau": {entrancia: ("2º grau" if entrancia == "2º Grau" else "1º grau") for entrancia in ENTRANCIAS},
+}
+
+
+def grupos_da_matriz(matriz: dict[str, set[str]]) -> dict[str, str]:
+    """
+    Converte uma matriz de compatibilidade (entrância → entrâncias compatíveis) em grupos.
+    Para particionar a base a matriz precisa ser uma equivalência (simétrica, reflexiva e
+    transitiva, isto é, em blocos); caso contrário, levanta ValueError.
+    """
+    grupos = {}
+    for entrancia in matriz:
+        if entrancia in grupos:
+            continue
+        bloco = set(matriz[entrancia]) | {entrancia}
+        for outra in bloco:
+            if set(matriz.get(outra, ())) | {outra} != bloco:
+                raise ValueError(
+                    f"Matriz de compatibilidade não é particionável: {entrancia!r} e {outra!r} "
+                    f"têm conjuntos de entrâncias compatíveis diferentes"
+                )
+        nome = " / ".join(sorted(bloco))
+        for outra in bloco:
+            grupos[outra] = nome
+    return grupos
+
+
+def grupo_entrancia(entrancia, regra: dict[str, str] | None):
+    """Grupo de compatibilidade da entrância; entrâncias fora da regra formam grupo próprio."""
+    if regra is None:
+        return None
+    return regra.get(entrancia, entrancia)
+
+
+def particionar(dados: list[dict], regra: dict[str, str] | None) -> dict:
+    """Magistrados por grupo de compatibilidade, mantendo a ordem original dos dados."""
+    particoes = {}
+    for magistrado in dados or []:
+        particoes.setdefault(grupo_entrancia(magistrado.get("entrancia"), regra), []).append(magistrado)
+    return particoes
+
+
+def indice_compativel(indice: IndicePermutas, regra: dict[str, str] | None, grupo) -> IndicePermutas:
+    """
+    Índice (com catálogo de ciclos) só dos magistrados do `grupo`, construído uma vez por
+    versão e guardado no próprio índice da base. Sem regra, retorna o índice completo.
+    """
+    if regra is None:
+        return indice
+
+    chave = (tuple(sorted(regra.items())), grupo)
+    if chave not in indice.particoes:
+        dados = [m for m in indice.dados if grupo_entrancia(m.get("entrancia"), regra) == grupo]
+        # Versão própria (caches por versão não confundem a partição com a base inteira)
+        sufixo = hashlib.sha1(repr(chave).encode("utf-8")).hexdigest()[:12]
+        parcial = IndicePermutas(dados, versao=f"{indice.versao}:{sufixo}")
+        parcial.catalogo = CatalogoCiclos(parcial)
+        indice.particoes[chave] = parcial
+    return indice.particoes[chave]
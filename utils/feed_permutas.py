@@ -0,0 +1,78 @@
+"""
+Feed pessoal de ciclos de permuta do magistrado autenticado.
+Sistema Permutatum - Permutas entre magistrados.
+Os melhores ciclos de 2 a 4 magistrados que incluem o usuário, ordenados pela pontuação,
+gerados por busca best-first no login e a cada nova versão da base.
+"""
+
+from itertools import islice
+
+from utils.ciclos_permutas import enumerar_ciclos_do_magistrado, expandir_ciclo
+from utils.contagem_permutas import caminhos_simples
+from utils.delta_permutas import TAMANHOS_DELTA
+from utils.orcamento_busca import PAUSA_BUSCA
+from utils.snapshot_compacto import TRIBUNAIS, destinos_com_prioridade
+
+
+class FeedMagistrado:
+    """
+    Ciclos (2 a 4) de um magistrado, do mais compatível ao menos, para uma versão da base.
+    - ciclos: até `limite` ciclos, com o magistrado na primeira posição e 'pontuacao'
+    - total: quantos ciclos existem ao todo
+    - incompleta: o orçamento acabou antes de chegar a `limite` ciclos (os exibidos são os melhores)
+    - atualizar(indice): adota uma nova versão da base
+    """
+
+    def __init__(self, indice, magistrado: dict, limite: int = 200, orcamento=None):
+        self.magistrado = magistrado
+        self.id = magistrado.get('id')
+        self.limite = limite
+        self.orcamento = orcamento
+        self.recalculos = 0
+        self._calcular(indice)
+
+    def _total(self, indice) -> int:
+        """Ciclos de 2 a 4 que incluem o magistrado, lidos das matrizes de caminhos simples."""
+        origem = self.magistrado.get('origem')
+        if origem not in TRIBUNAIS:
+            return 0
+        caminhos = caminhos_simples(indice)
+        o = TRIBUNAIS.index(origem)
+        return sum(
+            int(matriz[TRIBUNAIS.index(destino), o])
+            for destino, _ in destinos_com_prioridade(self.magistrado)
+            if destino in TRIBUNAIS and destino != origem
+            for matriz in caminhos.values()
+        )
+
+    def _calcular(self, indice):
+        self.versao = indice.versao
+        atual = indice.por_id.get(self.id, self.magistrado)
+        self.magistrado = atual
+        if self.orcamento is not None:
+            self.orcamento.renovar()
+
+        # Best-first sobre os caminhos que saem das arestas do usuário: só os `limite`
+        # primeiros ciclos são gerados; o total vem das matrizes de caminhos simples
+        self.total = self._total(indice)
+        ciclos = []  # Lista nova: quem já leu self.ciclos continua com a versão anterior inteira
+        for ciclo in enumerar_ciclos_do_magistrado(indice, atual, TAMANHOS_DELTA, orcamento=self.orcamento):
+            if ciclo is PAUSA_BUSCA:
+                break  # Parcial: orcamento.incompleta (os ciclos já gerados são os melhores, em ordem)
+            for expandido in islice(expandir_ciclo(ciclo), self.limite - len(ciclos)):
+                ciclos.append({**expandido, 'pontuacao': ciclo['pontuacao']})
+            if len(ciclos) >= self.limite:
+                break
+        self.ciclos = ciclos
+        self.incompleta = self.orcamento is not None and self.orcamento.incompleta
+        self.recalculos += 1
+
+    def atualizar(self, indice) -> bool:
+        """
+        Adota a versão `indice` da base, recalculando o feed (poucos milissegundos: só os
+        `limite` primeiros ciclos são gerados). Retorna se recalculou.
+        """
+        if indice.versao == self.versao:
+            return False
+        self._calcular(indice)
+        return True
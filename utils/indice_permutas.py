@@ -0,0 +1,161 @@
+"""
+Índices invertidos da base de magistrados para o motor de permutas.
+Sistema Permutatum - Permutas entre magistrados.
+Construídos uma única vez por versão da base (snapshot) e reutilizados por todas as buscas.
+"""
+
+import hashlib
+import json
+
+from utils.snapshot_compacto import SnapshotCompacto
+
+
+def versao_snapshot(dados: list[dict]) -> str:
+    """Gera uma impressão digital da base; muda sempre que algum registro muda."""
+    conteudo = json.dumps(dados or [], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()
+
+
+class IndicePermutas:
+    """
+    Índices da base de magistrados ativos, mantendo a ordem original dos dados:
+    - por_id: id → magistrado
+    - por_origem: origem → [magistrado]
+    - por_rota: (origem, destino) → [(magistrado, prioridade)]
+    - por_destino: destino → [(magistrado, prioridade)]
+    - contagem_rota: (origem, destino) → [qtd. com prioridade ≤ 1, ≤ 2, ≤ 3]
+    - classes: assinatura (origem, destinos) → [magistrado]; quem tem a mesma assinatura
+      é intercambiável em qualquer ciclo
+    - classes_rota: (origem, destino) → [([magistrado da classe], prioridade)]
+    """
+
+    def __init__(self, dados: list[dict], versao: str | None = None):
+        self.dados = dados or []
+        self.versao = versao if versao is not None else versao_snapshot(self.dados)
+        # Conversão única para a forma compacta; os laços de busca leem os destinos dela
+        self.compacto = SnapshotCompacto(self.dados)
+        self.por_origem: dict[str, list[dict]] = {}
+        self.por_rota: dict[tuple[str, str], list[tuple[dict, int]]] = {}
+        self.por_destino: dict[str, list[tuple[dict, int]]] = {}
+        self.por_id: dict = {}
+        self.classes: dict[tuple, list[dict]] = {}
+        self.classes_rota: dict[tuple[str, str], list[tuple[list[dict], int]]] = {}
+        self._grafos: dict[tuple[int, ...], dict[str, list[str]]] = {}
+        self._distancias: dict[tuple[int, ...], dict[str, dict[str, int]]] = {}
+        # Catálogo de ciclos desta versão (utils.catalogo_permutas), anexado por quem o constrói
+        self.catalogo = None
+        # Índices por grupo de entrância compatível (utils.entrancia_permutas), criados sob demanda
+        self.particoes: dict = {}
+
+        for magistrado, destinos in zip(self.dados, self.compacto.destinos_tupla):
+            if magistrado.get("id") is not None:
+                self.por_id[magistrado.get("id")] = magistrado
+            origem = magistrado.get("origem")
+            if not origem:
+                continue
+            self.por_origem.setdefault(origem, []).append(magistrado)
+            for destino, prioridade in destinos:
+                self.por_rota.setdefault((origem, destino), []).append((magistrado, prioridade))
+                self.por_destino.setdefault(destino, []).append((magistrado, prioridade))
+
+            assinatura = (origem, destinos)
+            membros = self.classes.get(assinatura)
+            if membros is None:
+                # Nova classe: entra uma vez em cada rota; os próximos membros só se somam à lista
+                membros = self.classes[assinatura] = []
+                for destino, prioridade in destinos:
+                    self.classes_rota.setdefault((origem, destino), []).append((membros, prioridade))
+            membros.append(magistrado)
+
+        # Matriz esparsa origem × destino de contagens acumuladas por prioridade:
+        # toda verificação "existe alguém em X que deseja Y" vira uma consulta O(1)
+        self.contagem_rota: dict[tuple[str, str], list[int]] = {}
+        for rota, candidatos in self.por_rota.items():
+            contagem = [0, 0, 0]
+            for _, prioridade in candidatos:
+                for i in range(prioridade - 1, 3):
+                    contagem[i] += 1
+            self.contagem_rota[rota] = contagem
+
+    @property
+    def origens(self) -> list[str]:
+        """Tribunais que possuem ao menos um magistrado cadastrado."""
+        return list(self.por_origem)
+
+    def da_origem(self, origem: str) -> list[dict]:
+        """Magistrados lotados no tribunal de origem."""
+        return self.por_origem.get(origem, [])
+
+    def destinos(self, magistrado: dict) -> tuple[tuple[str, int], ...]:
+        """Destinos [(tribunal, prioridade)] do magistrado, pré-calculados na carga."""
+        return self.compacto.destinos_de(magistrado)
+
+    def rota(self, origem: str, destino: str, prioridade_max: int = 3) -> list[tuple[dict, int]]:
+        """Magistrados da origem que desejam o destino com prioridade até prioridade_max."""
+        candidatos = self.por_rota.get((origem, destino), [])
+        if prioridade_max >= 3:
+            return candidatos
+        return [(m, p) for m, p in candidatos if p <= prioridade_max]
+
+    def rota_classes(self, origem: str, destino: str, prioridade_max: int = 3) -> list[tuple[list[dict], int]]:
+        """Classes de assinatura da origem que desejam o destino: [([magistrado], prioridade)]."""
+        classes = self.classes_rota.get((origem, destino), [])
+        if prioridade_max >= 3:
+            return classes
+        return [(membros, p) for membros, p in classes if p <= prioridade_max]
+
+    def interessados(self, destino: str, prioridade_max: int = 3) -> list[tuple[dict, int]]:
+        """Magistrados de qualquer origem que desejam o destino."""
+        candidatos = self.por_destino.get(destino, [])
+        if prioridade_max >= 3:
+            return candidatos
+        return [(m, p) for m, p in candidatos if p <= prioridade_max]
+
+    def quantidade(self, origem: str, destino: str, prioridade_max: int = 3) -> int:
+        """Quantos magistrados da origem desejam o destino com prioridade até prioridade_max."""
+        contagem = self.contagem_rota.get((origem, destino))
+        if not contagem or prioridade_max < 1:
+            return 0
+        return contagem[min(prioridade_max, 3) - 1]
+
+    def existe(self, origem: str, destino: str, prioridade_max: int = 3) -> bool:
+        """Indica se há alguém na origem que deseja o destino."""
+        return self.quantidade(origem, destino, prioridade_max) > 0
+
+    def grafo(self, prioridades=(1, 2, 3)) -> dict[str, list[str]]:
+        """
+        Grafo de tribunais: origem → [destinos desejados por alguém da origem
+        com uma das prioridades permitidas]. Calculado uma vez por combinação.
+        """
+        chave = tuple(sorted(set(prioridades)))
+        if chave not in self._grafos:
+            grafo = {}
+            for (origem, destino), candidatos in self.por_rota.items():
+                if any(p in chave for _, p in candidatos):
+                    grafo.setdefault(origem, []).append(destino)
+            self._grafos[chave] = grafo
+        return self._grafos[chave]
+
+    def distancias(self, prioridades=(1, 2, 3)) -> dict[str, dict[str, int]]:
+        """
+        Menor número de movimentos entre tribunais no grafo: distancias[a][b] existe só se b é
+        alcançável a partir de a. BFS a partir de cada tribunal (27 nós), uma vez por combinação.
+        """
+        chave = tuple(sorted(set(prioridades)))
+        if chave not in self._distancias:
+            grafo = self.grafo(chave)
+            todas = {}
+            for inicio in grafo:
+                distancias = {inicio: 0}
+                fronteira = [inicio]
+                while fronteira:
+                    proxima = []
+                    for tribunal in fronteira:
+                        for seguinte in grafo.get(tribunal, []):
+                            if seguinte not in distancias:
+                                distancias[seguinte] = distancias[tribunal] + 1
+                                proxima.append(seguinte)
+                    fronteira = proxima
+                todas[inicio] = distancias
+            self._distancias[chave] = todas
+        return self._distancias[chave]
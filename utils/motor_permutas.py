@@ -0,0 +1,660 @@
+"""
+Motor de busca de permutas, independente do Streamlit.
+Sistema Permutatum - Permutas entre magistrados.
+Permutas diretas, triangulações, quadrangulações, rotações maiores, peças faltantes,
+pares aguardando e estatísticas; usado pelas páginas e pela linha de comando (utils.cli_permutas).
+"""
+
+from collections import Counter
+from itertools import product
+
+import numpy as np
+
+from utils.ciclos_permutas import (
+    enumerar_ciclos, enumerar_ciclos_por_pontuacao, enumerar_rotas, chave_ciclo, formatar_sequencia, menor_ciclo,
+    pontuacao_ciclo,
+)
+from utils.contagem_permutas import contar_ciclos, contagem_do_par
+from utils.cursor_busca import CursorBusca
+from utils.orcamento_busca import PAUSA_BUSCA
+from utils.snapshot_compacto import bit_tribunal
+
+
+def _estimar_ciclos(indice, origem, destino, tamanhos, prioridades=(1, 2, 3)):
+    """
+    Número de combinações de magistrados das rotas catalogadas (para a barra de progresso).
+    Rotas fora do catálogo não são estimadas, para não percorrer o grafo duas vezes.
+    """
+    catalogo = getattr(indice, 'catalogo', None)
+    total = 0
+    for tamanho in tamanhos:
+        if catalogo is None or tamanho not in catalogo.tamanhos:
+            continue
+        for rota in enumerar_rotas(indice, origem, destino, tamanho, prioridades):
+            produto = 1
+            for i, tribunal in enumerate(rota):
+                produto *= indice.quantidade(tribunal, rota[(i + 1) % len(rota)], max(prioridades))
+            total += produto
+    return total
+
+
+# Função para busca livre inteligente (detecta permutas e triangulações)
+def busca_livre_inteligente(origem_filtro, destino_filtro, indice, orcamento=None, incluir_triangulacoes=True):
+    permutas_diretas = []
+    triangulacoes = []
+    
+    # Se ambos filtros foram aplicados, buscar permutas diretas e triangulações
+    if origem_filtro and destino_filtro:
+        if orcamento is not None:
+            orcamento.estimar(_estimar_ciclos(
+                indice, origem_filtro, destino_filtro, (2, 3) if incluir_triangulacoes else (2,)
+            ))
+        for ciclo in enumerar_ciclos(indice, origem_filtro, destino_filtro, 2):
+            if orcamento is not None and orcamento.passo():
+                return permutas_diretas, triangulacoes  # Parcial: orcamento.incompleta
+            permutas_diretas.append({
+                'magistrado_1': ciclo['magistrados'][0],
+                'magistrado_2': ciclo['magistrados'][1],
+                'prioridade_1': ciclo['prioridades'][0],
+                'prioridade_2': ciclo['prioridades'][1],
+                'sequencia': ciclo['sequencia']
+            })
+
+        if not incluir_triangulacoes:
+            return permutas_diretas, triangulacoes
+
+        for ciclo in enumerar_ciclos(indice, origem_filtro, destino_filtro, 3):
+            if orcamento is not None and orcamento.passo():
+                return permutas_diretas, triangulacoes  # Parcial: orcamento.incompleta
+            triangulacoes.append({
+                'magistrados': ciclo['magistrados'],
+                'sequencia': ciclo['sequencia'],
+                'tribunais': ciclo['tribunais']
+            })
+    
+    return permutas_diretas, triangulacoes
+
+
+# Função para calcular estatísticas
+def calcular_estatisticas(dados):
+    if not dados:
+        return {}, {}, 0, 0
+    
+    destinos = []
+    origens = []
+    tribunais_unicos = set()
+    
+    for magistrado in dados:
+        origem = magistrado.get('origem')
+        if origem:
+            origens.append(origem)
+            tribunais_unicos.add(origem)
+        
+        for destino_col in ['destino_1', 'destino_2', 'destino_3']:
+            destino = magistrado.get(destino_col)
+            if destino:
+                destinos.append(destino)
+                tribunais_unicos.add(destino)
+    
+    destinos_contador = Counter(destinos)
+    origens_contador = Counter(origens)
+    
+    return destinos_contador, origens_contador, len(dados), len(tribunais_unicos)
+
+
+# Função para buscar interessados no tribunal do usuário
+def buscar_interessados(tribunal_usuario, indice):
+    compacto = indice.compacto
+
+    # Máscaras de destino: quem deseja o tribunal e com qual prioridade, numa só operação
+    prioridades = compacto.prioridade_de(tribunal_usuario)
+    prioridades[(compacto.bit_origem & np.uint32(bit_tribunal(tribunal_usuario))) != 0] = 0  # Não mostrar o próprio tribunal
+    posicoes = np.flatnonzero(prioridades)
+
+    interessados = [
+        {'magistrado': compacto.registros[i], 'prioridade': int(prioridades[i])}
+        for i in posicoes[np.argsort(prioridades[posicoes], kind='stable')]
+    ]
+    return interessados
+
+
+# Função para buscar destinos disponíveis
+def buscar_destinos_disponiveis(destinos_usuario, indice):
+    compacto = indice.compacto
+    return [compacto.registros[i] for i in compacto.das_origens(destinos_usuario)]
+
+
+# Funções para triangulação por etapas
+def triangular_prioritarias(origem, destino, indice, orcamento=None):
+    """Etapa 1: Triangulações onde TODOS os envolvidos usam destino_1."""
+    triangulacoes = []
+    if orcamento is not None:
+        orcamento.estimar(_estimar_ciclos(indice, origem, destino, (2, 3), prioridades=(1,)))
+
+    for tamanho, tipo in ((2, 'direta'), (3, 'triangular')):
+        for ciclo in enumerar_ciclos(indice, origem, destino, tamanho, prioridades=(1,)):
+            if orcamento is not None and orcamento.passo():
+                break
+            triangulacoes.append({
+                'tipo': tipo,
+                'magistrados': ciclo['magistrados'],
+                'sequencia': ciclo['sequencia'],
+                'nivel': 'prioritaria'
+            })
+        else:
+            continue
+        break  # Orçamento esgotado: devolve o parcial sem começar o tamanho seguinte (orcamento.incompleta)
+
+    # Remover duplicatas pela chave canônica (ids) do ciclo
+    vistos = set()
+    unicos = []
+    for t in triangulacoes:
+        chave = chave_ciclo(t['magistrados'])
+        if chave not in vistos:
+            vistos.add(chave)
+            unicos.append(t)
+
+    return unicos
+
+
+def gerar_melhores_ciclos(origem, destino, indice, tamanhos=(2, 3), ja_encontradas=None, orcamento=None):
+    """
+    Gerador de ciclos (destinos 1, 2 e 3) dos `tamanhos` pedidos, do mais compatível ao menos
+    compatível (pontuação 3/2/1 por destino 1/2/3), sem repetir os já encontrados.
+    O "top N" de um par sai sem enumerar e ordenar todos os ciclos.
+    """
+    vistos = set()
+    if ja_encontradas:
+        vistos.update(chave_ciclo(c['magistrados']) for c in ja_encontradas)
+    if orcamento is not None:
+        orcamento.estimar(_estimar_ciclos(indice, origem, destino, tamanhos))
+
+    for ciclo in enumerar_ciclos_por_pontuacao(indice, origem, destino, tamanhos, orcamento=orcamento):
+        if ciclo is PAUSA_BUSCA:
+            yield ciclo  # O orçamento conta também os caminhos parciais explorados
+            continue
+        if orcamento is not None and orcamento.passo():
+            yield PAUSA_BUSCA
+        chave = chave_ciclo(ciclo['magistrados'])
+        if chave in vistos:
+            continue
+        vistos.add(chave)
+        yield ciclo
+
+
+def melhores_ciclos(origem, destino, indice, tamanho, limite=20, orcamento=None):
+    """Os `limite` ciclos de `tamanho` magistrados com maior pontuação (ex.: top 20 rotações de um par)."""
+    cursor = CursorBusca(gerar_melhores_ciclos(origem, destino, indice, (tamanho,), orcamento=orcamento), orcamento)
+    return cursor.pagina(limite)
+
+
+def _iniciar_em(ciclo, posicao):
+    """O mesmo ciclo lido a partir do participante em `posicao` (para a busca por saída)."""
+    girar = lambda lista: lista[posicao:] + lista[:posicao]
+    tribunais = girar(ciclo['tribunais'])
+    return {
+        **ciclo,
+        'magistrados': girar(ciclo['magistrados']),
+        'prioridades': girar(ciclo['prioridades']),
+        'tribunais': tribunais,
+        'sequencia': formatar_sequencia(tribunais),
+    }
+
+
+def busca_aberta(tribunal, indice, sentido='chegada', tamanho_max=4, limite_por_grupo=10, orcamento=None):
+    """
+    Busca com um único tribunal escolhido, agrupada pelo outro extremo:
+    - sentido='chegada': ciclos de até `tamanho_max` magistrados que trazem alguém de qualquer
+      tribunal X para `tribunal` (grupo X = origem de quem chega);
+    - sentido='saida': para onde alguém de `tribunal` pode ir (grupo X = destino de quem sai).
+    Os grupos vêm dos índices reversos (quem deseja o tribunal / o que a origem deseja), e não
+    de 26 buscas por par: só as arestas existentes são consultadas, no catálogo de ciclos.
+    Retorna [{'tribunal', 'total', 'ciclos'}], do grupo com mais ciclos ao com menos; 'total'
+    é a contagem exata (matricial) e 'ciclos' os `limite_por_grupo` mais compatíveis.
+    """
+    if sentido not in ('chegada', 'saida'):
+        raise ValueError(f"Sentido inválido: {sentido} (use 'chegada' ou 'saida')")
+    if tamanho_max < 2 or tamanho_max > 4:
+        raise ValueError("A busca aberta considera ciclos de 2 a 4 magistrados")
+
+    if sentido == 'chegada':
+        vizinhos = {m.get('origem') for m, _ in indice.interessados(tribunal)}
+    else:
+        vizinhos = {destino for m in indice.da_origem(tribunal) for destino, _ in indice.destinos(m)}
+    vizinhos.discard(tribunal)
+    vizinhos.discard(None)
+
+    contagens = contar_ciclos(indice)
+    nomes = ('diretas', 'triangulacoes', 'quadrangulacoes')[:tamanho_max - 1]
+    tamanhos = tuple(range(2, tamanho_max + 1))
+    grupos = []
+
+    for outro in sorted(vizinhos):
+        # O par (origem, destino) dos ciclos fecha com destino → origem: é a aresta consultada
+        origem, destino = (tribunal, outro) if sentido == 'chegada' else (outro, tribunal)
+        contagem = contagem_do_par(contagens, origem, destino)
+        total = sum(contagem[nome] for nome in nomes)
+        if not total:
+            continue
+
+        ciclos = []
+        for ciclo in gerar_melhores_ciclos(origem, destino, indice, tamanhos, orcamento=orcamento):
+            if ciclo is PAUSA_BUSCA:
+                break
+            # Na saída, o ciclo é lido a partir de quem sai do tribunal escolhido
+            ciclos.append(ciclo if sentido == 'chegada' else _iniciar_em(ciclo, len(ciclo['tribunais']) - 1))
+            if len(ciclos) >= limite_por_grupo:
+                break
+        grupos.append({'tribunal': outro, 'total': total, 'ciclos': ciclos})
+
+        if orcamento is not None and orcamento.incompleta:
+            break  # Parcial: os grupos restantes ficam de fora
+
+    return sorted(grupos, key=lambda g: g['total'], reverse=True)
+
+
+def gerar_triangulacoes_expandidas(origem, destino, indice, ja_encontradas=None, orcamento=None):
+    """
+    Gerador da etapa 2+: triangulações usando destinos 1, 2 e 3, sem repetir as já encontradas,
+    das mais compatíveis para as menos (permutas diretas antes das triangulações de mesma perda).
+    """
+    for ciclo in gerar_melhores_ciclos(origem, destino, indice, (2, 3), ja_encontradas, orcamento):
+        if ciclo is PAUSA_BUSCA:
+            yield ciclo
+            continue
+        yield {
+            'tipo': 'direta' if len(ciclo['magistrados']) == 2 else 'triangular',
+            'magistrados': ciclo['magistrados'],
+            'sequencia': ciclo['sequencia'],
+            'pontuacao': ciclo['pontuacao'],
+            'nivel': 'expandida'
+        }
+
+
+def triangular_expandidas(origem, destino, indice, limite=50, ja_encontradas=None, orcamento=None):
+    """Etapa 2+: Triangulações usando destinos 1, 2 e 3, com limite."""
+    cursor = CursorBusca(gerar_triangulacoes_expandidas(origem, destino, indice, ja_encontradas, orcamento), orcamento)
+    return cursor.pagina(limite), cursor.tem_mais
+
+
+def buscar_pares_aguardando(indice):
+    """
+    Encontra magistrados que querem ir para um tribunal,
+    mas ninguém desse tribunal quer ir para o tribunal deles.
+    Retorna lista de magistrados 'sem par'.
+    """
+    # Pares (origem, destino desejado) com ao menos um magistrado, em qualquer prioridade
+    pares = set(indice.por_rota)
+    sem_par = []
+
+    for mag in indice.dados:
+        origem = mag.get('origem')
+        destino_1 = mag.get('destino_1')
+
+        if not origem or not destino_1:
+            continue
+
+        # Verificar se existe alguém do destino_1 que queira vir para a origem
+        if (destino_1, origem) not in pares:
+            sem_par.append({
+                'magistrado': mag,
+                'origem': origem,
+                'destino_desejado': destino_1,
+                'falta': f"Magistrado do {destino_1} com destino {origem}"
+            })
+
+    return sem_par
+
+
+def agrupar_pares_por_rota(sem_par):
+    """
+    Agrupa os magistrados sem par por rota (origem, destino desejado), da rota com mais
+    magistrados para a com menos. Retorna [((origem, destino), [itens])].
+    """
+    rotas = {}
+    for item in sem_par:
+        rotas.setdefault((item['origem'], item['destino_desejado']), []).append(item)
+    return sorted(rotas.items(), key=lambda x: len(x[1]), reverse=True)
+
+
+def pecas_faltantes_prioritarias(origem_filtro, destino_filtro, indice, orcamento=None):
+    """Etapa 1: Peças faltantes considerando APENAS destino_1 de todos."""
+    pecas = []
+    vistos = set()
+    if orcamento is not None:
+        orcamento.estimar(
+            indice.quantidade(origem_filtro, destino_filtro, 1) * len(indice.da_origem(destino_filtro))
+            + len(indice.da_origem(origem_filtro))
+        )
+
+    # Cenário A: mag_1 (origem, destino_1=destino), mag_2 (destino, destino_1=X), falta X→origem
+    for mag_1, _ in indice.rota(origem_filtro, destino_filtro, prioridade_max=1):
+        for mag_2 in indice.da_origem(destino_filtro):
+            if orcamento is not None and orcamento.passo():
+                return pecas  # Parcial: orcamento.incompleta
+            dest_2 = mag_2.get('destino_1')
+            if not dest_2 or dest_2 == origem_filtro:
+                continue
+
+            tem_terceiro = indice.existe(dest_2, origem_filtro, prioridade_max=1)
+
+            if not tem_terceiro:
+                chave = chave_ciclo((mag_1, mag_2, (dest_2, origem_filtro)))
+                if chave not in vistos:
+                    vistos.add(chave)
+                    pecas.append({
+                        'mag_1': mag_1,
+                        'mag_2': mag_2,
+                        'chave': chave,
+                        'sequencia': f"{origem_filtro} → {destino_filtro} → {dest_2} → {origem_filtro}",
+                        'falta': f"Magistrado do {dest_2} com destino {origem_filtro}",
+                        'nivel': 'prioritaria'
+                    })
+
+    # Cenário B: mag_1 (origem, destino_1=intermediario), mag_inter (intermediario, destino_1=destino), falta destino→origem
+    if indice.existe(destino_filtro, origem_filtro, prioridade_max=1):
+        return pecas
+
+    for mag_1 in indice.da_origem(origem_filtro):
+        if orcamento is not None and orcamento.passo():
+            break
+        intermediario = mag_1.get('destino_1')
+        if not intermediario or intermediario == destino_filtro:
+            continue
+
+        for mag_inter, _ in indice.rota(intermediario, destino_filtro, prioridade_max=1):
+            chave = chave_ciclo((mag_1, mag_inter, (destino_filtro, origem_filtro)))
+            if chave not in vistos:
+                vistos.add(chave)
+                pecas.append({
+                    'mag_1': mag_1,
+                    'mag_2': mag_inter,
+                    'chave': chave,
+                    'sequencia': f"{origem_filtro} → {intermediario} → {destino_filtro} → {origem_filtro}",
+                    'falta': f"Magistrado do {destino_filtro} com destino {origem_filtro}",
+                    'nivel': 'prioritaria'
+                })
+
+    return pecas
+
+
+def gerar_pecas_faltantes_expandidas(origem_filtro, destino_filtro, indice, ja_encontradas=None, orcamento=None):
+    """Gerador da etapa 2: peças faltantes usando destinos 1, 2 e 3."""
+    vistos = set()
+
+    if ja_encontradas:
+        vistos.update(p['chave'] for p in ja_encontradas)
+    if orcamento is not None:
+        orcamento.estimar(
+            indice.quantidade(origem_filtro, destino_filtro) * len(indice.da_origem(destino_filtro))
+            + len(indice.da_origem(origem_filtro))
+        )
+
+    # Cenário A: mag_1 da origem quer destino (via qualquer destino), mag_2 do destino quer X, falta X→origem
+    for mag_1, _ in indice.rota(origem_filtro, destino_filtro):
+        for mag_2 in indice.da_origem(destino_filtro):
+            if orcamento is not None and orcamento.passo():
+                yield PAUSA_BUSCA
+            for dest_2, _ in indice.destinos(mag_2):
+                if dest_2 == origem_filtro:
+                    continue
+
+                tem_terceiro = indice.existe(dest_2, origem_filtro)
+
+                if not tem_terceiro:
+                    seq = f"{origem_filtro} → {destino_filtro} → {dest_2} → {origem_filtro}"
+                    chave = chave_ciclo((mag_1, mag_2, (dest_2, origem_filtro)))
+                    if chave not in vistos:
+                        vistos.add(chave)
+                        yield {
+                            'mag_1': mag_1,
+                            'mag_2': mag_2,
+                            'chave': chave,
+                            'sequencia': seq,
+                            'falta': f"Magistrado do {dest_2} com destino {origem_filtro}",
+                            'nivel': 'expandida'
+                        }
+
+    # Cenário B: mag_1 da origem quer intermediário, mag_inter quer destino, falta destino→origem
+    if indice.existe(destino_filtro, origem_filtro):
+        return
+
+    for mag_1 in indice.da_origem(origem_filtro):
+        if orcamento is not None and orcamento.passo():
+            yield PAUSA_BUSCA
+        for intermediario, _ in indice.destinos(mag_1):
+            if intermediario == destino_filtro:
+                continue
+
+            for mag_inter, _ in indice.rota(intermediario, destino_filtro):
+                seq = f"{origem_filtro} → {intermediario} → {destino_filtro} → {origem_filtro}"
+                chave = chave_ciclo((mag_1, mag_inter, (destino_filtro, origem_filtro)))
+                if chave not in vistos:
+                    vistos.add(chave)
+                    yield {
+                        'mag_1': mag_1,
+                        'mag_2': mag_inter,
+                        'chave': chave,
+                        'sequencia': seq,
+                        'falta': f"Magistrado do {destino_filtro} com destino {origem_filtro}",
+                        'nivel': 'expandida'
+                    }
+
+
+def pecas_faltantes_expandidas(origem_filtro, destino_filtro, indice, limite=50, ja_encontradas=None, orcamento=None):
+    """Etapa 2: Peças faltantes usando destinos 1, 2 e 3, com limite."""
+    cursor = CursorBusca(
+        gerar_pecas_faltantes_expandidas(origem_filtro, destino_filtro, indice, ja_encontradas, orcamento), orcamento
+    )
+    return cursor.pagina(limite)
+
+
+def _metades_de_ida(origem, destino, indice, prioridades):
+    """
+    Metades de ida origem → a → b das quadrangulações origem → a → b → destino → origem,
+    agrupadas pelo tribunal do meio b ({b: [a, ...]}), só no grafo de tribunais.
+    """
+    grafo = indice.grafo(prioridades)
+    idas = {}
+    for a in grafo.get(origem, []):
+        if a in (origem, destino):
+            continue
+        for b in grafo.get(a, []):
+            if b not in (origem, destino, a):
+                idas.setdefault(b, []).append(a)
+    return idas
+
+
+def gerar_quadrangulacoes(origem_filtro, destino_filtro, indice, expandida=False, orcamento=None):
+    """
+    Gerador de quadrangulações origem → A → B → destino → origem por junção "meet-in-the-middle":
+    as metades de ida (origem → A → B) são casadas pelo tribunal B com as metades de volta
+    (B → destino → origem), e só as rotas que fecham viram combinações de magistrados.
+    Por padrão apenas destino_1; com expandida=True considera os destinos 1, 2 e 3
+    (com 'pontuacao'), das rotas mais compatíveis para as menos.
+    """
+    prioridades = (1, 2, 3) if expandida else (1,)
+    prioridade_max = max(prioridades)
+    menor = menor_ciclo(indice, origem_filtro, destino_filtro, prioridades)
+    if menor is None or menor > 4:
+        return
+    retornos = indice.rota(destino_filtro, origem_filtro, prioridade_max)
+
+    rotas = []
+    for tribunal_b, tribunais_a in _metades_de_ida(origem_filtro, destino_filtro, indice, prioridades).items():
+        chegadas = indice.rota(tribunal_b, destino_filtro, prioridade_max)
+        if not chegadas:
+            continue
+        for tribunal_a in tribunais_a:
+            tribunais = [origem_filtro, tribunal_a, tribunal_b, destino_filtro]
+            candidatos = [
+                sorted(indice.rota(origem_filtro, tribunal_a, prioridade_max), key=lambda x: x[1]),
+                sorted(indice.rota(tribunal_a, tribunal_b, prioridade_max), key=lambda x: x[1]),
+                sorted(chegadas, key=lambda x: x[1]),
+                sorted(retornos, key=lambda x: x[1]),
+            ]
+            rotas.append((tribunais, candidatos))
+
+    # Rotas cuja melhor combinação é mais compatível primeiro (pontuação 3/2/1 por destino 1/2/3)
+    rotas.sort(key=lambda rota: pontuacao_ciclo([lista[0][1] for lista in rota[1]]), reverse=True)
+    if orcamento is not None:
+        orcamento.estimar(sum(int(np.prod([len(lista) for lista in candidatos])) for _, candidatos in rotas))
+
+    for tribunais, candidatos in rotas:
+        sequencia = formatar_sequencia(tribunais)
+        for combinacao in product(*candidatos):
+            if orcamento is not None and orcamento.passo():
+                yield PAUSA_BUSCA
+            quadrangulacao = {
+                'magistrados': [m for m, _ in combinacao],
+                'sequencia': sequencia,
+                'tribunais': list(tribunais),
+            }
+            if expandida:
+                quadrangulacao['pontuacao'] = pontuacao_ciclo([p for _, p in combinacao])
+            yield quadrangulacao
+
+
+def buscar_quadrangulacao_func(origem_filtro, destino_filtro, indice, limite=30, orcamento=None, expandida=False):
+    """
+    Busca quadrangulações (ciclo de 4 magistrados), por padrão usando APENAS destino_1.
+    Ciclo: origem → A → B → destino → origem
+    Onde:
+    - mag_1 está na origem, destino_1 = A
+    - mag_2 está em A, destino_1 = B
+    - mag_3 está em B, destino_1 = destino
+    - mag_4 está no destino, destino_1 = origem
+    Com expandida=True, qualquer um dos destinos 1, 2 e 3 vale em cada posição.
+    """
+    cursor = CursorBusca(gerar_quadrangulacoes(origem_filtro, destino_filtro, indice, expandida, orcamento), orcamento)
+    return cursor.pagina(limite)
+
+
+def gerar_rotacoes(origem_filtro, destino_filtro, indice, tamanho, expandida=False, orcamento=None):
+    """
+    Gerador de rotações de `tamanho` magistrados (4, 5 ou 6) em ciclo:
+    origem → ... → destino → origem. Por padrão apenas destino_1;
+    com expandida=True considera os destinos 1, 2 e 3, das rotações mais compatíveis para as menos.
+    """
+    if expandida:
+        for ciclo in gerar_melhores_ciclos(origem_filtro, destino_filtro, indice, (tamanho,), orcamento=orcamento):
+            yield ciclo if ciclo is PAUSA_BUSCA else {
+                'magistrados': ciclo['magistrados'],
+                'sequencia': ciclo['sequencia'],
+                'tribunais': ciclo['tribunais'],
+                'pontuacao': ciclo['pontuacao'],
+            }
+        return
+
+    vistos = set()
+    if orcamento is not None:
+        orcamento.estimar(_estimar_ciclos(indice, origem_filtro, destino_filtro, (tamanho,), (1,)))
+
+    for ciclo in enumerar_ciclos(indice, origem_filtro, destino_filtro, tamanho, prioridades=(1,)):
+        if orcamento is not None and orcamento.passo():
+            yield PAUSA_BUSCA
+        chave = chave_ciclo(ciclo['magistrados'])
+
+        if chave not in vistos:
+            vistos.add(chave)
+            yield {
+                'magistrados': ciclo['magistrados'],
+                'sequencia': ciclo['sequencia'],
+                'tribunais': ciclo['tribunais']
+            }
+
+
+def buscar_rotacao_func(origem_filtro, destino_filtro, indice, tamanho, expandida=False, limite=30, orcamento=None):
+    """Busca rotações de `tamanho` magistrados, com limite."""
+    cursor = CursorBusca(gerar_rotacoes(origem_filtro, destino_filtro, indice, tamanho, expandida, orcamento), orcamento)
+    return cursor.pagina(limite)
+
+
+def gerar_pecas_faltantes_quadrangulacao(origem_filtro, destino_filtro, indice, orcamento=None, expandida=False):
+    """
+    Gerador de quadrangulações quase completas: 3 magistrados encaixam,
+    falta 1 para fechar o ciclo de 4. Por padrão apenas destino_1; com expandida=True,
+    destinos 1, 2 e 3. Mesma junção pelo tribunal do meio B de gerar_quadrangulacoes.
+    """
+    prioridades = (1, 2, 3) if expandida else (1,)
+    prioridade_max = max(prioridades)
+    grafo = indice.grafo(prioridades)
+    vistos = set()
+
+    def _rota(o, d):
+        return indice.rota(o, d, prioridade_max)
+
+    retornos = _rota(destino_filtro, origem_filtro)
+    idas = _metades_de_ida(origem_filtro, destino_filtro, indice, prioridades)
+
+    # Casamentos pelo tribunal B: (A, B, posição faltante), montados antes de tocar nos magistrados
+    casamentos = []
+    if not retornos:
+        # Cenário 1: mag_1(origem→A), mag_2(A→B), mag_3(B→destino), falta mag_4(destino→origem)
+        for tribunal_b, tribunais_a in idas.items():
+            if destino_filtro in grafo.get(tribunal_b, []):
+                casamentos.extend((tribunal_a, tribunal_b, 4) for tribunal_a in tribunais_a)
+    else:
+        # Cenário 2: mag_1(origem→A), mag_2(A→B), falta mag_3(B→destino), mag_4(destino→origem) existe
+        for tribunal_b, tribunais_a in idas.items():
+            if destino_filtro not in grafo.get(tribunal_b, []):
+                casamentos.extend((tribunal_a, tribunal_b, 3) for tribunal_a in tribunais_a)
+
+        # Cenário 3: mag_1(origem→A), falta mag_2(A→B), mag_3(B→destino) e mag_4(destino→origem) existem
+        voltas = [
+            b for b in indice.origens
+            if b not in (origem_filtro, destino_filtro) and destino_filtro in grafo.get(b, [])
+        ]
+        for tribunal_a in grafo.get(origem_filtro, []):
+            if tribunal_a in (origem_filtro, destino_filtro):
+                continue
+            for tribunal_b in voltas:
+                if tribunal_b != tribunal_a and tribunal_b not in grafo.get(tribunal_a, []):
+                    casamentos.append((tribunal_a, tribunal_b, 2))
+
+    def _candidatos(tribunal_a, tribunal_b, posicao):
+        primeiros = _rota(origem_filtro, tribunal_a)
+        if posicao == 4:
+            return [primeiros, _rota(tribunal_a, tribunal_b), _rota(tribunal_b, destino_filtro)]
+        if posicao == 3:
+            return [primeiros, _rota(tribunal_a, tribunal_b), retornos]
+        # Um magistrado de referência em B→destino, como mag_3 representativo da peça
+        return [primeiros, _rota(tribunal_b, destino_filtro)[:1], retornos]
+
+    if orcamento is not None:
+        orcamento.estimar(sum(
+            int(np.prod([len(lista) for lista in _candidatos(*casamento)])) for casamento in casamentos
+        ))
+
+    faltas = {
+        4: lambda a, b: (destino_filtro, origem_filtro),
+        3: lambda a, b: (b, destino_filtro),
+        2: lambda a, b: (a, b),
+    }
+    for tribunal_a, tribunal_b, posicao in casamentos:
+        seq = f"{origem_filtro} → {tribunal_a} → {tribunal_b} → {destino_filtro} → {origem_filtro}"
+        falta = faltas[posicao](tribunal_a, tribunal_b)
+        for combinacao in product(*_candidatos(tribunal_a, tribunal_b, posicao)):
+            if orcamento is not None and orcamento.passo():
+                yield PAUSA_BUSCA
+            magistrados = [m for m, _ in combinacao]
+            partes = list(magistrados)
+            partes.insert(posicao - 1, falta)
+            chave = chave_ciclo(partes)
+            if chave in vistos:
+                continue
+            vistos.add(chave)
+            yield {
+                'magistrados': magistrados,
+                'sequencia': seq,
+                'falta': f"Magistrado do {falta[0]} com destino {falta[1]}",
+                'posicao_faltante': posicao
+            }
+
+
+def pecas_faltantes_quadrangulacao(origem_filtro, destino_filtro, indice, limite=30, orcamento=None, expandida=False):
+    """Quadrangulações quase completas (por padrão apenas destino_1), com limite."""
+    cursor = CursorBusca(
+        gerar_pecas_faltantes_quadrangulacao(origem_filtro, destino_filtro, indice, orcamento, expandida), orcamento
+    )
+    return cursor.pagina(limite)
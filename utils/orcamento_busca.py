@@ -0,0 +1,86 @@
+"""
+Orçamento de tempo e de trabalho das buscas do motor de permutas.
+Sistema Permutatum - Permutas entre magistrados.
+Cada busca conta os candidatos explorados; ao passar do prazo (ou do número máximo de passos),
+ou ao ser cancelada, ela para e devolve os resultados parciais com o indicador de busca incompleta.
+"""
+
+import time
+
+
+# Emitido pelos geradores do motor quando o orçamento acaba: o gerador continua vivo e a
+# próxima página (CursorBusca.pagina, com o orçamento renovado) retoma de onde parou.
+PAUSA_BUSCA = object()
+
+
+class OrcamentoBusca:
+    """
+    Prazo (segundos) e/ou limite de passos de uma busca, com relatório de progresso.
+    - ao_progresso(fracao, explorados, total_estimado) é chamado no máximo a cada
+      `intervalo_progresso` segundos (ex.: para atualizar um st.progress).
+    - incompleta fica True quando a busca foi interrompida antes de terminar.
+    """
+
+    def __init__(self, prazo_segundos: float | None = None, max_passos: int | None = None,
+                 ao_progresso=None, intervalo_progresso: float = 0.1):
+        self.prazo_segundos = prazo_segundos
+        self.max_passos = max_passos
+        self.ao_progresso = ao_progresso
+        self.intervalo_progresso = intervalo_progresso
+        self.explorados = 0
+        self.total_estimado = 0
+        self.cancelada = False
+        self.renovar()
+
+    def renovar(self):
+        """Reinicia o prazo e os passos da página atual (os contadores de progresso continuam)."""
+        self._inicio = time.monotonic()
+        self._ultimo_relatorio = self._inicio
+        self.passos = 0
+        self.incompleta = False
+
+    def estimar(self, quantidade: int):
+        """Soma candidatos ao total estimado da busca (usado só no progresso)."""
+        self.total_estimado += max(int(quantidade), 0)
+
+    def cancelar(self):
+        """Interrompe a busca no próximo passo."""
+        self.cancelada = True
+
+    @property
+    def progresso(self) -> float:
+        """Fração (0 a 1) dos candidatos estimados já explorados."""
+        if not self.total_estimado:
+            return 0.0
+        return min(self.explorados / self.total_estimado, 1.0)
+
+    @property
+    def esgotado(self) -> bool:
+        if self.cancelada:
+            return True
+        if self.max_passos is not None and self.passos >= self.max_passos:
+            return True
+        return self.prazo_segundos is not None and time.monotonic() - self._inicio >= self.prazo_segundos
+
+    def passo(self, quantidade: int = 1) -> bool:
+        """
+        Registra candidatos explorados. Retorna True quando a busca deve parar
+        (cancelada, sem passos ou fora do prazo), marcando-a como incompleta.
+        """
+        self.explorados += quantidade
+        self.passos += quantidade
+        if self.ao_progresso is not None:
+            agora = time.monotonic()
+            if agora - self._ultimo_relatorio >= self.intervalo_progresso:
+                self._ultimo_relatorio = agora
+                self.ao_progresso(self.progresso, self.explorados, self.total_estimado)
+        if self.esgotado:
+            self.incompleta = True
+            return True
+        return False
+
+    def concluir(self):
+        """Relata o progresso final (100% se a busca terminou)."""
+        if self.ao_progresso is not None:
+            fracao = self.progresso if self.incompleta else 1.0
+            self.ao_progresso(fracao, self.explorados, max(self.total_estimado, self.explorados))
@@ -0,0 +1,110 @@
+"""
+Relatório em lote de todas as permutas, triangulações e quadrangulações dos 702 pares de tribunais.
+Sistema Permutatum - Permutas entre magistrados.
+Os pares são divididos por tribunal de origem entre processos (ProcessPoolExecutor); cada
+processo lê o mesmo índice da base e o resultado é gravado em JSON Lines comprimido (gzip)
+à medida que os lotes terminam.
+
+Uso: python -m utils.cli_permutas base.json varredura relatorio.jsonl.gz [--limite-por-par N] [--processos N]
+"""
+
+import gzip
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.catalogo_permutas import CatalogoCiclos
+from utils.ciclos_permutas import enumerar_ciclos, TODAS_PRIORIDADES
+from utils.contagem_permutas import contar_ciclos, contagem_do_par
+from utils.indice_permutas import IndicePermutas
+from utils.snapshot_compacto import TRIBUNAIS
+
+
+TAMANHOS_RELATORIO = {2: 'diretas', 3: 'triangulacoes', 4: 'quadrangulacoes'}
+
+# Índice compartilhado com os processos: herdado por fork ou construído uma vez por processo
+_INDICE = None
+_CONTAGENS = {}  # prioridades → matrizes de contar_ciclos, calculadas uma vez por processo
+
+
+def _preparar_indice(dados: list[dict]) -> IndicePermutas:
+    indice = IndicePermutas(dados)
+    indice.catalogo = CatalogoCiclos(indice)
+    return indice
+
+
+def _inicializar_processo(dados):
+    global _INDICE
+    if dados is not None:
+        _INDICE = _preparar_indice(dados)
+
+
+def _ciclo_serializavel(ciclo: dict) -> dict:
+    return {
+        'ids': [m.get('id') for m in ciclo['magistrados']],
+        'tribunais': ciclo['tribunais'],
+        'prioridades': ciclo['prioridades'],
+    }
+
+
+def _processar_origem(origem: str, prioridades, limite_por_par) -> list[tuple[str, bool]]:
+    """Linhas JSON (uma por par) de todos os destinos de uma origem, com o indicador de truncamento."""
+    indice = _INDICE
+    if prioridades not in _CONTAGENS:
+        _CONTAGENS[prioridades] = contar_ciclos(indice, prioridades)
+    contagens = _CONTAGENS[prioridades]
+    linhas = []
+    for destino in TRIBUNAIS:
+        if destino == origem:
+            continue
+        registro = {
+            'origem': origem,
+            'destino': destino,
+            'contagens': contagem_do_par(contagens, origem, destino),
+            'truncado': False,
+        }
+        for tamanho, nome in TAMANHOS_RELATORIO.items():
+            ciclos = []
+            for ciclo in enumerar_ciclos(indice, origem, destino, tamanho, prioridades):
+                if limite_por_par is not None and len(ciclos) >= limite_por_par:
+                    registro['truncado'] = True
+                    break
+                ciclos.append(_ciclo_serializavel(ciclo))
+            registro[nome] = ciclos
+        linhas.append((json.dumps(registro, ensure_ascii=False, default=str), registro['truncado']))
+    return linhas
+
+
+def gerar_relatorio_lote(dados: list[dict], caminho_saida: str, prioridades=TODAS_PRIORIDADES,
+                         limite_por_par: int | None = 1000, processos: int | None = None) -> dict:
+    """
+    Grava em `caminho_saida` (JSON Lines com gzip) uma linha por par (origem, destino) com as
+    contagens exatas e os ciclos de 2, 3 e 4 magistrados (até `limite_por_par` por tamanho).
+    Retorna um resumo com a quantidade de pares gravados e de pares truncados.
+    """
+    global _INDICE
+    _INDICE = _preparar_indice(dados)
+    prioridades = tuple(prioridades)
+
+    # Com fork os processos herdam o índice já construído; nos demais, cada um o reconstrói uma vez
+    if 'fork' in multiprocessing.get_all_start_methods():
+        contexto, dados_processo = multiprocessing.get_context('fork'), None
+    else:
+        contexto, dados_processo = multiprocessing.get_context(), dados
+
+    resumo = {'pares': 0, 'truncados': 0, 'versao': _INDICE.versao}
+    with gzip.open(caminho_saida, 'wt', encoding='utf-8') as saida, ProcessPoolExecutor(
+        max_workers=processos or os.cpu_count(),
+        mp_context=contexto,
+        initializer=_inicializar_processo,
+        initargs=(dados_processo,),
+    ) as executor:
+        futuros = [executor.submit(_processar_origem, origem, prioridades, limite_por_par) for origem in TRIBUNAIS]
+        for futuro in as_completed(futuros):
+            for linha, truncado in futuro.result():
+                saida.write(linha + '\n')
+                resumo['pares'] += 1
+                resumo['truncados'] += truncado
+    return resumo
+
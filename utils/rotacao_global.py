@@ -0,0 +1,329 @@
+"""
+Rotação global: escolhe um conjunto de ciclos disjuntos (cada magistrado em no máximo um)
+que atenda o maior número de magistrados, ponderado pela prioridade do destino.
+O resultado é aproximado: heurística gulosa seguida de melhoria local, sem solver exato.
+Sistema Permutatum - Permutas entre magistrados.
+Inspirado no empacotamento de ciclos usado em programas de troca de rins (ciclos de até 4).
+"""
+
+from utils.catalogo_permutas import CatalogoCiclos
+from utils.ciclos_permutas import formatar_sequencia
+from utils.contagem_permutas import PESOS_PRIORIDADE
+
+# Primeiros ciclos alternativos testados ao tentar trocar um ciclo escolhido por dois
+CANDIDATOS_TROCA = 10
+
+# Passadas máximas da melhoria local sobre todos os ciclos escolhidos
+PASSADAS_MELHORIA = 3
+
+
+def _ciclos_canonicos(catalogo, tamanho_max):
+    """Cada rota do catálogo uma única vez (tupla iniciada pelo menor tribunal)."""
+    vistos = set()
+    for (origem, _, tamanho), ciclos in catalogo.por_par.items():
+        if tamanho > tamanho_max:
+            continue
+        for ciclo in ciclos:
+            if ciclo[0] == origem and ciclo not in vistos:
+                vistos.add(ciclo)
+                yield ciclo
+
+
+def limite_superior(indice, tamanho_max: int = 4, pesos=None) -> dict:
+    """
+    Limite superior para qualquer conjunto de ciclos disjuntos de até `tamanho_max`.
+
+    Só conta arestas que fecham algum ciclo (o destino volta à origem em até
+    `tamanho_max - 1` movimentos). Em ciclos disjuntos, de cada tribunal saem tantos
+    magistrados quanto chegam, logo os atendidos de um tribunal não passam do menor
+    entre os que podem sair e os que podem chegar. A pontuação fica abaixo tanto da soma,
+    nessa quantidade, dos melhores pesos de quem sai quanto dos pesos de quem chega.
+    O(n), sem enumerar ciclos.
+
+    Retorna {'magistrados', 'pontuacao'}.
+    """
+    pesos = pesos or PESOS_PRIORIDADE
+    distancias = indice.distancias()
+    saindo = {}
+    chegando = {}
+    for origem, magistrados in indice.por_origem.items():
+        for magistrado in magistrados:
+            validos = [
+                (destino, p) for destino, p in indice.destinos(magistrado)
+                if distancias.get(destino, {}).get(origem, tamanho_max) < tamanho_max
+            ]
+            if not validos:
+                continue
+            saindo.setdefault(origem, []).append(max(pesos.get(p, 0) for _, p in validos))
+            for destino, p in validos:
+                chegando.setdefault(destino, []).append(pesos.get(p, 0))
+
+    magistrados = 0
+    pontuacao_saida = 0
+    pontuacao_chegada = 0
+    for tribunal, melhores in saindo.items():
+        entrantes = chegando.get(tribunal, [])
+        quantidade = min(len(melhores), len(entrantes))
+        magistrados += quantidade
+        pontuacao_saida += sum(sorted(melhores, reverse=True)[:quantidade])
+        pontuacao_chegada += sum(sorted(entrantes, reverse=True)[:quantidade])
+    return {'magistrados': magistrados, 'pontuacao': min(pontuacao_saida, pontuacao_chegada)}
+
+
+def resolver_rotacoes_globais(indice, tamanho_max: int = 4, pesos=None, orcamento=None) -> dict:
+    """
+    Seleciona ciclos disjuntos de 2 a `tamanho_max` magistrados em toda a base.
+
+    Heurística gulosa sobre o catálogo de rotas: as rotas são ordenadas pela melhor
+    pontuação média possível por magistrado (prioridade 1 = 3 pontos, 2 = 2, 3 = 1) e,
+    em cada uma, são fechados tantos ciclos quanto houver magistrados livres. Em cada
+    aresta escolhe-se o magistrado livre de melhor prioridade e, no empate, o que tem
+    menos destinos alternativos.
+
+    Em seguida, melhoria local: cada ciclo escolhido é trocado por dois ciclos disjuntos
+    (com os seus magistrados e os livres) quando isso aumenta a pontuação, até nenhuma
+    troca melhorar, `PASSADAS_MELHORIA` passadas ou o fim do `orcamento` (um ciclo por
+    passo; a solução gulosa sai sempre inteira). Não garante o ótimo exato (isso exigiria
+    um solver de programação inteira); `limite_superior` e `folga` dizem quanto, no
+    máximo, a solução pode estar longe dele.
+
+    Retorna {'ciclos', 'magistrados_atendidos', 'pontuacao', 'total_magistrados',
+    'por_tamanho', 'trocas', 'aproximado', 'incompleta', 'limite_superior', 'folga'}.
+    """
+    pesos = pesos or PESOS_PRIORIDADE
+    catalogo = indice.catalogo
+    if catalogo is None or max(catalogo.tamanhos) < tamanho_max:
+        catalogo = CatalogoCiclos(indice, tamanhos=range(2, tamanho_max + 1))
+
+    # Candidatos de cada aresta ordenados do melhor para o pior
+    alternativas = {id(m): len(indice.destinos(m)) for m in indice.dados}
+    chave = lambda c: (c[1], alternativas[id(c[0])])
+    filas = {}
+    for aresta, candidatos in indice.por_rota.items():
+        filas[aresta] = sorted(candidatos, key=chave)
+    posicoes = {aresta: 0 for aresta in filas}
+    na_fila = {(aresta, id(m)): i for aresta, fila in filas.items() for i, (m, _) in enumerate(fila)}
+    usados = set()
+
+    def _melhor_livre(aresta):
+        fila = filas.get(aresta, [])
+        i = posicoes.get(aresta, 0)
+        while i < len(fila) and id(fila[i][0]) in usados:
+            i += 1
+        posicoes[aresta] = i
+        return fila[i] if i < len(fila) else None
+
+    def _arestas(ciclo):
+        return [(t, ciclo[(i + 1) % len(ciclo)]) for i, t in enumerate(ciclo)]
+
+    def _potencial(ciclo):
+        return sum(pesos.get(filas[a][0][1], 0) for a in _arestas(ciclo)) / len(ciclo)
+
+    rotas = sorted(_ciclos_canonicos(catalogo, tamanho_max), key=lambda c: (-_potencial(c), len(c)))
+
+    def _novo_ciclo(rota, escolhidos):
+        return {
+            'magistrados': [m for m, _ in escolhidos],
+            'prioridades': [p for _, p in escolhidos],
+            'sequencia': formatar_sequencia(rota),
+            'tribunais': list(rota),
+            'pontuacao': sum(pesos.get(p, 0) for _, p in escolhidos),
+        }
+
+    ciclos = []
+    for rota in rotas:
+        arestas = _arestas(rota)
+        while True:
+            escolhidos = []
+            for aresta in arestas:
+                candidato = _melhor_livre(aresta)
+                if candidato is None:
+                    break
+                escolhidos.append(candidato)
+            if len(escolhidos) < len(arestas):
+                break
+
+            for magistrado, _ in escolhidos:
+                usados.add(id(magistrado))
+            ciclos.append(_novo_ciclo(rota, escolhidos))
+
+    # Melhoria local: depois da passada gulosa nenhuma rota fecha só com magistrados livres,
+    # então cada ciclo novo usa ao menos um magistrado do ciclo desfeito
+    def _primeiro_livre(aresta, excluidos=()):
+        candidato = _melhor_livre(aresta)
+        if candidato is None or id(candidato[0]) not in excluidos:
+            return candidato
+        fila = filas[aresta]
+        for i in range(posicoes[aresta] + 1, len(fila)):
+            if id(fila[i][0]) not in usados and id(fila[i][0]) not in excluidos:
+                return fila[i]
+        return None
+
+    def _fechar(rota, liberados, excluidos):
+        escolhidos = []
+        for aresta in _arestas(rota):
+            opcoes = [c for c in liberados.get(aresta, ()) if id(c[0]) not in excluidos]
+            livre = _primeiro_livre(aresta, excluidos)
+            if livre is not None:
+                opcoes.append(livre)
+            if not opcoes:
+                return None
+            escolhidos.append(min(opcoes, key=chave))
+        return escolhidos
+
+    def _rotas_por(liberados, livres):
+        """Rotas de até `tamanho_max` que passam por uma aresta liberada e só usam arestas com alguém disponível."""
+        vizinhos = dict(livres)
+        for origem, destino in liberados:
+            vizinhos[origem] = vizinhos.get(origem, set()) | {destino}
+        encontradas = set()
+
+        def _estender(caminho, fecham):
+            ultimo = caminho[-1]
+            if ultimo in fecham:
+                menor = caminho.index(min(caminho))
+                encontradas.add(tuple(caminho[menor:] + caminho[:menor]))
+            if len(caminho) == tamanho_max:
+                return
+            # O último tribunal possível precisa voltar direto à origem
+            seguintes = vizinhos.get(ultimo, set())
+            if len(caminho) + 1 == tamanho_max:
+                seguintes = seguintes & fecham
+            for seguinte in seguintes:
+                if seguinte not in caminho:
+                    _estender(caminho + [seguinte], fecham)
+
+        for origem, destino in liberados:
+            fecham = {t for t, destinos in vizinhos.items() if origem in destinos}
+            _estender([origem, destino], fecham)
+        return encontradas
+
+    def _liberar(magistrado):
+        usados.discard(id(magistrado))
+        for destino, _ in indice.destinos(magistrado):
+            aresta = (magistrado.get('origem'), destino)
+            livres.setdefault(aresta[0], set()).add(aresta[1])
+            i = na_fila.get((aresta, id(magistrado)))
+            if i is not None and i < posicoes.get(aresta, 0):
+                posicoes[aresta] = i
+
+    # Arestas com algum magistrado livre, por origem (pode sobrar aresta já esgotada; _fechar confere)
+    livres = {}
+    for aresta in filas:
+        if _primeiro_livre(aresta) is not None:
+            livres.setdefault(aresta[0], set()).add(aresta[1])
+    trocas = 0
+    esgotado = False
+    for _ in range(PASSADAS_MELHORIA):
+        melhorou = False
+        if orcamento is not None:
+            orcamento.estimar(len(ciclos))
+        i = 0
+        while i < len(ciclos):
+            if orcamento is not None and orcamento.passo():
+                esgotado = True
+                break  # Orçamento esgotado: fica com as trocas feitas até aqui
+            ciclo = ciclos[i]
+            desfeitos = {id(m) for m in ciclo['magistrados']}
+            liberados = {}
+            for magistrado in ciclo['magistrados']:
+                for destino, prioridade in indice.destinos(magistrado):
+                    liberados.setdefault((magistrado.get('origem'), destino), []).append((magistrado, prioridade))
+
+            alternativas_ciclo = []
+            for rota in _rotas_por(liberados, livres):
+                escolhidos = _fechar(rota, liberados, set())
+                if escolhidos and any(id(m) in desfeitos for m, _ in escolhidos):
+                    alternativas_ciclo.append((sum(pesos.get(p, 0) for _, p in escolhidos), rota, escolhidos))
+            alternativas_ciclo.sort(key=lambda a: (-a[0], len(a[1])))
+
+            # Par de melhor pontuação: o segundo ciclo é a melhor alternativa disjunta do primeiro,
+            # refechando sem os magistrados do primeiro as que colidem (nunca pontuam mais)
+            melhor = None
+            for pontos_a, rota_a, escolhidos_a in alternativas_ciclo[:CANDIDATOS_TROCA]:
+                excluidos = {id(m) for m, _ in escolhidos_a}
+                segunda = None
+                for pontos, rota, escolhidos in alternativas_ciclo:
+                    if segunda is not None and pontos <= segunda[0]:
+                        break
+                    if rota == rota_a:
+                        continue
+                    if any(id(m) in excluidos for m, _ in escolhidos):
+                        escolhidos = _fechar(rota, liberados, excluidos)
+                        if not escolhidos or not any(id(m) in desfeitos for m, _ in escolhidos):
+                            continue
+                        pontos = sum(pesos.get(p, 0) for _, p in escolhidos)
+                    if segunda is None or pontos > segunda[0]:
+                        segunda = (pontos, rota, escolhidos)
+                if segunda is None:
+                    continue
+                total = pontos_a + segunda[0]
+                if total > ciclo['pontuacao'] and (melhor is None or total > melhor[0]):
+                    melhor = (total, (rota_a, escolhidos_a), segunda[1:])
+
+            if melhor is None:
+                i += 1
+                continue
+            novos = [_novo_ciclo(rota, escolhidos) for rota, escolhidos in melhor[1:]]
+            mantidos = {id(m) for novo in novos for m in novo['magistrados']}
+            for magistrado in ciclo['magistrados']:
+                if id(magistrado) not in mantidos:
+                    _liberar(magistrado)
+            usados.update(mantidos)
+            ciclos[i:i + 1] = novos
+            trocas += 1
+            melhorou = True
+            i += len(novos)
+        if esgotado or not melhorou:
+            break
+
+    por_tamanho = {}
+    for ciclo in ciclos:
+        por_tamanho[len(ciclo['tribunais'])] = por_tamanho.get(len(ciclo['tribunais']), 0) + 1
+
+    limite = limite_superior(indice, tamanho_max, pesos)
+    pontuacao = sum(ciclo['pontuacao'] for ciclo in ciclos)
+    return {
+        'ciclos': ciclos,
+        'magistrados_atendidos': len(usados),
+        'pontuacao': pontuacao,
+        'total_magistrados': len(indice.dados),
+        'por_tamanho': por_tamanho,
+        'trocas': trocas,
+        'aproximado': True,
+        'incompleta': esgotado,
+        'limite_superior': limite,
+        'folga': {
+            'magistrados': limite['magistrados'] - len(usados),
+            'pontuacao': limite['pontuacao'] - pontuacao,
+        },
+    }
+
+
+def relatorio_rotacoes_globais(indice, tamanho_max: int = 4, orcamento=None) -> dict:
+    """Versão serializável (JSON) de resolver_rotacoes_globais, para exportação e integrações."""
+    resultado = resolver_rotacoes_globais(indice, tamanho_max, orcamento=orcamento)
+    return {
+        'versao': indice.versao,
+        'magistrados_atendidos': resultado['magistrados_atendidos'],
+        'total_magistrados': resultado['total_magistrados'],
+        'pontuacao': resultado['pontuacao'],
+        'por_tamanho': {str(k): v for k, v in sorted(resultado['por_tamanho'].items())},
+        'aproximado': resultado['aproximado'],
+        'trocas': resultado['trocas'],
+        'melhoria_incompleta': resultado['incompleta'],
+        'limite_superior': resultado['limite_superior'],
+        'folga': resultado['folga'],
+        'ciclos': [
+            {
+                'sequencia': ciclo['sequencia'],
+                'tribunais': ciclo['tribunais'],
+                'pontuacao': ciclo['pontuacao'],
+                'magistrados': [
+                    {'id': m.get('id'), 'nome': m.get('nome'), 'origem': m.get('origem'), 'prioridade': p}
+                    for m, p in zip(ciclo['magistrados'], ciclo['prioridades'])
+                ],
+            }
+            for ciclo in resultado['ciclos']
+        ],
+    }
@@ -0,0 +1,154 @@
+"""
+Representação compacta (estrutura de arrays) da base de magistrados.
+Sistema Permutatum - Permutas entre magistrados.
+Tribunais viram inteiros 0–26 e os destinos uma matriz int8 por prioridade; os dados de
+contato continuam nos registros originais, consultados só na exibição.
+"""
+
+import numpy as np
+
+
+# Os 27 Tribunais de Justiça estaduais (mesma ordem das listas das páginas)
+TRIBUNAIS = [
+    "TJAC", "TJAL", "TJAP", "TJAM", "TJBA", "TJCE", "TJDFT", "TJES",
+    "TJGO", "TJMA", "TJMT", "TJMS", "TJMG", "TJPA", "TJPB", "TJPR",
+    "TJPE", "TJPI", "TJRJ", "TJRN", "TJRS", "TJRO", "TJRR", "TJSC",
+    "TJSE", "TJSP", "TJTO",
+]
+
+# Colunas de destino, na ordem de prioridade
+COLUNAS_DESTINO = ("destino_1", "destino_2", "destino_3")
+
+CODIGO_TRIBUNAL = {tribunal: codigo for codigo, tribunal in enumerate(TRIBUNAIS)}
+SEM_TRIBUNAL = -1
+
+
+def bit_tribunal(tribunal: str) -> int:
+    """Bit do tribunal nas máscaras de destino (0 se o tribunal não é conhecido)."""
+    codigo = CODIGO_TRIBUNAL.get(tribunal)
+    return 0 if codigo is None else 1 << codigo
+
+
+def mascara_tribunais(tribunais) -> int:
+    """Máscara com os bits de todos os tribunais informados."""
+    mascara = 0
+    for tribunal in tribunais:
+        mascara |= bit_tribunal(tribunal)
+    return mascara
+
+
+def destinos_com_prioridade(magistrado: dict) -> list[tuple[str, int]]:
+    """
+    Retorna os destinos do magistrado como [(tribunal, prioridade)], na ordem
+    de preferência. Um tribunal repetido conta apenas com a melhor prioridade.
+    """
+    destinos = []
+    vistos = set()
+    for prioridade, coluna in enumerate(COLUNAS_DESTINO, 1):
+        destino = magistrado.get(coluna)
+        if destino and destino not in vistos:
+            vistos.add(destino)
+            destinos.append((destino, prioridade))
+    return destinos
+
+
+class LinhaMagistrado:
+    """Visão leve de uma linha do snapshot, sem copiar dados."""
+
+    __slots__ = ("snapshot", "posicao")
+
+    def __init__(self, snapshot: "SnapshotCompacto", posicao: int):
+        self.snapshot = snapshot
+        self.posicao = posicao
+
+    @property
+    def origem(self) -> int:
+        return int(self.snapshot.origem[self.posicao])
+
+    @property
+    def destinos(self) -> tuple[tuple[str, int], ...]:
+        return self.snapshot.destinos_tupla[self.posicao]
+
+    @property
+    def registro(self) -> dict:
+        """Registro original (nome, e-mail, telefone...), usado só na exibição."""
+        return self.snapshot.registros[self.posicao]
+
+
+class SnapshotCompacto:
+    """
+    Base de magistrados em colunas, convertida uma única vez na carga:
+    - origem: int8 (n,), código do tribunal (SEM_TRIBUNAL se ausente ou desconhecido)
+    - destinos: int8 (n, 3), coluna j = destino com prioridade j + 1 (SEM_TRIBUNAL se vazio)
+    - destinos_tupla: ((tribunal, prioridade), ...) por linha, prontos para os laços de busca
+    - mascaras: uint32 (n, 3), coluna j = bits dos destinos com prioridade ≤ j + 1
+    - bit_origem: uint32 (n,), bit do tribunal de origem (0 se ausente)
+    - registros: os dicionários originais, com os dados de contato
+    """
+
+    def __init__(self, dados: list[dict]):
+        self.registros = dados or []
+        total = len(self.registros)
+        self.origem = np.full(total, SEM_TRIBUNAL, dtype=np.int8)
+        self.destinos = np.full((total, len(COLUNAS_DESTINO)), SEM_TRIBUNAL, dtype=np.int8)
+        self.mascaras = np.zeros((total, len(COLUNAS_DESTINO)), dtype=np.uint32)
+        self.bit_origem = np.zeros(total, dtype=np.uint32)
+        self.destinos_tupla: list[tuple[tuple[str, int], ...]] = []
+        self.posicao: dict[int, int] = {}
+
+        for i, magistrado in enumerate(self.registros):
+            self.posicao[id(magistrado)] = i
+            self.origem[i] = CODIGO_TRIBUNAL.get(magistrado.get("origem"), SEM_TRIBUNAL)
+            self.bit_origem[i] = bit_tribunal(magistrado.get("origem"))
+            destinos = tuple(destinos_com_prioridade(magistrado))
+            for destino, prioridade in destinos:
+                self.destinos[i, prioridade - 1] = CODIGO_TRIBUNAL.get(destino, SEM_TRIBUNAL)
+                self.mascaras[i, prioridade - 1:] |= bit_tribunal(destino)
+            self.destinos_tupla.append(destinos)
+
+    def __len__(self) -> int:
+        return len(self.registros)
+
+    def linha(self, posicao: int) -> LinhaMagistrado:
+        return LinhaMagistrado(self, posicao)
+
+    def destinos_de(self, magistrado: dict) -> tuple[tuple[str, int], ...]:
+        """Destinos pré-calculados de um registro do snapshot (sem alocar listas)."""
+        posicao = self.posicao.get(id(magistrado))
+        if posicao is None:
+            return tuple(destinos_com_prioridade(magistrado))
+        return self.destinos_tupla[posicao]
+
+    def da_origem(self, tribunal: str) -> np.ndarray:
+        """Posições dos magistrados lotados no tribunal."""
+        if tribunal not in CODIGO_TRIBUNAL:
+            return np.empty(0, dtype=np.intp)
+        return np.flatnonzero(self.origem == CODIGO_TRIBUNAL[tribunal])
+
+    def mascara(self, prioridade_max: int = 3) -> np.ndarray:
+        """Coluna uint32 com os destinos aceitos por cada magistrado até a prioridade."""
+        return self.mascaras[:, min(max(prioridade_max, 1), len(COLUNAS_DESTINO)) - 1]
+
+    def filtrar(self, origem: str | None = None, destino: str | None = None, prioridade_max: int = 3) -> np.ndarray:
+        """
+        Posições dos magistrados lotados em `origem` que aceitam `destino` até a prioridade,
+        numa única operação vetorizada. Filtros None são ignorados.
+        """
+        selecao = np.ones(len(self), dtype=bool)
+        if origem is not None:
+            selecao &= (self.bit_origem & np.uint32(bit_tribunal(origem))) != 0
+        if destino is not None:
+            selecao &= (self.mascara(prioridade_max) & np.uint32(bit_tribunal(destino))) != 0
+        return np.flatnonzero(selecao)
+
+    def das_origens(self, tribunais) -> np.ndarray:
+        """Posições dos magistrados lotados em qualquer dos tribunais."""
+        return np.flatnonzero(self.bit_origem & np.uint32(mascara_tribunais(tribunais)))
+
+    def prioridade_de(self, destino: str) -> np.ndarray:
+        """Prioridade com que cada magistrado deseja o destino (0 se não deseja)."""
+        bit = np.uint32(bit_tribunal(destino))
+        prioridades = np.zeros(len(self), dtype=np.int8)
+        for j in range(len(COLUNAS_DESTINO) - 1, -1, -1):
+            prioridades[(self.mascaras[:, j] & bit) != 0] = j + 1
+        return prioridades